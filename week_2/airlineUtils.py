@@ -1,26 +1,158 @@
-import requests
-from auth import generate_access_token
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
 
-access_token = generate_access_token()
+from auth import AuthError, authorized_request, base_url
+from db_utils import CARRIERS_TABLE_SQL
+from metrics import metrics
 
-def get_airline_name(iata_code):
+logger = logging.getLogger(__name__)
+
+# Airline names rarely change; re-check a cached code after this many seconds
+AIRLINE_CACHE_TTL = 30 * 24 * 3600
+AIRLINE_LRU_SIZE = 1024
+# Upper bound on codes sent in one airlineCodes query
+MAX_CODES_PER_REQUEST = 100
+
+
+def fetch_airline_names(iata_codes):
     """
-    Looks up the airline name for a given IATA code using Amadeus API.
+    Looks up several IATA codes with one call to the Amadeus airlines endpoint.
+    Returns a dict of code -> name for the codes the API knows, or None if the request failed.
     """
-    url = "https://test.api.amadeus.com/v1/reference-data/airlines"
-    headers = {
-        "Authorization": f"Bearer {access_token}"
-    }
+    url = f"{base_url}/v1/reference-data/airlines"
     params = {
-        "airlineCodes": iata_code
+        "airlineCodes": ",".join(iata_codes)
     }
-    response = requests.get(url, headers=headers, params=params)
+    try:
+        response = authorized_request("GET", url, params=params)
+    except AuthError as e:
+        logger.error("Error looking up airlines %s: %s", params["airlineCodes"], e)
+        return None
     if response.status_code == 200:
-        data = response.json().get("data", [])
-        if data:
-            return data[0].get("businessName") or data[0].get("commonName") or data[0].get("name")
-        else:
-            return None
+        names = {}
+        for airline in response.json().get("data", []):
+            code = airline.get("iataCode")
+            if code:
+                names[code] = airline.get("businessName") or airline.get("commonName") or airline.get("name")
+        return names
     else:
-        print("Error:", response.text)
+        logger.error("Error looking up airlines %s: HTTP %s %s", params["airlineCodes"], response.status_code,
+                     response.text[:300], extra={"status": response.status_code})
         return None
+
+
+class AirlineResolver:
+    """
+    Resolves IATA codes to airline names through three layers: an in-process
+    LRU, the SQLite `carriers` table, and finally one batched API request for
+    every code neither layer knows. Codes the API does not recognise are cached
+    too, so each never-before-seen carrier costs at most one network call.
+    """
+
+    def __init__(self, db_path="database.db", ttl=AIRLINE_CACHE_TTL, lru_size=AIRLINE_LRU_SIZE,
+                 fetch=fetch_airline_names, clock=time.time):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.lru_size = lru_size
+        self._fetch = fetch
+        self._clock = clock
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"lru_hits": 0, "db_hits": 0, "fetched": 0, "requests": 0}
+
+    def _remember(self, code, name, fetched_at):
+        self._lru[code] = (name, fetched_at)
+        self._lru.move_to_end(code)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def _from_lru(self, codes, now, resolved):
+        missing = []
+        for code in codes:
+            entry = self._lru.get(code)
+            if entry and now - entry[1] < self.ttl:
+                self._lru.move_to_end(code)
+                resolved[code] = entry[0]
+                self.stats["lru_hits"] += 1
+            else:
+                missing.append(code)
+        metrics.inc("airline_codes_resolved_total", len(codes) - len(missing), source="lru")
+        return missing
+
+    def _from_db(self, conn, codes, now, resolved):
+        placeholders = ",".join("?" * len(codes))
+        rows = conn.execute(
+            f"SELECT code, name, fetched_at FROM carriers WHERE code IN ({placeholders}) AND fetched_at > ?",
+            (*codes, now - self.ttl)
+        ).fetchall()
+        for code, name, fetched_at in rows:
+            resolved[code] = name
+            self._remember(code, name, fetched_at)
+            self.stats["db_hits"] += 1
+        metrics.inc("airline_codes_resolved_total", len(rows), source="db")
+        return [code for code in codes if code not in resolved]
+
+    def resolve(self, iata_codes):
+        """
+        Returns a dict mapping each distinct code in `iata_codes` to its airline name (or None).
+        """
+        codes = sorted({code for code in iata_codes if code})
+        resolved = {}
+        if not codes:
+            return resolved
+
+        with self._lock:
+            now = self._clock()
+            missing = self._from_lru(codes, now, resolved)
+            if not missing:
+                return resolved
+
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                conn.execute(CARRIERS_TABLE_SQL)
+                missing = self._from_db(conn, missing, now, resolved)
+                for start in range(0, len(missing), MAX_CODES_PER_REQUEST):
+                    batch = missing[start:start + MAX_CODES_PER_REQUEST]
+                    names = self._fetch(batch)
+                    self.stats["requests"] += 1
+                    if names is None:
+                        # Leave failed lookups uncached so the next call retries them
+                        continue
+                    metrics.inc("airline_codes_resolved_total", len(batch), source="api")
+                    rows = [(code, names.get(code), now) for code in batch]
+                    with conn:
+                        conn.executemany(
+                            "INSERT OR REPLACE INTO carriers (code, name, fetched_at) VALUES (?, ?, ?)", rows
+                        )
+                    for code, name, fetched_at in rows:
+                        resolved[code] = name
+                        self._remember(code, name, fetched_at)
+                    self.stats["fetched"] += len(batch)
+            finally:
+                conn.close()
+        return resolved
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_resolver(db_path="database.db"):
+    """
+    Returns the shared resolver, creating it on first use.
+    """
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None or _resolver.db_path != db_path:
+            _resolver = AirlineResolver(db_path)
+        return _resolver
+
+
+def get_airline_name(iata_code):
+    """
+    Looks up the airline name for a given IATA code, using the shared cache before the Amadeus API.
+    """
+    return get_resolver().resolve([iata_code]).get(iata_code)
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import time
+
+import aiohttp
+
+from auth import authorized_request_async, base_url, token_manager
+from db_writer import FlightWriter
+from offer_utils import FLIGHT_OFFERS_PATH, crawl_dates, build_search_params, offers_to_flights
+from rate_limit import ApiError, amadeus_client
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 20
+
+
+async def fetch_offers(session, semaphore, tokens, origin, destination, departure_date, url, client=amadeus_client):
+    """
+    Fetches one route/day page of flight offers, bounded by the shared semaphore and
+    the client's rate and adaptive concurrency limits, with retries on throttling.
+    Returns the whole decoded response; the offers are under "data".
+    Raises ApiError if the API still answers with an error after the retries,
+    and auth.AuthError if no access token can be obtained.
+    """
+    params = build_search_params(origin, destination, departure_date)
+    with metrics.timer("stage_seconds", stage="fetch"):
+        async with semaphore:
+            response = await authorized_request_async(session, "GET", url, params=params, tokens=tokens, client=client,
+                                                      headers={"Content-Type": "application/json"})
+    if response.status != 200 or response.data is None:
+        metrics.inc("crawl_days_total", result="error")
+        raise ApiError(response.status, str(response.data))
+    metrics.inc("crawl_days_total", result="ok")
+    return response.data
+
+
+async def ingest(jobs, concurrency=DEFAULT_CONCURRENCY, db_path="database.db", tokens=None, url=None, recorder=None):
+    """
+    Crawls the whole route x date grid of `jobs` concurrently over one keep-alive
+    connection pool, writing each page with the same offer -> row mapping as main.contact_api.
+
+    `jobs` uses the same (loopAmt, origin, destination) tuples as main.jobs.
+    With a replay.ResponseRecorder every raw response is also saved for offline replay.
+    `tokens` is the auth.TokenManager to use (the shared one by default); a token the
+    API rejects mid-crawl is refreshed. Returns a dict with request/row counts and wall time.
+    """
+    url = url or f"{base_url}{FLIGHT_OFFERS_PATH}"
+    tokens = tokens or token_manager
+    # Fail before starting the writer if no token can be obtained at all
+    await tokens.get_token_async()
+
+    semaphore = asyncio.Semaphore(concurrency)
+    # The writer thread batches SQLite inserts off the event loop
+    writer = FlightWriter(db_path).start()
+    connector = aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=30)
+    stats = {"requests": 0, "errors": 0, "rows": 0}
+
+    async def crawl_day(origin, destination, departure_date):
+        try:
+            res = await fetch_offers(session, semaphore, tokens, origin, destination, departure_date, url)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, ApiError) as e:
+            stats["errors"] += 1
+            logger.warning("Error fetching %s-%s %s: %s", origin, destination, departure_date, e,
+                           extra={"route": f"{origin}-{destination}", "departure_date": departure_date})
+            return
+        finally:
+            stats["requests"] += 1
+
+        if recorder:
+            recorder.write(origin, destination, departure_date, res)
+        flights_to_insert = offers_to_flights(res.get("data", []), origin, destination)
+        writer.put(flights_to_insert)
+        stats["rows"] += len(flights_to_insert)
+        logger.debug("Queued %d flights for %s-%s %s", len(flights_to_insert), origin, destination, departure_date,
+                     extra={"route": f"{origin}-{destination}", "departure_date": departure_date,
+                            "flights": len(flights_to_insert)})
+
+    started = time.perf_counter()
+    try:
+        async with aiohttp.ClientSession(connector=connector) as session:
+            await asyncio.gather(*(
+                crawl_day(origin, destination, departure_date)
+                for loopAmt, origin, destination in jobs
+                for departure_date in crawl_dates(loopAmt)
+            ))
+    finally:
+        stats["writer"] = writer.close()
+    stats["wall_time"] = time.perf_counter() - started
+    return stats
@@ -1,17 +1,35 @@
-import requests
 import os
+import time
+import asyncio
+import logging
+import threading
 from dotenv import load_dotenv
+from rate_limit import amadeus_client
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 api_key = os.getenv("AMADEUS_API_KEY")
 api_secret = os.getenv("AMADEUS_API_SECRET")
+base_url = os.getenv("AMADEUS_BASE_URL", "https://test.api.amadeus.com")
 
-print("API Key:", api_key)
-print("API Secret:", api_secret)
+# Refresh this many seconds before the token actually expires
+TOKEN_REFRESH_MARGIN = 60
 
-def generate_access_token():
-    base_url = "https://test.api.amadeus.com/v1/security/oauth2/token"
+
+class AuthError(Exception):
+    """
+    Raised when no access token can be obtained, so requests are not sent without one.
+    """
+
+
+def request_access_token():
+    """
+    Mints a new OAuth token from the Amadeus token endpoint.
+    Returns a (token, expires_in) tuple, or (None, 0) if the request failed.
+    """
+    token_url = f"{base_url}/v1/security/oauth2/token"
     headers = {
         "Content-Type": "application/x-www-form-urlencoded"
     }
@@ -21,12 +39,119 @@ def generate_access_token():
         "client_secret": api_secret
     }
 
-    response = requests.post(base_url, headers=headers, data=data)
+    response = amadeus_client.request("POST", token_url, headers=headers, data=data)
 
     if response.status_code == 200:
-        access_token = response.json().get("access_token")
-        print("Access Token:", access_token)
-        return access_token
+        body = response.json()
+        return body.get("access_token"), int(body.get("expires_in", 0))
     else:
-        print("Error generating access token:", response.text)
-        return None
\ No newline at end of file
+        logger.error("Error generating access token: HTTP %s %s", response.status_code, response.text[:300],
+                     extra={"status": response.status_code})
+        return None, 0
+
+
+def generate_access_token():
+    access_token, _ = request_access_token()
+    return access_token
+
+
+class TokenManager:
+    """
+    Caches one access token until shortly before it expires.
+
+    Refreshes are single-flight: when many threads (or coroutines, through
+    get_token_async) find the token stale at once, only one of them calls the
+    token endpoint and the rest reuse its result. Nothing touches the network
+    until a token is first requested.
+    """
+
+    def __init__(self, fetch=request_access_token, refresh_margin=TOKEN_REFRESH_MARGIN, clock=time.monotonic):
+        self._fetch = fetch
+        self._refresh_margin = refresh_margin
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0.0
+
+    def _cached(self):
+        if self._token and self._clock() < self._expires_at:
+            return self._token
+        return None
+
+    def get_token(self):
+        token = self._cached()
+        if token:
+            return token
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            token = self._cached()
+            if token:
+                return token
+            token, expires_in = self._fetch()
+            if not token:
+                raise AuthError("could not obtain an Amadeus access token")
+            self._token = token
+            self._expires_at = self._clock() + max(expires_in - self._refresh_margin, 0)
+            return token
+
+    async def get_token_async(self):
+        token = self._cached()
+        if token:
+            return token
+        return await asyncio.get_running_loop().run_in_executor(None, self.get_token)
+
+    def invalidate(self, token=None):
+        """
+        Drops the cached token, e.g. after the API answered 401 to `token`.
+        If another caller already replaced that token, the new one is kept.
+        """
+        with self._lock:
+            if token is None or token == self._token:
+                self._token = None
+                self._expires_at = 0.0
+
+
+token_manager = TokenManager()
+
+
+def get_access_token():
+    """
+    Returns the shared cached access token, refreshing it if needed.
+    Raises AuthError if the token endpoint does not return one.
+    """
+    return token_manager.get_token()
+
+
+def _with_token(headers, token):
+    return {**(headers or {}), "Authorization": f"Bearer {token}"}
+
+
+def authorized_request(method, url, headers=None, tokens=None, client=amadeus_client, **kwargs):
+    """
+    client.request with a bearer token from `tokens` (the shared token_manager by default).
+    A 401 means the token expired or was revoked before its expires_in: it is dropped
+    and the request is sent once more with a fresh token. Raises AuthError if no token can be obtained.
+    """
+    tokens = tokens or token_manager
+    token = tokens.get_token()
+    response = client.request(method, url, headers=_with_token(headers, token), **kwargs)
+    if response.status_code == 401:
+        logger.info("Access token rejected, refreshing it", extra={"status": 401})
+        tokens.invalidate(token)
+        response = client.request(method, url, headers=_with_token(headers, tokens.get_token()), **kwargs)
+    return response
+
+
+async def authorized_request_async(session, method, url, headers=None, tokens=None, client=amadeus_client, **kwargs):
+    """
+    The aiohttp equivalent of authorized_request(); returns a rate_limit.AsyncResponse.
+    """
+    tokens = tokens or token_manager
+    token = await tokens.get_token_async()
+    response = await client.request_async(session, method, url, headers=_with_token(headers, token), **kwargs)
+    if response.status == 401:
+        logger.info("Access token rejected, refreshing it", extra={"status": 401})
+        tokens.invalidate(token)
+        token = await tokens.get_token_async()
+        response = await client.request_async(session, method, url, headers=_with_token(headers, token), **kwargs)
+    return response
@@ -0,0 +1,85 @@
+"""
+Benchmarks the threaded contact_api loop against the asyncio ingestion engine,
+both crawling the same route x date grid from a local fake_amadeus server.
+
+    python bench_ingest.py --days 31 --latency 0.05 --concurrency 20
+
+With --server-rate the fake API throttles (429 + Retry-After) above that many
+requests per second, showing the shared limiter's retries and that no crawled
+day is lost; --client-rate sets the client-side token bucket (0 = off).
+
+    python bench_ingest.py --server-rate 40 --error-rate 0.05
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+
+from fake_amadeus import start_server
+
+
+def report(name, requests_made, wall_time):
+    print(f"{name:<10} {requests_made:>6} requests  {wall_time:8.2f}s  {requests_made / wall_time:8.1f} req/s")
+
+
+def report_limits(db_path, expected_days, stats_before, client):
+    stored_days = sqlite3.connect(db_path).execute(
+        "SELECT COUNT(*) FROM (SELECT DISTINCT departure, arrival, date FROM flights)"
+    ).fetchone()[0]
+    counts = {key: client.stats[key] - stats_before[key] for key in client.stats}
+    print(f"           {stored_days}/{expected_days} days stored, {counts['retries']} retries, "
+          f"{counts['throttled']} throttled, {counts['failures']} failed, concurrency limit now {client.concurrency.limit}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingestion throughput benchmark")
+    parser.add_argument("--days", type=int, default=31)
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated API round trip in seconds")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--server-rate", type=int, default=0, help="fake API answers 429 above this many req/s")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake API requests answered with 500")
+    parser.add_argument("--client-rate", type=float, default=0, help="client-side rate limit in req/s (0 = off)")
+    parser.add_argument("--metrics", metavar="PATH", help="write the run's metrics (.prom or .json)")
+    args = parser.parse_args()
+
+    server = start_server(latency=args.latency, rate_limit=args.server_rate, error_rate=args.error_rate)
+    # auth and rate_limit read their settings at import time, so they have to be set first
+    os.environ["AMADEUS_BASE_URL"] = server.base_url
+    os.environ["AMADEUS_RATE_LIMIT"] = str(args.client_rate)
+    os.environ["AMADEUS_MAX_CONCURRENCY"] = str(args.concurrency)
+
+    from db_utils import init_db
+    from main import jobs, run_threaded
+    from async_ingest import ingest
+    from rate_limit import amadeus_client
+    from metrics import metrics, stage_summary
+
+    grid = [(args.days, origin, destination) for _, origin, destination in jobs]
+    expected_days = sum(days for days, _, _ in grid)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "threaded.db")
+        init_db(db_path)
+        stats_before = dict(amadeus_client.stats)
+        started = time.perf_counter()
+        run_threaded(grid, db_path)
+        report("threaded", server.offer_requests, time.perf_counter() - started)
+        report_limits(db_path, expected_days, stats_before, amadeus_client)
+
+        before = server.offer_requests
+        stats_before = dict(amadeus_client.stats)
+        db_path = os.path.join(tmp, "async.db")
+        init_db(db_path)
+        stats = asyncio.run(ingest(grid, concurrency=args.concurrency, db_path=db_path))
+        report("async", server.offer_requests - before, stats["wall_time"])
+        report_limits(db_path, expected_days, stats_before, amadeus_client)
+
+    print(f"token endpoint calls: {server.token_requests}, fake API throttled {server.throttled} "
+          f"and failed {server.failed} requests")
+    print(f"time by stage: {stage_summary()}")
+    if args.metrics:
+        metrics.write(args.metrics)
+
+    server.shutdown()
@@ -0,0 +1,77 @@
+"""
+Micro-benchmark for the per-offer duration parsing hot path.
+
+Compares the original uncached formatter with the memoized iso_convert
+functions, and times offers_to_flights on full offer pages.
+
+    python bench_iso.py --calls 200000
+"""
+import argparse
+import datetime
+import random
+import re
+import timeit
+
+from fake_amadeus import make_offer
+from iso_convert import format_iso8601_duration, iso8601_duration_minutes, iso8601_durations_minutes
+from offer_utils import offers_to_flights
+
+
+def legacy_format_iso8601_duration(duration_string: str) -> str:
+    # The formatter as it was before memoization, kept for comparison
+    pattern = r"^P(?:(?P<days>\d+)D)?T?(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?$"
+    match = re.match(pattern, duration_string)
+
+    if not match:
+        return "Invalid ISO 8601 duration format."
+
+    parts = {k: int(v) if v else 0 for k, v in match.groupdict().items()}
+    total_seconds = parts["days"] * 86400 + parts["hours"] * 3600 + parts["minutes"] * 60 + parts["seconds"]
+    duration_td = datetime.timedelta(seconds=total_seconds)
+    hours, remainder = divmod(duration_td.total_seconds(), 3600)
+    minutes, seconds = divmod(remainder, 60)
+
+    formatted_parts = []
+    if int(hours) > 0:
+        formatted_parts.append(f"{int(hours)} hour{'s' if int(hours) > 1 else ''}")
+    if int(minutes) > 0:
+        formatted_parts.append(f"{int(minutes)} minute{'s' if int(minutes) > 1 else ''}")
+    if int(seconds) > 0:
+        formatted_parts.append(f"{int(seconds)} second{'s' if int(seconds) > 1 else ''}")
+
+    return " ".join(formatted_parts) if formatted_parts else "0 seconds"
+
+
+def sample_durations(count):
+    # Realistic skew: a few hundred distinct flight lengths repeated across many offers
+    rng = random.Random(7)
+    return [f"PT{rng.randint(1, 16)}H{rng.choice(range(0, 60, 5))}M" for _ in range(count)]
+
+
+def report(name, seconds, calls):
+    print(f"{name:<34} {seconds * 1e9 / calls:9.0f} ns/call")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ISO 8601 duration parsing benchmark")
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--page-size", type=int, default=250)
+    args = parser.parse_args()
+
+    durations = sample_durations(args.calls)
+    mismatches = [d for d in set(durations) if legacy_format_iso8601_duration(d) != format_iso8601_duration(d)]
+    assert not mismatches, mismatches
+
+    report("legacy format_iso8601_duration", timeit.timeit(
+        lambda: [legacy_format_iso8601_duration(d) for d in durations], number=1), args.calls)
+    report("format_iso8601_duration", timeit.timeit(
+        lambda: [format_iso8601_duration(d) for d in durations], number=1), args.calls)
+    report("iso8601_duration_minutes", timeit.timeit(
+        lambda: [iso8601_duration_minutes(d) for d in durations], number=1), args.calls)
+    report("iso8601_durations_minutes (batch)", timeit.timeit(
+        lambda: iso8601_durations_minutes(durations), number=1), args.calls)
+
+    page = [make_offer("JFK", "LAX", "2025-10-01", i) for i in range(args.page_size)]
+    pages = max(args.calls // args.page_size, 1)
+    report("offers_to_flights (per offer)", timeit.timeit(
+        lambda: offers_to_flights(page, "JFK", "LAX"), number=pages), pages * args.page_size)
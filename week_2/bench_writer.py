@@ -0,0 +1,65 @@
+"""
+Measures rows/sec of db_utils.append_flight_data against the batched FlightWriter,
+with several producer threads writing small pages like the crawler does.
+
+    python bench_writer.py --threads 5 --pages 2000 --page-size 3
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from db_utils import init_db, append_flight_data
+from db_writer import FlightWriter
+
+
+def make_page(thread_id, page, page_size):
+    return [
+        {
+            "flight_number": f"XX{thread_id}{page}{i}",
+            "departure": "JFK",
+            "arrival": "LAX",
+            "date": f"2025-10-{page % 28 + 1:02d}",
+            "price": f"{100 + i}.00USD",
+            "airline": "XX",
+            "flight_time": "5 hours 50 minutes",
+        }
+        for i in range(page_size)
+    ]
+
+
+def produce(sink, thread_id, pages, page_size):
+    for page in range(pages):
+        sink(make_page(thread_id, page, page_size))
+
+
+def run(sink, threads, pages, page_size):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for future in [executor.submit(produce, sink, t, pages, page_size) for t in range(threads)]:
+            future.result()
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite write throughput benchmark")
+    parser.add_argument("--threads", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=2000, help="pages written per thread")
+    parser.add_argument("--page-size", type=int, default=3)
+    args = parser.parse_args()
+    total_rows = args.threads * args.pages * args.page_size
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "append.db")
+        init_db(db_path)
+        elapsed = run(lambda rows: append_flight_data(rows, db_path), args.threads, args.pages, args.page_size)
+        print(f"append_flight_data  {total_rows} rows  {elapsed:7.2f}s  {total_rows / elapsed:10.0f} rows/sec")
+
+        db_path = os.path.join(tmp, "writer.db")
+        init_db(db_path)
+        writer = FlightWriter(db_path).start()
+        enqueue = run(writer.put, args.threads, args.pages, args.page_size)
+        stats = writer.close()
+        print(f"FlightWriter        {stats['rows']} rows  {stats['elapsed']:7.2f}s  {stats['rows_per_sec']:10.0f} rows/sec"
+              f"  ({stats['batches']} commits, producers blocked {enqueue:.2f}s)")
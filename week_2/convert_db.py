@@ -1,18 +1,191 @@
-import sqlite3
+"""
+Exports the flights table without loading it into memory.
+
+    python convert_db.py                                  # full export to flights.csv
+    python convert_db.py --format parquet                 # flights.parquet (needs pyarrow)
+    python convert_db.py --format npz                     # flights.npz, one NumPy array per column
+    python convert_db.py --incremental --out delta.csv    # only flights added or repriced since the last run
+
+The database is opened read-only. One that is behind the current schema is
+refused; upgrade it first with `python migrate_db.py database.db`.
+
+Incremental runs remember the last exported price observation and flight
+change in export_state.json, so each run picks up the flights added, repriced
+or otherwise updated since. Deleted flights are not part of a delta.
+"""
+import argparse
 import csv
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import zipfile
+
+from db_utils import MIGRATIONS
+
+CHUNK_SIZE = 10000
+STATE_PATH = "export_state.json"
+
+
+def iter_chunks(cursor, size=CHUNK_SIZE):
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield rows
+
+
+def column_types(conn):
+    """
+    Maps each flights column to its declared SQLite type (INTEGER, REAL or TEXT).
+    """
+    return {row[1]: (row[2] or "TEXT").upper() for row in conn.execute("PRAGMA table_info(flights)")}
+
+
+def read_watermark(state_path):
+    """
+    Returns the (price observation, flight change) ids exported last, 0 for none.
+    """
+    if not os.path.exists(state_path):
+        return 0, 0
+    with open(state_path, encoding="utf8") as f:
+        state = json.load(f)
+    return state.get("last_observation_id", 0), state.get("last_change_id", 0)
+
+
+def write_watermark(state_path, watermark):
+    observation_id, change_id = watermark
+    with open(state_path, "w", encoding="utf8") as f:
+        json.dump({"last_observation_id": observation_id, "last_change_id": change_id}, f)
+
+
+def select_flights(conn, since=None):
+    """
+    Opens a cursor over the flights to export, plus the row count and the
+    (price observation, flight change) watermark covered. `since` is the
+    watermark of the previous export, None for all flights. Runs inside the
+    caller's read transaction.
+    """
+    upper = (
+        conn.execute("SELECT COALESCE(MAX(id), 0) FROM price_observations").fetchone()[0],
+        conn.execute("SELECT COALESCE(MAX(id), 0) FROM flight_changes").fetchone()[0],
+    )
+    if since is None:
+        where, params = "", ()
+    else:
+        # New and repriced flights append a price observation, any other update a flight change
+        where = """
+            WHERE id IN (SELECT flight_id FROM price_observations WHERE id > ? AND id <= ?)
+               OR id IN (SELECT flight_id FROM flight_changes WHERE id > ? AND id <= ?)
+        """
+        params = (since[0], upper[0], since[1], upper[1])
+    count = conn.execute(f"SELECT COUNT(*) FROM flights {where}", params).fetchone()[0]
+    cursor = conn.execute(f"SELECT * FROM flights {where} ORDER BY id", params)
+    return cursor, count, upper
+
+
+def export_csv(cursor, path):
+    column_names = [description[0] for description in cursor.description]
+    with open(path, 'w', newline='', encoding='utf8') as f:
+        writer = csv.writer(f)
+        writer.writerow(column_names) # this is like the first row which is the name of the columns
+        for rows in iter_chunks(cursor):
+            writer.writerows(rows)
+
+
+def export_parquet(cursor, path, types):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    column_names = [description[0] for description in cursor.description]
+    arrow_types = {"INTEGER": pa.int64(), "REAL": pa.float64()}
+    schema = pa.schema([(name, arrow_types.get(types.get(name), pa.string())) for name in column_names])
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for rows in iter_chunks(cursor):
+            # Each chunk becomes one row group
+            columns = list(zip(*rows))
+            writer.write_table(pa.table(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+            ))
+
+
+def export_npz(cursor, path, types, count, conn):
+    """
+    Writes one array per column into a compressed .npz. INTEGER columns become
+    int64 with NULL stored as -1, REAL columns float64 with NaN, and TEXT
+    columns fixed-width unicode. Columns are filled chunk by chunk through
+    disk-backed memmaps, so memory stays flat regardless of table size.
+    """
+    import numpy as np
+
+    column_names = [description[0] for description in cursor.description]
+    dtypes = {}
+    for name in column_names:
+        if types.get(name) == "INTEGER":
+            dtypes[name] = np.int64
+        elif types.get(name) == "REAL":
+            dtypes[name] = np.float64
+        else:
+            width = conn.execute(f"SELECT COALESCE(MAX(LENGTH({name})), 1) FROM flights").fetchone()[0]
+            dtypes[name] = f"U{max(width, 1)}"
+    nulls = {name: -1 if dtypes[name] is np.int64 else np.nan if dtypes[name] is np.float64 else ""
+             for name in column_names}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        arrays = {
+            name: np.lib.format.open_memmap(os.path.join(tmp, f"{name}.npy"), mode="w+",
+                                            dtype=dtypes[name], shape=(count,))
+            for name in column_names
+        }
+        offset = 0
+        for rows in iter_chunks(cursor):
+            for position, name in enumerate(column_names):
+                null = nulls[name]
+                arrays[name][offset:offset + len(rows)] = [
+                    null if row[position] is None else row[position] for row in rows
+                ]
+            offset += len(rows)
+        for array in arrays.values():
+            array.flush()
+        del arrays
+
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+            for name in column_names:
+                archive.write(os.path.join(tmp, f"{name}.npy"), arcname=f"{name}.npy")
 
-conn = sqlite3.connect('database.db')
-cursor = conn.cursor()
 
-cursor.execute('SELECT * FROM flights')
-rows = cursor.fetchall()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the flights table")
+    parser.add_argument("--db", default="database.db")
+    parser.add_argument("--format", choices=["csv", "parquet", "npz"], default="csv")
+    parser.add_argument("--out", help="output file (default: flights.<format>)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="export only flights added or updated since the last incremental run")
+    parser.add_argument("--state", default=STATE_PATH, help="where the incremental watermark is kept")
+    args = parser.parse_args()
+    out = args.out or f"flights.{args.format}"
 
-column_names = [description[0] for description in cursor.description]
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version < len(MIGRATIONS):
+        # The export relies on the typed columns and the change logs; it never writes to the database
+        sys.exit(f"{args.db} is at schema version {version} of {len(MIGRATIONS)}; "
+                 f"run python migrate_db.py {args.db} first")
+    # One read transaction so the count, the rows and the watermark come from the same snapshot
+    conn.execute("BEGIN")
+    since = read_watermark(args.state) if args.incremental else None
+    cursor, count, upper = select_flights(conn, since)
 
-with open('flights.csv','w', newline='',encoding='utf8') as f:
-    writer = csv.writer(f)
-    writer.writerow(column_names) # this is like the first row which is the name of the columns 
-    writer.writerows(rows)
+    if args.format == "csv":
+        export_csv(cursor, out)
+    elif args.format == "parquet":
+        export_parquet(cursor, out, column_types(conn))
+    else:
+        export_npz(cursor, out, column_types(conn), count, conn)
+    conn.rollback()
+    conn.close()
 
-print("Exported flights to a csv file successfully")
-conn.close()
+    if args.incremental:
+        write_watermark(args.state, upper)
+    print(f"Exported {count} flights to a {args.format} file successfully")
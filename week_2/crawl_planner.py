@@ -0,0 +1,298 @@
+"""
+Persistent, resumable crawl queue for the flight-offers crawler.
+
+The planner keeps one crawl_tasks row per route-day and, under a request
+budget, schedules the days most worth refetching: never-crawled days first,
+then by staleness (hours since the day was last crawled) weighted by how often
+its fares have changed price so far. Workers lease scheduled tasks in priority
+order and commit each batch's fares together with marking its tasks done.
+A lease that is not completed in time (a crashed worker) goes back to the
+queue, so a crawl resumes where it stopped, and any number of worker processes
+sharing the database file can drain the queue at the same time.
+
+    python crawl_planner.py plan --days 60 --budget 200
+    python crawl_planner.py work --threads 5      # start as many as you like
+    python crawl_planner.py status
+"""
+import argparse
+import logging
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import requests
+
+from auth import AuthError
+from db_utils import connect, flight_blobs, flight_to_row, init_db, upsert_flights
+from metrics import metrics, setup_logging, stage_summary
+from offer_archive import store_blobs
+from offer_utils import offers_to_flights
+from rate_limit import ApiError
+
+DEFAULT_HORIZON_DAYS = 31
+DEFAULT_BUDGET = 200
+# Days crawled more recently than this are not rescheduled, however volatile
+DEFAULT_MIN_AGE = 3600
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_BATCH_SIZE = 10
+MAX_ATTEMPTS = 3
+# Ranks above any staleness score
+NEVER_CRAWLED = 1e12
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def immediate(conn):
+    """
+    Runs the block in a BEGIN IMMEDIATE transaction, so concurrent planners and
+    workers queue up on the write lock instead of failing mid-transaction.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def route_days(routes, start, days):
+    """
+    Yields (origin, destination, departure_date) for `days` days from `start`.
+    """
+    for origin, destination in routes:
+        for offset in range(days):
+            yield origin, destination, (start + timedelta(days=offset)).isoformat()
+
+
+def fare_history(conn, since_date):
+    """
+    Summarizes price_observations per route-day from `since_date` on.
+    Returns {(origin, destination, date): (last_observed_epoch, price_changes_per_fare)}.
+    """
+    rows = conn.execute("""
+        SELECT f.departure, f.arrival, f.date,
+               MAX(CAST(strftime('%s', o.observed_at) AS REAL)),
+               COUNT(*), COUNT(DISTINCT f.id)
+        FROM flights AS f
+        JOIN price_observations AS o ON o.flight_id = f.id
+        WHERE f.date >= ?
+        GROUP BY f.departure, f.arrival, f.date
+    """, (since_date,))
+    return {
+        (origin, destination, day): (last_observed, (observations - fares) / fares)
+        for origin, destination, day, last_observed, observations, fares in rows
+    }
+
+
+def crawl_priority(last_crawled, volatility, now):
+    """
+    Staleness in hours, weighted up by the route-day's observed price changes per fare.
+    """
+    if last_crawled is None:
+        return NEVER_CRAWLED
+    return max(now - last_crawled, 0) / 3600 * (1 + volatility)
+
+
+def plan(conn, routes, start=None, days=DEFAULT_HORIZON_DAYS, budget=DEFAULT_BUDGET,
+         min_age=DEFAULT_MIN_AGE, now=None):
+    """
+    Registers every route-day in the horizon and schedules the `budget`
+    highest-priority ones, replacing the previous schedule (leased tasks are left alone).
+    Returns counts of known, scheduled and never-crawled route-days.
+    """
+    now = time.time() if now is None else now
+    start = start or date.today()
+    wanted = set(route_days(routes, start, days))
+    with metrics.timer("stage_seconds", stage="plan"), immediate(conn):
+        conn.executemany(
+            "INSERT OR IGNORE INTO crawl_tasks (origin, destination, departure_date) VALUES (?, ?, ?)", wanted
+        )
+        history = fare_history(conn, start.isoformat())
+        candidates = []
+        for task_id, origin, destination, day, last_crawled in conn.execute("""
+            SELECT id, origin, destination, departure_date, last_crawled
+            FROM crawl_tasks
+            WHERE departure_date >= ? AND status != 'leased'
+        """, (start.isoformat(),)):
+            key = (origin, destination, day)
+            if key not in wanted:
+                continue
+            last_observed, volatility = history.get(key, (None, 0.0))
+            last_crawled = last_crawled if last_crawled is not None else last_observed
+            if last_crawled is not None and now - last_crawled < min_age:
+                continue
+            candidates.append((crawl_priority(last_crawled, volatility, now), task_id))
+
+        candidates.sort(reverse=True)
+        scheduled = candidates[:budget]
+        conn.execute("UPDATE crawl_tasks SET status = 'idle', priority = 0 WHERE status = 'pending'")
+        conn.executemany(
+            "UPDATE crawl_tasks SET status = 'pending', priority = ?, attempts = 0, last_error = NULL WHERE id = ?",
+            scheduled
+        )
+    return {
+        "known": len(wanted),
+        "scheduled": len(scheduled),
+        "never_crawled": sum(1 for priority, _ in scheduled if priority >= NEVER_CRAWLED),
+    }
+
+
+def lease(conn, worker_id, limit=DEFAULT_BATCH_SIZE, lease_seconds=DEFAULT_LEASE_SECONDS, now=None):
+    """
+    Atomically claims up to `limit` runnable tasks for `worker_id`: scheduled ones,
+    and ones whose lease expired because their worker died. Tasks that already used
+    MAX_ATTEMPTS are marked failed instead. Returns (id, origin, destination, date) rows.
+    """
+    now = time.time() if now is None else now
+    with metrics.timer("stage_seconds", stage="lease"), immediate(conn):
+        conn.execute("""
+            UPDATE crawl_tasks SET status = 'failed', lease_owner = NULL, last_error = 'lease expired'
+            WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?
+        """, (now, MAX_ATTEMPTS))
+        return conn.execute("""
+            UPDATE crawl_tasks
+            SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1
+            WHERE id IN (
+                SELECT id FROM crawl_tasks
+                WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)
+                ORDER BY priority DESC
+                LIMIT ?
+            )
+            RETURNING id, origin, destination, departure_date
+        """, (worker_id, now + lease_seconds, now, limit)).fetchall()
+
+
+def finish(conn, worker_id, done, failed, rows=(), blobs=(), now=None):
+    """
+    Stores a batch's fares and settles its tasks in one transaction, so a task is
+    never marked done without its data. `done` holds task ids, `failed` (id, error) pairs;
+    tasks whose lease was taken over by another worker are left to that worker.
+    """
+    now = time.time() if now is None else now
+    with metrics.timer("stage_seconds", stage="write"), immediate(conn):
+        store_blobs(conn, blobs)
+        upsert_flights(conn, rows)
+        conn.executemany("""
+            UPDATE crawl_tasks
+            SET status = 'idle', priority = 0, lease_owner = NULL, lease_expires = NULL,
+                last_crawled = ?, last_error = NULL
+            WHERE id = ? AND lease_owner = ?
+        """, [(now, task_id, worker_id) for task_id in done])
+        conn.executemany("""
+            UPDATE crawl_tasks
+            SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                lease_owner = NULL, lease_expires = NULL, last_error = ?
+            WHERE id = ? AND lease_owner = ?
+        """, [(MAX_ATTEMPTS, error[:300], task_id, worker_id) for task_id, error in failed])
+    metrics.inc("crawl_tasks_total", len(done), result="done")
+    metrics.inc("crawl_tasks_total", len(failed), result="failed")
+
+
+def queue_status(conn):
+    """
+    Returns {status: task count} for the whole queue.
+    """
+    return dict(conn.execute("SELECT status, COUNT(*) FROM crawl_tasks GROUP BY status").fetchall())
+
+
+def run_worker(db_path="database.db", worker_id=None, batch_size=DEFAULT_BATCH_SIZE, threads=5,
+               lease_seconds=DEFAULT_LEASE_SECONDS, recorder=None):
+    """
+    Leases and crawls tasks until the queue is drained, fetching each batch on
+    `threads` threads through the shared rate limiter. Returns task and row counts.
+    """
+    from main import fetch_day
+
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    stats = {"tasks": 0, "failed": 0, "rows": 0}
+    conn = connect(db_path)
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            while True:
+                tasks = lease(conn, worker_id, batch_size, lease_seconds)
+                if not tasks:
+                    break
+                futures = [(task, executor.submit(fetch_day, *task[1:], recorder)) for task in tasks]
+                done, failed, rows, blobs = [], [], [], []
+                for (task_id, origin, destination, day), future in futures:
+                    # A task that can't be fetched or parsed fails on its own; the rest of the batch is still stored
+                    try:
+                        res = future.result()
+                        flights = offers_to_flights(res.get("data", []), origin, destination)
+                        task_rows = [flight_to_row(flight) for flight in flights]
+                        task_blobs = flight_blobs(flights)
+                    except (ApiError, AuthError, requests.RequestException,
+                            KeyError, TypeError, ValueError, AttributeError) as e:
+                        failed.append((task_id, f"{type(e).__name__}: {e}"))
+                        logger.warning("Error fetching %s-%s %s: %s", origin, destination, day, e,
+                                       extra={"route": f"{origin}-{destination}", "departure_date": day,
+                                              "worker": worker_id})
+                        continue
+                    rows.extend(task_rows)
+                    blobs.extend(task_blobs)
+                    done.append(task_id)
+                finish(conn, worker_id, done, failed, rows, blobs)
+                stats["tasks"] += len(done)
+                stats["failed"] += len(failed)
+                stats["rows"] += len(rows)
+                logger.info("%s: stored %d flights for %d route-days, %d failed",
+                            worker_id, len(rows), len(done), len(failed),
+                            extra={"worker": worker_id, "rows": len(rows), "done": len(done), "failed": len(failed)})
+    finally:
+        conn.close()
+    return stats
+
+
+def parse_route(text):
+    origin, destination = text.upper().split("-")
+    return origin, destination
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plan and drain the persistent crawl queue")
+    parser.add_argument("command", choices=["plan", "work", "status"])
+    parser.add_argument("--db", default="database.db")
+    parser.add_argument("--route", action="append", type=parse_route, metavar="JFK-LAX",
+                        help="route to plan (repeatable); defaults to the routes in main.jobs")
+    parser.add_argument("--start", type=date.fromisoformat, default=None, help="first departure date (default today)")
+    parser.add_argument("--days", type=int, default=DEFAULT_HORIZON_DAYS)
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET, help="route-days to schedule")
+    parser.add_argument("--min-age", type=float, default=DEFAULT_MIN_AGE, help="seconds before a day is refetched")
+    parser.add_argument("--worker-id", default=None)
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH_SIZE, help="tasks leased at a time")
+    parser.add_argument("--threads", type=int, default=5)
+    parser.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS, help="lease length in seconds")
+    parser.add_argument("--metrics", metavar="PATH", help="write metrics on exit (.prom for Prometheus text, else JSON)")
+    parser.add_argument("--metrics-port", type=int, help="serve live metrics on http://127.0.0.1:PORT/metrics")
+    args = parser.parse_args()
+
+    setup_logging()
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+
+    init_db(args.db)
+    if args.command == "plan":
+        routes = args.route
+        if not routes:
+            from main import jobs
+            routes = [(origin, destination) for _, origin, destination in jobs]
+        conn = connect(args.db)
+        result = plan(conn, routes, args.start, args.days, args.budget, args.min_age)
+        conn.close()
+        print(f"Scheduled {result['scheduled']} of {result['known']} route-days "
+              f"({result['never_crawled']} never crawled)")
+    elif args.command == "work":
+        stats = run_worker(args.db, args.worker_id, args.batch, args.threads, args.lease)
+        print(f"Crawled {stats['tasks']} route-days ({stats['rows']} flights), {stats['failed']} failed")
+        logger.info("Time by stage: %s", stage_summary())
+    else:
+        conn = connect(args.db)
+        print(queue_status(conn))
+        conn.close()
+    if args.metrics:
+        metrics.write(args.metrics)
@@ -1,12 +1,498 @@
+import json
+import re
 import sqlite3
+from decimal import Decimal, InvalidOperation
+
+from offer_archive import OFFER_BLOBS_TABLE_SQL, decompress, store_blobs
+
+# Upsert on the natural key; the WHERE clause skips rows whose values did not change,
+# so a re-crawl only writes (and records history for) fares that actually moved
+UPSERT_FLIGHT_SQL = """
+    INSERT INTO flights (flight_number, departure, arrival, date, price, airline, flight_time,
+                         price_cents, currency, duration_minutes, raw_hash, departure_at, arrival_at, stops,
+                         airline_full_name)
+    VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9, ?10, ?11, ?12, ?13, ?14, (SELECT name FROM carriers WHERE code = ?6))
+    ON CONFLICT (flight_number, departure, arrival, date) DO UPDATE SET
+        price = excluded.price,
+        airline = excluded.airline,
+        airline_full_name = excluded.airline_full_name,
+        flight_time = excluded.flight_time,
+        price_cents = excluded.price_cents,
+        currency = excluded.currency,
+        duration_minutes = excluded.duration_minutes,
+        raw_hash = COALESCE(excluded.raw_hash, flights.raw_hash),
+        departure_at = COALESCE(excluded.departure_at, flights.departure_at),
+        arrival_at = COALESCE(excluded.arrival_at, flights.arrival_at),
+        stops = COALESCE(excluded.stops, flights.stops)
+    WHERE flights.price IS NOT excluded.price
+       OR flights.airline IS NOT excluded.airline
+       OR flights.flight_time IS NOT excluded.flight_time
+       OR (excluded.departure_at IS NOT NULL AND flights.departure_at IS NOT excluded.departure_at)
+       OR (excluded.arrival_at IS NOT NULL AND flights.arrival_at IS NOT excluded.arrival_at)
+       OR (excluded.stops IS NOT NULL AND flights.stops IS NOT excluded.stops)
+       OR (excluded.raw_hash IS NOT NULL AND flights.raw_hash IS NOT excluded.raw_hash)
+"""
+
+# Per route-day fare summary read by the app's calendar view; one indexed range read per month
+FARE_CALENDAR_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS fare_calendar (
+        departure TEXT NOT NULL,
+        arrival TEXT NOT NULL,
+        date TEXT NOT NULL,
+        min_cents INTEGER NOT NULL,
+        median_cents INTEGER NOT NULL,
+        max_cents INTEGER NOT NULL,
+        direct_min_cents INTEGER,
+        fares INTEGER NOT NULL,
+        PRIMARY KEY (departure, arrival, date)
+    ) WITHOUT ROWID
+"""
+
+# Recomputes the summary rows from the priced fares; {where} narrows it to one route-day.
+# The median averages the two middle prices when a day has an even number of fares
+FARE_CALENDAR_SUMMARY_SQL = """
+    INSERT OR REPLACE INTO fare_calendar
+        (departure, arrival, date, min_cents, median_cents, max_cents, direct_min_cents, fares)
+    SELECT departure, arrival, date,
+           MIN(price_cents),
+           CAST(round(AVG(CASE WHEN position IN ((fares + 1) / 2, (fares + 2) / 2) THEN price_cents END)) AS INTEGER),
+           MAX(price_cents),
+           MIN(CASE WHEN stops = 0 THEN price_cents END),
+           fares
+    FROM (
+        SELECT departure, arrival, date, price_cents, stops,
+               ROW_NUMBER() OVER (PARTITION BY departure, arrival, date ORDER BY price_cents) AS position,
+               COUNT(*) OVER (PARTITION BY departure, arrival, date) AS fares
+        FROM flights
+        WHERE price_cents IS NOT NULL {where}
+    )
+    GROUP BY departure, arrival, date
+"""
+
+PRICE_PATTERN = re.compile(r"^\s*([0-9]+(?:\.[0-9]+)?)\s*([A-Z]{3})?\s*$")
+FLIGHT_TIME_PATTERN = re.compile(r"(\d+)\s+(hour|minute|second)s?")
+
+
+def connect(db_path="database.db"):
+    """
+    Opens a connection tuned for bulk ingestion: WAL journaling so readers are
+    never blocked by the writer, and relaxed syncing that is still crash-safe in WAL mode.
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")
+    return conn
+
+
+def parse_price_cents(price):
+    """
+    Converts a stored price such as "116.52USD" or "116.52" into integer cents.
+    Returns None if the text is not a price.
+    """
+    match = PRICE_PATTERN.match(price or "")
+    if not match:
+        return None
+    try:
+        return int(Decimal(match.group(1)) * 100)
+    except InvalidOperation:
+        return None
+
+
+def parse_price_currency(price):
+    """
+    Returns the ISO currency suffix of a stored price such as "116.52USD", or None.
+    """
+    match = PRICE_PATTERN.match(price or "")
+    return match.group(2) if match else None
+
+
+def parse_flight_time_minutes(flight_time):
+    """
+    Converts a formatted duration such as "5 hours 50 minutes" into whole minutes.
+    Returns None if the text holds no duration.
+    """
+    parts = FLIGHT_TIME_PATTERN.findall(flight_time or "")
+    if not parts:
+        return None
+    factors = {"hour": 60, "minute": 1, "second": 1 / 60}
+    return int(sum(int(value) * factors[unit] for value, unit in parts))
+
+
+def flight_to_row(flight):
+    """
+    Orders a flight dictionary into the parameter tuple used by UPSERT_FLIGHT_SQL.
+    """
+    return (
+        flight.get("flight_number"),
+        flight.get("departure"),
+        flight.get("arrival"),
+        flight.get("date"),
+        flight.get("price"),
+        flight.get("airline"),
+        flight.get("flight_time"),
+        flight.get("price_cents"),
+        flight.get("currency"),
+        flight.get("duration_minutes"),
+        flight["raw"][0] if flight.get("raw") else None,
+        flight.get("departure_at"),
+        flight.get("arrival_at"),
+        flight.get("stops"),
+    )
+
+
+def flight_blobs(flights):
+    """
+    Returns the distinct offer_blobs rows carried by a list of flight dictionaries.
+    """
+    return list({flight["raw"][0]: flight["raw"] for flight in flights if flight.get("raw")}.values())
+
+
+def upsert_flights(conn, rows):
+    """
+    Upserts already-ordered row tuples in one executemany call and, if any row
+    changed, refreshes the fare_calendar rows of the route-days involved.
+    The caller commits. Returns the number of rows that were inserted or actually changed.
+    """
+    changed = conn.executemany(UPSERT_FLIGHT_SQL, rows).rowcount
+    if changed:
+        refresh_fare_calendar(conn, {row[1:4] for row in rows})
+    return changed
+
+
+def refresh_fare_calendar(conn, keys):
+    """
+    Recomputes fare_calendar for the given (departure, arrival, date) keys, each
+    from its own rows through the route/date index. The caller commits.
+    """
+    keys = list(keys)
+    conn.executemany("DELETE FROM fare_calendar WHERE departure = ? AND arrival = ? AND date = ?", keys)
+    conn.executemany(
+        FARE_CALENDAR_SUMMARY_SQL.format(where="AND departure = ? AND arrival = ? AND date = ?"), keys
+    )
+
+
+def _column_names(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _migrate_typed_fares(conn):
+    """
+    Adds numeric price/duration columns, backfills them from the text columns
+    and indexes the (departure, arrival, date) lookup used by the app.
+    """
+    columns = _column_names(conn, "flights")
+    for name, sql_type in [("price_cents", "INTEGER"), ("currency", "TEXT"),
+                           ("duration_minutes", "INTEGER"), ("airline_full_name", "TEXT")]:
+        if name not in columns:
+            conn.execute(f"ALTER TABLE flights ADD COLUMN {name} {sql_type}")
+
+    conn.create_function("parse_price_cents", 1, parse_price_cents, deterministic=True)
+    conn.create_function("parse_price_currency", 1, parse_price_currency, deterministic=True)
+    conn.create_function("parse_flight_time_minutes", 1, parse_flight_time_minutes, deterministic=True)
+    conn.execute("""
+        UPDATE flights
+        SET price_cents = parse_price_cents(price),
+            currency = parse_price_currency(price),
+            duration_minutes = parse_flight_time_minutes(flight_time)
+        WHERE price_cents IS NULL OR duration_minutes IS NULL
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_flights_route_date ON flights (departure, arrival, date)")
+
+
+def _migrate_natural_key(conn):
+    """
+    Makes (flight_number, departure, arrival, date) unique so ingestion can upsert,
+    and starts an append-only price history fed by triggers on flights.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS price_observations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            flight_id INTEGER NOT NULL,
+            price_cents INTEGER,
+            currency TEXT,
+            observed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now'))
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_price_observations_flight ON price_observations (flight_id)")
+
+    # Keep every price seen so far as history, then collapse duplicates onto the newest row
+    if not conn.execute("SELECT 1 FROM price_observations LIMIT 1").fetchone():
+        conn.execute("""
+            INSERT INTO price_observations (flight_id, price_cents, currency)
+            SELECT keep.id, f.price_cents, f.currency
+            FROM flights AS f
+            JOIN (
+                SELECT MAX(id) AS id, flight_number, departure, arrival, date
+                FROM flights
+                GROUP BY flight_number, departure, arrival, date
+            ) AS keep USING (flight_number, departure, arrival, date)
+            ORDER BY f.id
+        """)
+    conn.execute("""
+        DELETE FROM flights
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM flights GROUP BY flight_number, departure, arrival, date
+        )
+    """)
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_flights_natural_key
+        ON flights (flight_number, departure, arrival, date)
+    """)
+
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS flights_price_inserted AFTER INSERT ON flights
+        BEGIN
+            INSERT INTO price_observations (flight_id, price_cents, currency)
+            VALUES (NEW.id, NEW.price_cents, NEW.currency);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS flights_price_changed AFTER UPDATE OF price_cents, currency ON flights
+        WHEN OLD.price_cents IS NOT NEW.price_cents OR OLD.currency IS NOT NEW.currency
+        BEGIN
+            INSERT INTO price_observations (flight_id, price_cents, currency)
+            VALUES (NEW.id, NEW.price_cents, NEW.currency);
+        END
+    """)
+
+
+# Airline names resolved from the reference-data API; name is NULL for codes the API does not know
+CARRIERS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS carriers (
+        code TEXT PRIMARY KEY,
+        name TEXT,
+        fetched_at REAL NOT NULL
+    )
+"""
+
+
+def _migrate_carriers(conn):
+    """
+    Adds the carriers lookup table used to cache and join airline names.
+    """
+    conn.execute(CARRIERS_TABLE_SQL)
+
+
+def enrich_airline_names(conn):
+    """
+    Fills airline_full_name from the carriers table in one set-based UPDATE,
+    touching only rows that are still missing a name. Returns the number of rows updated.
+    """
+    return conn.execute("""
+        UPDATE flights
+        SET airline_full_name = (SELECT name FROM carriers WHERE carriers.code = flights.airline)
+        WHERE airline_full_name IS NULL
+          AND airline IN (SELECT code FROM carriers WHERE name IS NOT NULL)
+    """).rowcount
+
+
+def _migrate_airline_enrichment(conn):
+    """
+    Keeps airline_full_name filled without a separate pass: new flights pick the
+    name up in the upsert itself, and a newly resolved carrier fills in every
+    flight that was waiting on it. A partial index keeps the unnamed rows cheap to find.
+    """
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_flights_unnamed_airline
+        ON flights (airline) WHERE airline_full_name IS NULL
+    """)
+    for event in ["INSERT", "UPDATE OF name"]:
+        trigger = "carriers_named_" + event.split()[0].lower()
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {trigger} AFTER {event} ON carriers
+            WHEN NEW.name IS NOT NULL
+            BEGIN
+                UPDATE flights SET airline_full_name = NEW.name
+                WHERE airline = NEW.code AND airline_full_name IS NULL;
+            END
+        """)
+    enrich_airline_names(conn)
+
+
+def _migrate_offer_archive(conn):
+    """
+    Adds the content-addressed raw offer store and links fares and price
+    history to it; the history triggers are recreated to record the offer hash.
+    """
+    conn.execute(OFFER_BLOBS_TABLE_SQL)
+    for table in ["flights", "price_observations"]:
+        if "raw_hash" not in _column_names(conn, table):
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN raw_hash TEXT")
+    conn.execute("DROP TRIGGER IF EXISTS flights_price_inserted")
+    conn.execute("DROP TRIGGER IF EXISTS flights_price_changed")
+    conn.execute("""
+        CREATE TRIGGER flights_price_inserted AFTER INSERT ON flights
+        BEGIN
+            INSERT INTO price_observations (flight_id, price_cents, currency, raw_hash)
+            VALUES (NEW.id, NEW.price_cents, NEW.currency, NEW.raw_hash);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER flights_price_changed AFTER UPDATE OF price_cents, currency ON flights
+        WHEN OLD.price_cents IS NOT NEW.price_cents OR OLD.currency IS NOT NEW.currency
+        BEGIN
+            INSERT INTO price_observations (flight_id, price_cents, currency, raw_hash)
+            VALUES (NEW.id, NEW.price_cents, NEW.currency, NEW.raw_hash);
+        END
+    """)
+
+
+# One row per route-day the crawler knows about. status is idle, pending (scheduled by
+# the planner), leased (held by a worker until lease_expires) or failed; times are epoch seconds
+CRAWL_TASKS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS crawl_tasks (
+        id INTEGER PRIMARY KEY,
+        origin TEXT NOT NULL,
+        destination TEXT NOT NULL,
+        departure_date TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'idle',
+        priority REAL NOT NULL DEFAULT 0,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        lease_owner TEXT,
+        lease_expires REAL,
+        last_crawled REAL,
+        last_error TEXT,
+        UNIQUE (origin, destination, departure_date)
+    )
+"""
+
+
+def _migrate_crawl_tasks(conn):
+    """
+    Adds the persistent crawl queue used by crawl_planner, indexed for leasing
+    the highest-priority runnable task.
+    """
+    conn.execute(CRAWL_TASKS_TABLE_SQL)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_crawl_tasks_runnable ON crawl_tasks (status, priority DESC)")
+
+
+def _migrate_itinerary_times(conn):
+    """
+    Adds local departure/arrival times and the number of stops of each fare,
+    backfilled from the archived offers where they are stored, and indexes the
+    two lookups of the app's one-stop connection search: legs leaving an
+    airport on a day, and legs of a route leaving within a time window.
+    """
+    from offer_utils import itinerary_times
+
+    columns = _column_names(conn, "flights")
+    for name, sql_type in [("departure_at", "TEXT"), ("arrival_at", "TEXT"), ("stops", "INTEGER")]:
+        if name not in columns:
+            conn.execute(f"ALTER TABLE flights ADD COLUMN {name} {sql_type}")
+
+    rows = []
+    for flight_id, codec, payload in conn.execute("""
+        SELECT f.id, b.codec, b.payload
+        FROM flights AS f
+        JOIN offer_blobs AS b ON b.hash = f.raw_hash
+        WHERE f.departure_at IS NULL
+    """):
+        try:
+            rows.append(itinerary_times(json.loads(decompress(codec, payload))) + (flight_id,))
+        except (KeyError, IndexError, TypeError, ValueError):
+            continue
+    conn.executemany("UPDATE flights SET departure_at = ?, arrival_at = ?, stops = ? WHERE id = ?", rows)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_flights_departure_date ON flights (departure, date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_flights_route_departure_at ON flights (departure, arrival, departure_at)")
+
+
+def _migrate_fare_calendar(conn):
+    """
+    Adds the fare_calendar summary table and fills it from every stored fare;
+    from then on upsert_flights keeps it current.
+    """
+    conn.execute(FARE_CALENDAR_TABLE_SQL)
+    conn.execute(FARE_CALENDAR_SUMMARY_SQL.format(where=""))
+
+
+def _migrate_keyset_indexes(conn):
+    """
+    Indexes each sort order of fare_api's keyset-paginated /flights, so a page is
+    a seek to the cursor instead of a sort of the route's whole date range. The
+    date-ordered one starts with (departure, arrival, date) and replaces idx_flights_route_date.
+    """
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_flights_route_date_price
+        ON flights (departure, arrival, date, price_cents, id)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_flights_route_price_date
+        ON flights (departure, arrival, price_cents, date, id)
+    """)
+    conn.execute("DROP INDEX IF EXISTS idx_flights_route_date")
+
+
+def _migrate_flight_changes(conn):
+    """
+    Logs every changed or deleted fare in flight_changes. price_observations only
+    sees inserts and price changes, so readers that stay in sync incrementally
+    (fare_index, convert_db --incremental) also need the updates that leave the
+    price alone, such as airline names from the carriers triggers or stops from a re-crawl.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS flight_changes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            flight_id INTEGER NOT NULL,
+            changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now'))
+        )
+    """)
+    # Compares every column, so a migration that adds one to flights must recreate this trigger
+    columns = sorted(_column_names(conn, "flights"))
+    old_row = ", ".join(f"OLD.{column}" for column in columns)
+    new_row = ", ".join(f"NEW.{column}" for column in columns)
+    conn.execute("DROP TRIGGER IF EXISTS flights_row_changed")
+    conn.execute(f"""
+        CREATE TRIGGER flights_row_changed AFTER UPDATE ON flights
+        WHEN ({old_row}) IS NOT ({new_row})
+        BEGIN
+            INSERT INTO flight_changes (flight_id) VALUES (NEW.id);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS flights_row_deleted AFTER DELETE ON flights
+        BEGIN
+            INSERT INTO flight_changes (flight_id) VALUES (OLD.id);
+        END
+    """)
+
+
+# Applied in order; PRAGMA user_version records how many have run on a database
+MIGRATIONS = [
+    _migrate_typed_fares,
+    _migrate_natural_key,
+    _migrate_carriers,
+    _migrate_airline_enrichment,
+    _migrate_offer_archive,
+    _migrate_crawl_tasks,
+    _migrate_itinerary_times,
+    _migrate_fare_calendar,
+    _migrate_keyset_indexes,
+    _migrate_flight_changes,
+]
+
+
+def migrate(conn):
+    """
+    Brings an existing database up to the current schema in place.
+    Returns the (old, new) schema versions.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        with conn:
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+    return version, len(MIGRATIONS)
+
 
 def init_db(db_path="database.db"):
     """
-    Initializes the SQLite database and creates the flights table if it doesn't exist.
+    Initializes the SQLite database, creating the flights table if it doesn't exist
+    and migrating an existing one in place. Existing fares are kept; ingestion upserts.
     """
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
-    cursor.execute("DROP TABLE IF EXISTS flights")
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS flights (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -16,10 +502,19 @@ def init_db(db_path="database.db"):
             date TEXT,
             price TEXT,
             airline TEXT,
-            flight_time TEXT
+            flight_time TEXT,
+            airline_full_name TEXT,
+            price_cents INTEGER,
+            currency TEXT,
+            duration_minutes INTEGER,
+            raw_hash TEXT,
+            departure_at TEXT,
+            arrival_at TEXT,
+            stops INTEGER
         )
     """)
     conn.commit()
+    migrate(conn)
     conn.close()
 
 def append_flight_data(flight_data, db_path="database.db"):
@@ -31,20 +526,7 @@ def append_flight_data(flight_data, db_path="database.db"):
         return
 
     conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    for flight in flight_data:
-        cursor.execute("""
-            INSERT INTO flights (flight_number, departure, arrival, date, price, airline, flight_time)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-            flight.get("flight_number"),
-            flight.get("departure"),
-            flight.get("arrival"),
-            flight.get("date"),
-            flight.get("price"),
-            flight.get("airline"),
-            flight.get("flight_time"),
-        ))
+    store_blobs(conn, flight_blobs(flight_data))
+    upsert_flights(conn, [flight_to_row(flight) for flight in flight_data])
     conn.commit()
-    conn.close()
\ No newline at end of file
+    conn.close()
@@ -0,0 +1,136 @@
+import queue
+import threading
+import time
+
+from db_utils import connect, flight_blobs, flight_to_row, upsert_flights
+from metrics import metrics
+from offer_archive import store_blobs
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+_STOP = object()
+
+
+class FlightWriter:
+    """
+    Single writer stage for the flights table.
+
+    Ingest threads and coroutines hand pages of flight dictionaries to put(),
+    which only enqueues them. A background thread owns the one SQLite
+    connection, groups queued rows into executemany transactions and commits
+    once `batch_size` rows are pending or `flush_interval` seconds have passed.
+
+        with FlightWriter("database.db") as writer:
+            writer.put(flights_to_insert)
+        print(writer.stats)
+    """
+
+    def __init__(self, db_path="database.db", batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stats = {"rows": 0, "changed": 0, "batches": 0, "commit_seconds": 0.0, "elapsed": 0.0, "rows_per_sec": 0.0}
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="flight-writer", daemon=True)
+        self._error = None
+        self._started_at = None
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def put(self, flight_data):
+        """
+        Queues a list of flight dictionaries for writing. Never blocks on disk.
+        """
+        if self._error:
+            raise self._error
+        if flight_data:
+            self._queue.put(flight_data)
+
+    def put_rows(self, rows, blobs=()):
+        """
+        Queues rows already mapped with flight_to_row, plus their offer blobs,
+        for producers that do the mapping elsewhere (such as replay's worker processes).
+        """
+        if self._error:
+            raise self._error
+        if rows:
+            self._queue.put((rows, blobs))
+
+    def close(self):
+        """
+        Flushes everything still queued, stops the writer thread and returns its stats.
+        """
+        self._queue.put(_STOP)
+        self._thread.join()
+        self.stats["elapsed"] = time.perf_counter() - self._started_at
+        if self.stats["elapsed"] > 0:
+            self.stats["rows_per_sec"] = self.stats["rows"] / self.stats["elapsed"]
+            metrics.set("writer_rows_per_second", self.stats["rows_per_sec"])
+        if self._error:
+            raise self._error
+        return self.stats
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _flush(self, conn, pending, blobs):
+        started = time.perf_counter()
+        with conn:
+            store_blobs(conn, blobs)
+            changed = upsert_flights(conn, pending)
+        elapsed = time.perf_counter() - started
+        self.stats["changed"] += changed
+        self.stats["commit_seconds"] += elapsed
+        self.stats["rows"] += len(pending)
+        self.stats["batches"] += 1
+        metrics.observe("db_commit_seconds", elapsed, writer="flight_writer")
+        metrics.inc("db_rows_written_total", len(pending))
+        metrics.inc("db_rows_changed_total", changed)
+
+    def _run(self):
+        conn = None
+        pending = []
+        blobs = []
+        deadline = time.monotonic() + self.flush_interval
+        stopping = False
+        try:
+            # Inside the try, so a database that can't be opened is reported like a failed flush
+            conn = connect(self.db_path)
+            while True:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    item = None
+                stopping = item is _STOP
+
+                if isinstance(item, tuple):
+                    pending.extend(item[0])
+                    blobs.extend(item[1])
+                elif item is not None and item is not _STOP:
+                    pending.extend(flight_to_row(flight) for flight in item)
+                    blobs.extend(flight_blobs(item))
+
+                timed_out = time.monotonic() >= deadline
+                if pending and (item is _STOP or timed_out or len(pending) >= self.batch_size):
+                    self._flush(conn, pending, blobs)
+                    pending = []
+                    blobs = []
+                if not pending:
+                    deadline = time.monotonic() + self.flush_interval
+                if item is _STOP:
+                    break
+        except Exception as e:
+            self._error = e
+            # Keep draining until close() so put() callers never fill memory; close() raises the error
+            while not stopping:
+                stopping = self._queue.get() is _STOP
+        finally:
+            if conn is not None:
+                conn.close()
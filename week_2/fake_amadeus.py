@@ -0,0 +1,206 @@
+"""
+Local stand-in for the Amadeus test API, used to benchmark the crawler offline.
+
+Run it with `python fake_amadeus.py --port 8765 --latency 0.05` and point the
+crawler at it with AMADEUS_BASE_URL="http://127.0.0.1:8765". With --rate-limit
+it throttles like the real API, answering 429 with Retry-After above that many
+requests per second, and --error-rate adds random 500s. With `server.require_token`
+set, GETs must carry a token the server issued and not yet revoked
+(`server.tokens.clear()` expires every token at once), or get 401.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+CARRIERS = ["B6", "UA", "VS", "QR", "NH", "WS", "AS", "JL"]
+AIRLINE_NAMES = {
+    "B6": "JETBLUE AIRWAYS",
+    "UA": "UNITED AIRLINES",
+    "VS": "VIRGIN ATLANTIC",
+    "QR": "QATAR AIRWAYS",
+    "NH": "ALL NIPPON AIRWAYS",
+    "WS": "WESTJET",
+    "AS": "ALASKA AIRLINES",
+    "JL": "JAPAN AIRLINES",
+}
+
+
+def make_offer(origin, destination, departure_date, index):
+    """
+    Builds a deterministic flight offer shaped like an Amadeus flight-offers result.
+    """
+    seed = zlib.crc32(f"{origin}{destination}{departure_date}{index}".encode())
+    carrier = CARRIERS[seed % len(CARRIERS)]
+    minutes = 90 + seed % 720
+    departure_at = datetime.fromisoformat(departure_date) + timedelta(hours=6 + index * 3, minutes=seed % 60)
+    arrival_at = departure_at + timedelta(minutes=minutes)
+    duration = f"PT{minutes // 60}H{minutes % 60}M"
+    total = f"{80 + (seed % 90000) / 100:.2f}"
+    return {
+        "type": "flight-offer",
+        "id": str(index + 1),
+        "itineraries": [{
+            "duration": duration,
+            "segments": [{
+                "departure": {"iataCode": origin, "at": departure_at.isoformat()},
+                "arrival": {"iataCode": destination, "at": arrival_at.isoformat()},
+                "carrierCode": carrier,
+                "number": str(100 + seed % 9000),
+                "duration": duration,
+                "numberOfStops": 0
+            }]
+        }],
+        "price": {"currency": "USD", "total": total, "base": total, "grandTotal": total}
+    }
+
+
+class FakeAmadeusHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def reject(self):
+        """
+        Answers like an overloaded Amadeus API when the server's limits say so.
+        Returns True if the request was rejected.
+        """
+        server = self.server
+        throttled = failed = False
+        if server.require_token:
+            token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+            with server.lock:
+                valid = token in server.tokens
+            if not valid:
+                self.send_json(401, {"errors": [{"status": 401, "code": 38190, "title": "Invalid access token"}]})
+                return True
+        with server.lock:
+            if server.rate_limit:
+                # One-second fixed window, as the Amadeus per-second quota behaves
+                now = time.monotonic()
+                if now - server.window_started >= 1.0:
+                    server.window_started, server.window_requests = now, 0
+                server.window_requests += 1
+                throttled = server.window_requests > server.rate_limit
+                if throttled:
+                    server.throttled += 1
+                    retry_after = max(1, round(server.window_started + 1.0 - now))
+            if not throttled and server.error_rate and random.random() < server.error_rate:
+                failed = True
+                server.failed += 1
+        if throttled:
+            self.send_json(429, {"errors": [{"status": 429, "code": 38194, "title": "Too many requests"}]},
+                           {"Retry-After": str(retry_after)})
+        elif failed:
+            self.send_json(500, {"errors": [{"status": 500, "code": 141, "title": "SYSTEM ERROR HAS OCCURRED"}]})
+        return throttled or failed
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if urlparse(self.path).path != "/v1/security/oauth2/token":
+            self.send_json(404, {"errors": [{"detail": "not found"}]})
+            return
+        with self.server.lock:
+            self.server.token_requests += 1
+            token = f"fake-token-{self.server.token_requests}"
+            self.server.tokens.add(token)
+        self.send_json(200, {
+            "type": "amadeusOAuth2Token",
+            "access_token": token,
+            "token_type": "Bearer",
+            "expires_in": 1799
+        })
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if self.reject():
+            return
+        if url.path == "/v1/reference-data/airlines":
+            with self.server.lock:
+                self.server.airline_requests += 1
+            codes = query.get("airlineCodes", "").split(",")
+            self.send_json(200, {"data": [
+                {"type": "airline", "iataCode": code, "businessName": AIRLINE_NAMES[code]}
+                for code in codes if code in AIRLINE_NAMES
+            ]})
+            return
+        if url.path != "/v2/shopping/flight-offers":
+            self.send_json(404, {"errors": [{"detail": "not found"}]})
+            return
+        with self.server.lock:
+            self.server.offer_requests += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        offers = [
+            make_offer(query["originLocationCode"], query["destinationLocationCode"], query["departureDate"], i)
+            for i in range(int(query.get("max", 3)))
+        ]
+        self.send_json(200, {"meta": {"count": len(offers)}, "data": offers})
+
+
+class FakeAmadeusServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The stdlib default backlog of 5 drops SYNs under concurrent connects
+    request_queue_size = 256
+
+
+def make_server(port=0, latency=0.0, rate_limit=0, error_rate=0.0):
+    """
+    Creates the fake API server; `server.base_url` holds the address to use as AMADEUS_BASE_URL.
+    """
+    server = FakeAmadeusServer(("127.0.0.1", port), FakeAmadeusHandler)
+    server.latency = latency
+    server.rate_limit = rate_limit
+    server.error_rate = error_rate
+    server.window_started = 0.0
+    server.window_requests = 0
+    server.throttled = 0
+    server.failed = 0
+    server.lock = threading.Lock()
+    server.token_requests = 0
+    server.require_token = False
+    server.tokens = set()
+    server.offer_requests = 0
+    server.airline_requests = 0
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    return server
+
+
+def start_server(port=0, latency=0.0, rate_limit=0, error_rate=0.0):
+    """
+    Starts the fake API on a background thread and returns the server.
+    """
+    server = make_server(port, latency, rate_limit, error_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Amadeus flight-offers server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every flight-offers request")
+    parser.add_argument("--rate-limit", type=int, default=0, help="requests per second before answering 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.latency, args.rate_limit, args.error_rate)
+    print(f"Fake Amadeus API listening on {server.base_url}")
+    server.serve_forever()
@@ -1,6 +1,71 @@
 import re
-import datetime
+from functools import lru_cache
 
+# Compiled once; Amadeus durations look like "PT5H50M" or "P1DT2H"
+ISO8601_DURATION_PATTERN = re.compile(
+    r"^P(?:(?P<days>\d+)D)?T?(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?$"
+)
+
+# Offer pages repeat a small set of durations, so a bounded memo serves nearly every call
+DURATION_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=DURATION_CACHE_SIZE)
+def iso8601_duration_seconds(duration_string: str):
+    """
+    Parses an ISO 8601 duration string (PnDTnHnMnS format) into total seconds.
+
+    Args:
+        duration_string: The ISO 8601 duration string (e.g., "PT1H30M").
+
+    Returns:
+        The total duration in seconds (e.g., 5400), or None if the format is invalid.
+    """
+    match = ISO8601_DURATION_PATTERN.match(duration_string)
+
+    if not match:
+        return None
+
+    days, hours, minutes, seconds = match.groups()
+    return (int(days or 0) * 86400 + int(hours or 0) * 3600
+            + int(minutes or 0) * 60 + int(seconds or 0))
+
+
+def iso8601_duration_minutes(duration_string: str):
+    """
+    Parses an ISO 8601 duration string (PTnHnMnS format) into whole minutes.
+
+    Args:
+        duration_string: The ISO 8601 duration string (e.g., "PT1H30M").
+
+    Returns:
+        The total duration in minutes, with seconds rounded down (e.g., 90),
+        or None if the format is invalid.
+    """
+    total_seconds = iso8601_duration_seconds(duration_string)
+    return None if total_seconds is None else total_seconds // 60
+
+
+def iso8601_durations_minutes(duration_strings):
+    """
+    Batch form of iso8601_duration_minutes for a whole offer page.
+
+    Args:
+        duration_strings: An iterable of ISO 8601 duration strings.
+
+    Returns:
+        A list of whole minutes (or None for invalid strings), in input order.
+    """
+    parsed = {}
+    minutes = []
+    for duration_string in duration_strings:
+        if duration_string not in parsed:
+            parsed[duration_string] = iso8601_duration_minutes(duration_string)
+        minutes.append(parsed[duration_string])
+    return minutes
+
+
+@lru_cache(maxsize=DURATION_CACHE_SIZE)
 def format_iso8601_duration(duration_string: str) -> str:
     """
     Parses an ISO 8601 duration string (PTnHnMnS format) and returns a formatted string.
@@ -12,33 +77,24 @@ def format_iso8601_duration(duration_string: str) -> str:
         A string representation of the duration (e.g., "1 hour 30 minutes"),
         or an error message if the format is invalid.
     """
-    pattern = r"^P(?:(?P<days>\d+)D)?T?(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?$"
-    match = re.match(pattern, duration_string)
+    total_seconds = iso8601_duration_seconds(duration_string)
 
-    if not match:
+    if total_seconds is None:
         return "Invalid ISO 8601 duration format."
 
-    parts = {k: int(v) if v else 0 for k, v in match.groupdict().items()}
-    
-    # Calculate total seconds
-    total_seconds = parts["days"] * 86400 + parts["hours"] * 3600 + parts["minutes"] * 60 + parts["seconds"]
-
-    # Create a timedelta object (optional, but convenient for calculations)
-    duration_td = datetime.timedelta(seconds=total_seconds)
-
-    # Format the timedelta as a string
-    hours, remainder = divmod(duration_td.total_seconds(), 3600)
+    # Days are folded into the hour count
+    hours, remainder = divmod(total_seconds, 3600)
     minutes, seconds = divmod(remainder, 60)
 
     formatted_parts = []
-    if int(hours) > 0:
-        formatted_parts.append(f"{int(hours)} hour{'s' if int(hours) > 1 else ''}")
-    if int(minutes) > 0:
-        formatted_parts.append(f"{int(minutes)} minute{'s' if int(minutes) > 1 else ''}")
-    if int(seconds) > 0:
-         formatted_parts.append(f"{int(seconds)} second{'s' if int(seconds) > 1 else ''}")
+    if hours > 0:
+        formatted_parts.append(f"{hours} hour{'s' if hours > 1 else ''}")
+    if minutes > 0:
+        formatted_parts.append(f"{minutes} minute{'s' if minutes > 1 else ''}")
+    if seconds > 0:
+         formatted_parts.append(f"{seconds} second{'s' if seconds > 1 else ''}")
 
     if formatted_parts:
         return " ".join(formatted_parts)
     else:
-        return "0 seconds" # Handle the case of "PT0S" or empty duration
\ No newline at end of file
+        return "0 seconds" # Handle the case of "PT0S" or empty duration
@@ -1,69 +1,60 @@
-from auth import generate_access_token
-from db_utils import init_db, append_flight_data
-from iso_convert import format_iso8601_duration
+from auth import authorized_request, base_url
+from rate_limit import ApiError
+from db_utils import init_db
+from db_writer import FlightWriter
+from offer_utils import FLIGHT_OFFERS_PATH, crawl_dates, build_search_params, offers_to_flights
+from metrics import metrics, setup_logging, stage_summary
 from concurrent.futures import ThreadPoolExecutor
-import requests
-from airlineUtils import get_airline_name
-import sqlite3
+import argparse
+import logging
 
+logger = logging.getLogger(__name__)
 
-def contact_api(loopAmt, origin, destination):
+
+def fetch_day(origin, destination, departure_date, recorder=None):
+    """
+    Fetches the flight-offers response for one route and day.
+    Raises ApiError if the API still answers with an error after the limiter's retries,
+    and auth.AuthError if no access token can be obtained.
+    """
+    search_params = build_search_params(origin, destination, departure_date)
+
+    # Rate limited and retried with backoff; a status still failing after the retries is reported, not stored as zero flights
+    with metrics.timer("stage_seconds", stage="fetch"):
+        response = authorized_request("GET", f"{base_url}{FLIGHT_OFFERS_PATH}", params=search_params,
+                                      headers={"Content-Type": "application/json"})
+    if response.status_code != 200:
+        metrics.inc("crawl_days_total", result="error")
+        raise ApiError(response.status_code, response.text)
+    metrics.inc("crawl_days_total", result="ok")
+    res = response.json()
+    if recorder:
+        recorder.write(origin, destination, departure_date, res)
+    return res
+
+
+def contact_api(loopAmt, origin, destination, writer, recorder=None):
     finalResult = []
-    index = 0
-
-    base_url = "https://test.api.amadeus.com/v2/shopping/flight-offers"
-    headers = {
-        "Authorization": f"Bearer {generate_access_token()}",
-        "Content-Type": "application/json"
-    }
-
-    while index < loopAmt:
-        day = str(index + 1).zfill(2)
-        search_params = {
-            "originLocationCode": f"{origin}",
-            "destinationLocationCode": f"{destination}",
-            "departureDate": f"2025-10-{day}",
-            "currencyCode": "USD",
-            "adults": 1,
-            "max": 3
-        }
-
-        response = requests.get(base_url, params=search_params, headers=headers)
-        res = response.json()
+
+    for departure_date in crawl_dates(loopAmt):
+        try:
+            res = fetch_day(origin, destination, departure_date, recorder)
+        except ApiError as e:
+            logger.warning("Error fetching %s-%s %s: %s", origin, destination, departure_date, e,
+                           extra={"route": f"{origin}-{destination}", "departure_date": departure_date, "status": e.status})
+            continue
         data = res.get("data", [])
 
-        flights_to_insert = []
-        for offer in data:
-            # Get the first segment of the first itinerary
-            segment = offer['itineraries'][0]['segments'][0]
-
-            flight_data = {
-                "flight_number": f"{segment['carrierCode']}{segment['number']}",
-                "departure": f"{origin}",
-                "arrival": f"{destination}",
-                "date": segment['departure']['at'][:10],
-                "raw_data": str(offer),  # optional: store full offer for reference
-                "price": offer['price']['total'] + offer['price']['currency'],
-                "airline": segment['carrierCode'],
-                "flight_time": format_iso8601_duration(segment['duration'])
-            }
-
-            flights_to_insert.append({
-                "flight_number": flight_data["flight_number"],
-                "departure": flight_data["departure"],
-                "arrival": flight_data["arrival"],
-                "date": flight_data["date"],
-                "data": flight_data["raw_data"],
-                "price": flight_data["price"],
-                "airline": flight_data["airline"],
-                "flight_time": flight_data["flight_time"]
-            })
-
-        append_flight_data(flights_to_insert)
+        flights_to_insert = offers_to_flights(data, origin, destination)
+
+        writer.put(flights_to_insert)
         finalResult.append(data)
 
-        print(f"Inserted {len(flights_to_insert)} flights for 2025-10-{day}")
-        index += 1
+        logger.debug("Queued %d flights for %s-%s %s", len(flights_to_insert), origin, destination, departure_date,
+                     extra={"route": f"{origin}-{destination}", "departure_date": departure_date,
+                            "flights": len(flights_to_insert)})
+
+    return finalResult
 
 jobs = [
     (31, "JFK", "LAX"),
@@ -73,16 +64,64 @@ jobs = [
     (31, "ORD", "DOH"),
 ]
 
-# Use ThreadPoolExecutor to run them in parallel
-with ThreadPoolExecutor(max_workers=5) as executor:
-    futures = [executor.submit(contact_api, *job) for job in jobs]
 
-    # Wait for all to finish (optional, but good for logging or catching errors)
-    for future in futures:
+def run_threaded(jobs, db_path="database.db", recorder=None):
+    # Use ThreadPoolExecutor to run them in parallel; one writer thread persists every route
+    with FlightWriter(db_path) as writer, ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [executor.submit(contact_api, *job, writer, recorder) for job in jobs]
+
+        # Wait for all to finish (optional, but good for logging or catching errors)
+        for future in futures:
+            try:
+                result = future.result()
+            except Exception:
+                logger.exception("Crawl thread failed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl flight offers into database.db")
+    parser.add_argument("--threaded", action="store_true", help="use the thread pool instead of asyncio")
+    parser.add_argument("--record", metavar="PATH", help="also append every raw response to a .jsonl[.gz|.zst] recording")
+    parser.add_argument("--replay", metavar="PATH", nargs="+", help="re-ingest recordings instead of calling the API")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes used by --replay")
+    parser.add_argument("--queue", action="store_true",
+                        help="plan the jobs routes into the persistent crawl queue and drain it (see crawl_planner.py)")
+    parser.add_argument("--budget", type=int, default=200, help="route-days scheduled by --queue")
+    parser.add_argument("--metrics", metavar="PATH", help="write metrics on exit (.prom for Prometheus text, else JSON)")
+    parser.add_argument("--metrics-port", type=int, help="serve live metrics on http://127.0.0.1:PORT/metrics")
+    args = parser.parse_args()
+
+    setup_logging()
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+
+    # Creates or migrates the schema; existing fares are kept and upserted
+    init_db()
+    if args.replay:
+        from replay import replay, report
+        report(replay(args.replay, workers=args.workers))
+    elif args.queue:
+        # Resumable: an interrupted run leaves its leases to expire and the next run picks them up
+        from crawl_planner import plan, run_worker
+        from db_utils import connect
+        conn = connect()
+        logger.info("Planned crawl: %s", plan(conn, [(origin, destination) for _, origin, destination in jobs], budget=args.budget))
+        conn.close()
+        logger.info("Drained crawl queue: %s", run_worker())
+    else:
+        from replay import ResponseRecorder
+        recorder = ResponseRecorder(args.record) if args.record else None
         try:
-            result = future.result()
-        except Exception as e:
-            print(f"Error in thread: {e}")
-            
+            if args.threaded:
+                run_threaded(jobs, recorder=recorder)
+            else:
+                import asyncio
+                from async_ingest import ingest
+                asyncio.run(ingest(jobs, recorder=recorder))
+        finally:
+            if recorder:
+                recorder.close()
 
-            
+    logger.info("Time by stage: %s", stage_summary())
+    if args.metrics:
+        metrics.write(args.metrics)
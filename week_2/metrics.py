@@ -0,0 +1,308 @@
+"""
+In-process metrics and structured logging for the crawler, enrichment and app.
+
+One shared registry collects counters, gauges and latency histograms, keyed
+by name and labels. It is cheap enough to call on every request and can be
+exported as Prometheus text or a JSON snapshot at any time:
+
+    from metrics import metrics
+    with metrics.timer("stage_seconds", stage="fetch"):
+        ...
+    metrics.inc("api_responses_total", api="amadeus", status=200)
+    metrics.write("crawl_metrics.prom")      # or .json
+    metrics.serve(9108)                       # /metrics for Prometheus to scrape
+
+setup_logging() configures the root logger for text or JSON lines (LOG_FORMAT=json)
+and redacts API credentials and bearer tokens from every record.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds in seconds, from a cached lookup up to a slow API call
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram with a running sum and count, as Prometheus exposes them.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total, result = 0, []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q):
+        """
+        Estimates a quantile as the upper bound of the bucket it falls in.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+        return float("inf")
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of counters, gauges and histograms. Labels are keyword
+    arguments; every distinct label set is its own series.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self.started = time.time()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        Observes the wall time of the block in histogram `name`, even if it raises.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get(self._key(name, labels), 0)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        """
+        Returns every series as plain data, with p50/p95 estimates for histograms.
+        """
+        with self._lock:
+            counters = list(self._counters.items())
+            gauges = list(self._gauges.items())
+            histograms = [(key, h.count, h.sum, h.quantile(0.5), h.quantile(0.95))
+                          for key, h in self._histograms.items()]
+        return {
+            "uptime_seconds": time.time() - self.started,
+            "counters": [{"name": name, "labels": dict(labels), "value": value}
+                         for (name, labels), value in sorted(counters)],
+            "gauges": [{"name": name, "labels": dict(labels), "value": value}
+                       for (name, labels), value in sorted(gauges)],
+            "histograms": [{"name": name, "labels": dict(labels), "count": count, "sum": total,
+                            "p50": p50, "p95": p95}
+                           for (name, labels), count, total, p50, p95 in sorted(histograms)],
+        }
+
+    def to_prometheus(self):
+        """
+        Renders every series in the Prometheus text exposition format.
+        """
+        def render(name, labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return name
+            return name + "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in pairs) + "}"
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted((key, h.cumulative(), h.sum, h.count) for key, h in self._histograms.items())
+        lines, typed = [], set()
+        for kind, series in (("counter", counters), ("gauge", gauges)):
+            for (name, labels), value in series:
+                if name not in typed:
+                    lines.append(f"# TYPE {name} {kind}")
+                    typed.add(name)
+                lines.append(f"{render(name, labels)} {value}")
+        for (name, labels), buckets, total, count in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            for bound, cumulative in buckets:
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{render(name + '_bucket', labels, [('le', le)])} {cumulative}")
+            lines.append(f"{render(name + '_sum', labels)} {total}")
+            lines.append(f"{render(name + '_count', labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Writes Prometheus text for a .prom/.txt path, otherwise a JSON snapshot.
+        """
+        if path.endswith((".prom", ".txt")):
+            body = self.to_prometheus()
+        else:
+            body = json.dumps(self.snapshot(), indent=2)
+        with open(path, "w", encoding="utf8") as f:
+            f.write(body)
+
+    def serve(self, port, host="127.0.0.1"):
+        """
+        Serves /metrics (Prometheus text) and /metrics.json from a background thread.
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = registry.to_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = json.dumps(registry.snapshot()), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                payload = body.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+metrics = MetricsRegistry()
+
+
+def stage_summary(registry=metrics, name="stage_seconds"):
+    """
+    One line per pipeline stage: calls, total and p95 time, for the end-of-run log.
+    """
+    rows = [h for h in registry.snapshot()["histograms"] if h["name"] == name]
+    return ", ".join(
+        f"{h['labels'].get('stage', '?')}: {h['count']} calls {h['sum']:.2f}s (p95 <= {h['p95']}s)"
+        for h in sorted(rows, key=lambda h: -h["sum"])
+    )
+
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class RedactingFilter(logging.Filter):
+    """
+    Masks configured secrets and bearer tokens in log messages, fields,
+    tracebacks and stack traces.
+    """
+    BEARER = re.compile(r"(Bearer\s+)[A-Za-z0-9._~+/=-]+")
+
+    def __init__(self, secrets=()):
+        super().__init__()
+        self.secrets = [s for s in secrets if s and len(s) >= 4]
+
+    def redact(self, text):
+        text = self.BEARER.sub(r"\1[REDACTED]", text)
+        for secret in self.secrets:
+            text = text.replace(secret, "[REDACTED]")
+        return text
+
+    def filter(self, record):
+        record.msg = self.redact(record.getMessage())
+        record.args = None
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and isinstance(value, str):
+                setattr(record, key, self.redact(value))
+        # Formatters print exc_text as is once it is set, so the traceback is rendered and redacted here
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        if record.exc_text:
+            record.exc_text = self.redact(record.exc_text)
+        if record.stack_info:
+            record.stack_info = self.redact(record.stack_info)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, message and any `extra=` fields.
+    """
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update((k, v) for k, v in vars(record).items() if k not in _RECORD_ATTRIBUTES)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def setup_logging(level=None, json_format=None):
+    """
+    Configures the root logger once per process. LOG_LEVEL and LOG_FORMAT=json|text
+    set the defaults; known API secrets from the environment are always redacted.
+    """
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    if json_format is None:
+        json_format = os.getenv("LOG_FORMAT", "text").lower() == "json"
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if json_format else
+                         logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    handler.addFilter(RedactingFilter([os.getenv(name) for name in
+                                       ("AMADEUS_API_KEY", "AMADEUS_API_SECRET", "SERPAPI_SECRET")]))
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
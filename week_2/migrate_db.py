@@ -0,0 +1,21 @@
+"""
+Upgrades existing flight databases to the current schema in place.
+
+    python migrate_db.py                      # ./database.db
+    python migrate_db.py ../week_4/database.db
+"""
+import sys
+import sqlite3
+
+from db_utils import migrate
+
+if __name__ == "__main__":
+    for db_path in sys.argv[1:] or ["database.db"]:
+        conn = sqlite3.connect(db_path)
+        old_version, new_version = migrate(conn)
+        count = conn.execute("SELECT COUNT(*) FROM flights").fetchone()[0]
+        conn.close()
+        if old_version == new_version:
+            print(f"{db_path}: already at schema version {new_version}")
+        else:
+            print(f"{db_path}: migrated {count} flights from schema version {old_version} to {new_version}")
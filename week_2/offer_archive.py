@@ -0,0 +1,203 @@
+"""
+Content-addressed archive of raw Amadeus flight offers.
+
+Each offer is stored once as canonical JSON (sorted keys, no whitespace),
+compressed, under the SHA-256 of that JSON. Flights and price observations
+point at the blob through raw_hash, so an identical offer seen on every
+re-crawl costs one row, and old responses can be re-parsed offline:
+
+    python offer_archive.py --reparse            # rebuild flights from stored offers
+    python offer_archive.py --stats
+"""
+import argparse
+import hashlib
+import json
+import zlib
+
+from functools import lru_cache
+
+try:
+    import zstandard
+except ImportError:  # only needed to write or read "zstd" blobs
+    zstandard = None
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+
+# Offers are small JSON documents that share nearly all of their keys, so each
+# blob is compressed against this preset dictionary of canonical flight-offer
+# fragments. Its bytes are part of the stored format: change it only under a new codec name.
+OFFER_DICTIONARY = (
+    b'"additionalServices":[{"amount":"","type":"CHECKED_BAGS"}],"fees":[{"amount":"0.00","type":"SUPPLIER"},'
+    b'{"amount":"0.00","type":"TICKETING"}],"instantTicketingRequired":false,"lastTicketingDate":"2025-'
+    b'"lastTicketingDateTime":"2025-","nonHomogeneous":false,"numberOfBookableSeats":9,"oneWay":false,'
+    b'"pricingOptions":{"fareType":["PUBLISHED"],"includedCheckedBagsOnly":true},"source":"GDS",'
+    b'"travelerPricings":[{"fareDetailsBySegment":[{"brandedFare":"","brandedFareLabel":"","cabin":"ECONOMY",'
+    b'"class":"","fareBasis":"","includedCheckedBags":{"quantity":0},"segmentId":"1"}],"fareOption":"STANDARD",'
+    b'"price":{"base":"","currency":"USD","total":""},"travelerId":"1","travelerType":"ADULT"}],'
+    b'"validatingAirlineCodes":["'
+    b'"aircraft":{"code":"32"},"blacklistedInEU":false,"operating":{"carrierCode":""},"terminal":"1"},'
+    b'"price":{"base":"","currency":"USD","fees":[{"amount":"0.00","type":"SUPPLIER"}],"grandTotal":"","total":""},'
+    b'"type":"flight-offer"}{"id":"1","itineraries":[{"duration":"PT","segments":[{"arrival":{"at":"2025-10-0'
+    b'T00:00:00","iataCode":""},"carrierCode":"","departure":{"at":"2025-10-0T00:00:00","iataCode":""},'
+    b'"duration":"PT","id":"1","number":"","numberOfStops":0}]}],"price":{"base":"","currency":"USD","grandTotal":"'
+)
+# On offer-sized documents zlib with the preset dictionary compresses about as well
+# as zstd with the same dictionary and is faster, with no extra dependency
+DEFAULT_CODEC = "zlib-offer1"
+
+OFFER_BLOBS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS offer_blobs (
+        hash TEXT PRIMARY KEY,
+        codec TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        payload BLOB NOT NULL
+    ) WITHOUT ROWID
+"""
+
+INSERT_BLOB_SQL = "INSERT OR IGNORE INTO offer_blobs (hash, codec, size, payload) VALUES (?, ?, ?, ?)"
+
+
+def canonical_json(offer):
+    """
+    Serializes an offer so equal content always gives equal bytes.
+    """
+    return json.dumps(offer, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf8")
+
+
+@lru_cache(maxsize=1)
+def _zstd_dictionary():
+    return zstandard.ZstdCompressionDict(OFFER_DICTIONARY, dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+
+
+def _zstd_compressor():
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=_zstd_dictionary(), write_content_size=True)
+
+
+def _zstd_decompressor():
+    return zstandard.ZstdDecompressor(dict_data=_zstd_dictionary())
+
+
+def compress(raw, codec=DEFAULT_CODEC):
+    if codec == "zstd":
+        return _zstd_compressor().compress(raw)
+    if codec == "zlib-offer1":
+        compressor = zlib.compressobj(ZLIB_LEVEL, zdict=OFFER_DICTIONARY)
+        return compressor.compress(raw) + compressor.flush()
+    if codec == "zlib":
+        return zlib.compress(raw, ZLIB_LEVEL)
+    raise ValueError(f"Unknown codec {codec!r}")
+
+
+def decompress(codec, payload):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("This blob is zstd-compressed; pip install zstandard to read it")
+        return _zstd_decompressor().decompress(payload)
+    if codec == "zlib-offer1":
+        decompressor = zlib.decompressobj(zdict=OFFER_DICTIONARY)
+        return decompressor.decompress(payload) + decompressor.flush()
+    if codec == "zlib":
+        return zlib.decompress(payload)
+    raise ValueError(f"Unknown codec {codec!r}")
+
+
+def encode_offer(offer, codec=DEFAULT_CODEC):
+    """
+    Returns the (hash, codec, size, payload) blob row for an offer dict.
+    """
+    raw = canonical_json(offer)
+    return hashlib.sha256(raw).hexdigest(), codec, len(raw), compress(raw, codec)
+
+
+def store_blobs(conn, blobs):
+    """
+    Inserts blob rows, skipping hashes that are already archived. The caller commits.
+    """
+    conn.executemany(INSERT_BLOB_SQL, blobs)
+
+
+def load_offer(conn, raw_hash):
+    """
+    Returns the archived offer dict for `raw_hash`, or None if it is not stored.
+    """
+    row = conn.execute("SELECT codec, payload FROM offer_blobs WHERE hash = ?", (raw_hash,)).fetchone()
+    if row is None:
+        return None
+    return json.loads(decompress(*row))
+
+
+def iter_archived_offers(conn, history=False):
+    """
+    Yields (departure, arrival, offer) for the offer behind each current fare,
+    or with history=True for every archived observation of each fare.
+    """
+    if history:
+        sql = """
+            SELECT f.departure, f.arrival, b.codec, b.payload
+            FROM price_observations AS o
+            JOIN flights AS f ON f.id = o.flight_id
+            JOIN offer_blobs AS b ON b.hash = o.raw_hash
+            ORDER BY o.id
+        """
+    else:
+        sql = """
+            SELECT f.departure, f.arrival, b.codec, b.payload
+            FROM flights AS f
+            JOIN offer_blobs AS b ON b.hash = f.raw_hash
+        """
+    for departure, arrival, codec, payload in conn.execute(sql):
+        yield departure, arrival, json.loads(decompress(codec, payload))
+
+
+def archive_stats(conn):
+    blobs, raw_bytes, stored_bytes = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(payload)), 0) FROM offer_blobs"
+    ).fetchone()
+    linked = conn.execute("SELECT COUNT(*) FROM flights WHERE raw_hash IS NOT NULL").fetchone()[0]
+    return {"blobs": blobs, "linked_flights": linked, "raw_bytes": raw_bytes, "stored_bytes": stored_bytes}
+
+
+def reparse(db_path="database.db"):
+    """
+    Re-runs offer parsing over every archived offer and upserts the results,
+    without touching the network. Returns the writer stats.
+    """
+    from db_utils import connect, init_db
+    from db_writer import FlightWriter
+    from offer_utils import offer_to_flight
+
+    init_db(db_path)
+    conn = connect(db_path)
+    try:
+        with FlightWriter(db_path) as writer:
+            page = []
+            for departure, arrival, offer in iter_archived_offers(conn):
+                page.append(offer_to_flight(offer, departure, arrival))
+                if len(page) >= writer.batch_size:
+                    writer.put(page)
+                    page = []
+            writer.put(page)
+    finally:
+        conn.close()
+    return writer.stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or re-parse the raw offer archive")
+    parser.add_argument("--db", default="database.db")
+    parser.add_argument("--reparse", action="store_true", help="rebuild flights rows from archived offers")
+    parser.add_argument("--stats", action="store_true")
+    args = parser.parse_args()
+
+    if args.reparse:
+        stats = reparse(args.db)
+        print(f"Re-parsed {stats['rows']} offers, {stats['changed']} rows changed")
+    if args.stats or not args.reparse:
+        from db_utils import connect
+        conn = connect(args.db)
+        stats = archive_stats(conn)
+        conn.close()
+        ratio = stats["raw_bytes"] / stats["stored_bytes"] if stats["stored_bytes"] else 0
+        print(f"{stats['blobs']} blobs for {stats['linked_flights']} flights, "
+              f"{stats['raw_bytes']} bytes of JSON stored in {stats['stored_bytes']} ({ratio:.1f}x)")
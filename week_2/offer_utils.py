@@ -0,0 +1,72 @@
+from iso_convert import format_iso8601_duration, iso8601_duration_minutes
+from db_utils import parse_price_cents
+from offer_archive import encode_offer
+from metrics import metrics
+
+FLIGHT_OFFERS_PATH = "/v2/shopping/flight-offers"
+
+
+def crawl_dates(loopAmt, month="2025-10"):
+    """
+    Returns the departure dates crawled for a route, one per day of the month.
+    """
+    return [f"{month}-{str(day).zfill(2)}" for day in range(1, loopAmt + 1)]
+
+
+def build_search_params(origin, destination, departure_date):
+    """
+    Builds the flight-offers query string for a single route and day.
+    """
+    return {
+        "originLocationCode": f"{origin}",
+        "destinationLocationCode": f"{destination}",
+        "departureDate": departure_date,
+        "currencyCode": "USD",
+        "adults": 1,
+        "max": 3
+    }
+
+
+def itinerary_times(offer):
+    """
+    Returns (departure_at, arrival_at, stops) of an offer's outbound itinerary:
+    local departure of its first segment, local arrival of its last, and the number of connections.
+    """
+    segments = offer['itineraries'][0]['segments']
+    return segments[0]['departure']['at'], segments[-1]['arrival']['at'], len(segments) - 1
+
+
+def offer_to_flight(offer, origin, destination):
+    """
+    Maps a single Amadeus flight offer to the row dictionary stored in the flights table.
+    """
+    # Get the first segment of the first itinerary
+    segment = offer['itineraries'][0]['segments'][0]
+    departure_at, arrival_at, stops = itinerary_times(offer)
+
+    return {
+        "flight_number": f"{segment['carrierCode']}{segment['number']}",
+        "departure": f"{origin}",
+        "arrival": f"{destination}",
+        "date": segment['departure']['at'][:10],
+        "raw": encode_offer(offer),  # full offer, archived once per distinct content
+        "price": offer['price']['total'] + offer['price']['currency'],
+        "airline": segment['carrierCode'],
+        "flight_time": format_iso8601_duration(segment['duration']),
+        "price_cents": parse_price_cents(offer['price']['total']),
+        "currency": offer['price']['currency'],
+        "duration_minutes": iso8601_duration_minutes(segment['duration']),
+        "departure_at": departure_at,
+        "arrival_at": arrival_at,
+        "stops": stops
+    }
+
+
+def offers_to_flights(data, origin, destination):
+    """
+    Maps every offer of a flight-offers response page to flights table rows.
+    """
+    with metrics.timer("stage_seconds", stage="parse"):
+        flights = [offer_to_flight(offer, origin, destination) for offer in data]
+    metrics.inc("offers_parsed_total", len(flights))
+    return flights
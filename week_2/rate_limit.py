@@ -0,0 +1,342 @@
+"""
+Client-side rate limiting shared by every Amadeus and SerpApi call.
+
+Each API has one ApiClient, shared by all threads and coroutines in the process:
+
+  - a TokenBucket caps the request rate (and is paused as a whole when the
+    server answers 429 with Retry-After),
+  - an AdaptiveConcurrency limit caps requests in flight, halving on
+    throttling and growing by one per healthy window (AIMD),
+  - throttled, 5xx and connection-failed requests are retried with jittered
+    exponential backoff, honoring Retry-After when the server sends it.
+
+    response = amadeus_client.request("GET", url, params=params, headers=headers)
+    result = await amadeus_client.request_async(session, "GET", url, params=params)
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from metrics import metrics
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+THROTTLE_STATUSES = frozenset({429, 503})
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 30.0
+
+AsyncResponse = namedtuple("AsyncResponse", ["status", "headers", "data"])
+
+
+class ApiError(Exception):
+    """
+    Raised when a request still fails after every retry.
+    """
+
+    def __init__(self, status, detail=""):
+        super().__init__(f"HTTP {status}: {detail}"[:300])
+        self.status = status
+
+
+def parse_retry_after(value, now=None):
+    """
+    Returns the delay in seconds asked for by a Retry-After header (seconds or
+    HTTP date), or None if the header is missing or unreadable.
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(when - (time.time() if now is None else now), 0.0)
+
+
+def backoff_delay(attempt, base=DEFAULT_BASE_DELAY, cap=DEFAULT_MAX_DELAY, rng=random.random):
+    """
+    Full-jitter exponential backoff: a random delay up to base * 2**attempt, capped.
+    """
+    return rng() * min(cap, base * 2 ** attempt)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket allowing `rate` requests per second with bursts of
+    up to `burst`. Callers reserve a token and sleep until it is due, so waiting
+    requests are released in order at exactly the configured rate. The default
+    burst of 1 spaces requests evenly, which keeps every one-second window of a
+    per-second server quota under `rate`.
+    A rate of 0 (or None) disables the rate cap; pause() still applies.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        self.rate = rate or 0
+        self.burst = burst or 1
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = clock()
+        self._paused_until = 0.0
+
+    def reserve(self):
+        """
+        Takes one token and returns how many seconds the caller must wait before using it.
+        """
+        with self._lock:
+            now = self._clock()
+            wait = 0.0
+            if self.rate:
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                self._tokens -= 1
+                if self._tokens < 0:
+                    wait = -self._tokens / self.rate
+            return max(wait, self._paused_until - now)
+
+    def pause(self, seconds):
+        """
+        Holds back every caller for `seconds`, e.g. after a 429 with Retry-After.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit that adapts with AIMD: halved (at most once per
+    `cooldown` seconds) when the API throttles, and raised by one after `limit`
+    consecutive successes. Works for threads and asyncio coroutines at once.
+    """
+
+    def __init__(self, initial=5, minimum=1, maximum=20, cooldown=1.0, clock=time.monotonic):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._clock = clock
+        self._successes = 0
+        self._decreased_at = float("-inf")
+        self._cond = threading.Condition()
+        self._async_waiters = []
+
+    def _try_acquire(self):
+        if self.in_flight < self.limit:
+            self.in_flight += 1
+            return True
+        return False
+
+    def acquire(self):
+        with self._cond:
+            while not self._try_acquire():
+                self._cond.wait()
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._try_acquire():
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+
+    def release(self, throttled=False):
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self._successes = 0
+                now = self._clock()
+                if now - self._decreased_at >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit // 2)
+                    self._decreased_at = now
+            else:
+                self._successes += 1
+                if self._successes >= self.limit:
+                    self.limit = min(self.maximum, self.limit + 1)
+                    self._successes = 0
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class ApiClient:
+    """
+    Rate-limited, retrying access to one API. See the module docstring.
+    """
+
+    def __init__(self, name, rate, burst=None, concurrency=None, max_retries=DEFAULT_MAX_RETRIES,
+                 base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY, rng=random.random):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = concurrency or AdaptiveConcurrency()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = rng
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "failures": 0}
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+        metrics.inc(f"api_{key}_total", api=self.name)
+
+    def _retry_delay(self, attempt, status, retry_after):
+        """
+        Returns how long to wait before the next attempt, or None to stop retrying.
+        """
+        if attempt >= self.max_retries:
+            return None
+        self._count("retries")
+        delay = parse_retry_after(retry_after)
+        if delay is None:
+            delay = backoff_delay(attempt, self.base_delay, self.max_delay, self._rng)
+        elif status == 429:
+            # The server told us when it will accept requests again; hold back every caller, not just this one
+            self.bucket.pause(delay)
+        return min(delay, self.max_delay)
+
+    def _finish(self, status, started):
+        throttled = status in THROTTLE_STATUSES
+        if throttled:
+            self._count("throttled")
+        self.concurrency.release(throttled)
+        metrics.observe("api_request_seconds", time.perf_counter() - started, api=self.name)
+        metrics.inc("api_responses_total", api=self.name, status=status or "connection_error")
+        metrics.set("api_concurrency_limit", self.concurrency.limit, api=self.name)
+
+    def call(self, send, status_of=lambda response: response.status_code,
+             retry_after_of=lambda response: response.headers.get("Retry-After"),
+             exceptions=(requests.ConnectionError, requests.Timeout)):
+        """
+        Runs `send()` under the limits, retrying throttled, 5xx and failed attempts.
+        Returns the last response; a final error status is left for the caller to handle.
+        """
+        attempt = 0
+        while True:
+            waited = time.perf_counter()
+            self.bucket.acquire()
+            self.concurrency.acquire()
+            started = time.perf_counter()
+            metrics.observe("api_wait_seconds", started - waited, api=self.name)
+            self._count("requests")
+            status = error = None
+            try:
+                response = send()
+                status = status_of(response)
+            except exceptions as e:
+                error = e
+            finally:
+                # Every attempt gives its slot back, whatever send() or status_of() raised
+                self._finish(status, started)
+            if error is not None:
+                delay = self._retry_delay(attempt, None, None)
+                if delay is None:
+                    self._count("failures")
+                    raise error
+            else:
+                delay = None
+                if status in RETRY_STATUSES:
+                    delay = self._retry_delay(attempt, status, retry_after_of(response))
+                    if delay is None:
+                        self._count("failures")
+                if delay is None:
+                    return response
+            time.sleep(delay)
+            attempt += 1
+
+    def request(self, method, url, **kwargs):
+        """
+        requests.request under the limits; returns the final requests.Response.
+        """
+        kwargs.setdefault("timeout", 30)
+        return self.call(lambda: requests.request(method, url, **kwargs))
+
+    async def request_async(self, session, method, url, **kwargs):
+        """
+        The aiohttp equivalent of request(). Returns an AsyncResponse holding the
+        status, headers and decoded JSON body (None if the body is not JSON).
+        """
+        import aiohttp
+
+        attempt = 0
+        while True:
+            waited = time.perf_counter()
+            await self.bucket.acquire_async()
+            await self.concurrency.acquire_async()
+            started = time.perf_counter()
+            metrics.observe("api_wait_seconds", started - waited, api=self.name)
+            self._count("requests")
+            result = error = None
+            try:
+                async with session.request(method, url, **kwargs) as response:
+                    try:
+                        data = await response.json(content_type=None)
+                    except ValueError:
+                        data = None
+                    result = AsyncResponse(response.status, response.headers, data)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error = e
+            finally:
+                # Released on cancellation and unexpected errors too
+                self._finish(result.status if result else None, started)
+            if error is not None:
+                delay = self._retry_delay(attempt, None, None)
+                if delay is None:
+                    self._count("failures")
+                    raise error
+            else:
+                delay = None
+                if result.status in RETRY_STATUSES:
+                    delay = self._retry_delay(attempt, result.status, result.headers.get("Retry-After"))
+                    if delay is None:
+                        self._count("failures")
+                if delay is None:
+                    return result
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+def _env_number(name, default):
+    return float(os.getenv(name, default))
+
+
+# Amadeus self-service test environment allows 10 requests/second per API key;
+# set the *_RATE_LIMIT variables to 0 to disable limiting (e.g. against fake_amadeus)
+amadeus_client = ApiClient(
+    "amadeus",
+    rate=_env_number("AMADEUS_RATE_LIMIT", 10),
+    concurrency=AdaptiveConcurrency(initial=5, maximum=int(_env_number("AMADEUS_MAX_CONCURRENCY", 20))),
+)
+serpapi_client = ApiClient(
+    "serpapi",
+    rate=_env_number("SERPAPI_RATE_LIMIT", 5),
+    concurrency=AdaptiveConcurrency(initial=4, maximum=int(_env_number("SERPAPI_MAX_CONCURRENCY", 16))),
+)
@@ -0,0 +1,198 @@
+"""
+Offline replay of recorded flight-offer responses, for rebuilding database.db
+after a schema or parsing change without spending API quota.
+
+A recording is a JSON Lines file, optionally gzip (.gz) or zstd (.zst)
+compressed, holding one crawled page per line:
+
+    {"origin": "JFK", "destination": "LAX", "departure_date": "2025-10-01", "response": {...}}
+
+Crawls write recordings with `python main.py --record responses.jsonl.gz`, and
+they are re-ingested through the same offer -> row mapping with
+
+    python main.py --replay responses.jsonl.gz [more.jsonl ...]
+    python replay.py --synthesize month.jsonl.gz --days 31 --offers 250   # benchmark input
+    python replay.py month.jsonl.gz --db /tmp/replay.db
+"""
+import argparse
+import gzip
+import io
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from db_utils import flight_blobs, flight_to_row, init_db
+from db_writer import FlightWriter
+from offer_utils import offers_to_flights
+
+DEFAULT_CHUNK_SIZE = 200
+
+
+def open_recording(path, mode="rb"):
+    """
+    Opens a recording for binary reading or appending, picking the
+    compression from the file extension.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError(f"{path} is zstd-compressed; pip install zstandard to use it")
+        if "r" in mode:
+            # The raw stream reader can't be iterated line by line
+            return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(
+                open(path, "rb"), read_across_frames=True, closefd=True))
+        return zstandard.ZstdCompressor().stream_writer(open(path, mode), closefd=True)
+    return open(path, mode)
+
+
+class ResponseRecorder:
+    """
+    Appends raw flight-offer responses to a recording. Safe to share between
+    the crawler's threads; each response is written as one complete line.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = 0
+        self._lock = threading.Lock()
+        self._file = open_recording(path, "ab")
+
+    def write(self, origin, destination, departure_date, response):
+        line = json.dumps({
+            "origin": origin,
+            "destination": destination,
+            "departure_date": departure_date,
+            "response": response,
+        }, separators=(",", ":")).encode("utf8") + b"\n"
+        with self._lock:
+            self._file.write(line)
+            self.records += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_chunks(paths, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Streams the raw lines of every recording in `paths`, `chunk_size` lines at a time.
+    """
+    chunk = []
+    for path in paths:
+        with open_recording(path) as f:
+            for line in f:
+                if line.strip():
+                    chunk.append(line)
+                    if len(chunk) >= chunk_size:
+                        yield chunk
+                        chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_chunk(lines):
+    """
+    Maps a chunk of recorded responses to flights table rows and offer blobs.
+    Runs in the worker processes, so it returns plain tuples ready for FlightWriter.put_rows.
+    """
+    rows, blobs, errors = [], [], 0
+    for line in lines:
+        try:
+            record = json.loads(line)
+            flights = offers_to_flights(record["response"].get("data", []), record["origin"], record["destination"])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            errors += 1
+            continue
+        rows.extend(flight_to_row(flight) for flight in flights)
+        blobs.extend(flight_blobs(flights))
+    return len(lines), rows, blobs, errors
+
+
+def _parsed_chunks(chunks, workers):
+    # Keeps a bounded number of chunks in flight so a large recording is never fully in memory
+    if workers == 0:
+        yield from map(parse_chunk, chunks)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(parse_chunk, chunk))
+            if len(pending) >= workers * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def replay(paths, db_path="database.db", workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Re-ingests recorded responses into `db_path`. Parsing is spread over a pool of
+    `workers` processes (default: one per CPU, 0 parses inline) while a single
+    FlightWriter bulk-upserts the results. Returns a dict of counts and throughput.
+    """
+    workers = os.cpu_count() if workers is None else workers
+    stats = {"records": 0, "offers": 0, "errors": 0}
+    started = time.perf_counter()
+    with FlightWriter(db_path) as writer:
+        for records, rows, blobs, errors in _parsed_chunks(iter_chunks(paths, chunk_size), workers):
+            writer.put_rows(rows, blobs)
+            stats["records"] += records
+            stats["offers"] += len(rows)
+            stats["errors"] += errors
+    stats["writer"] = writer.stats
+    stats["wall_time"] = time.perf_counter() - started
+    stats["offers_per_sec"] = stats["offers"] / stats["wall_time"] if stats["wall_time"] else 0.0
+    return stats
+
+
+def report(stats):
+    writer = stats["writer"]
+    print(f"Replayed {stats['records']} responses ({stats['errors']} unreadable), "
+          f"{stats['offers']} offers in {stats['wall_time']:.2f}s: {stats['offers_per_sec']:.0f} offers/sec, "
+          f"{writer['changed']} rows changed in {writer['batches']} commits")
+
+
+def synthesize(path, jobs, offers_per_page):
+    """
+    Writes a recording of fake_amadeus responses for the route x date grid of `jobs`.
+    """
+    from fake_amadeus import make_offer
+    from offer_utils import crawl_dates
+
+    with ResponseRecorder(path) as recorder:
+        for loopAmt, origin, destination in jobs:
+            for departure_date in crawl_dates(loopAmt):
+                data = [make_offer(origin, destination, departure_date, i) for i in range(offers_per_page)]
+                recorder.write(origin, destination, departure_date, {"meta": {"count": len(data)}, "data": data})
+    return recorder.records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded flight-offer responses into the database")
+    parser.add_argument("paths", nargs="*", help=".jsonl, .jsonl.gz or .jsonl.zst recordings")
+    parser.add_argument("--db", default="database.db")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (0 parses inline)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--synthesize", metavar="PATH", help="write a fake recording to PATH and exit")
+    parser.add_argument("--days", type=int, default=31)
+    parser.add_argument("--offers", type=int, default=250, help="offers per synthesized response")
+    args = parser.parse_args()
+
+    if args.synthesize:
+        from main import jobs
+        grid = [(args.days, origin, destination) for _, origin, destination in jobs]
+        print(f"Wrote {synthesize(args.synthesize, grid, args.offers)} responses to {args.synthesize}")
+    else:
+        init_db(args.db)
+        report(replay(args.paths, args.db, args.workers, args.chunk_size))
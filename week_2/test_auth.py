@@ -0,0 +1,89 @@
+import asyncio
+
+import aiohttp
+import pytest
+import requests
+
+from auth import AuthError, TokenManager, authorized_request, authorized_request_async
+from fake_amadeus import start_server
+from rate_limit import AdaptiveConcurrency, ApiClient
+
+OFFERS_PATH = "/v2/shopping/flight-offers"
+OFFERS_PARAMS = {"originLocationCode": "JFK", "destinationLocationCode": "LAX", "departureDate": "2025-10-01"}
+
+
+@pytest.fixture
+def fake():
+    server = start_server()
+    server.require_token = True
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client():
+    return ApiClient("test", rate=0, concurrency=AdaptiveConcurrency(initial=4), base_delay=0.01)
+
+
+def token_fetcher(server):
+    def fetch():
+        body = requests.post(f"{server.base_url}/v1/security/oauth2/token", data={}).json()
+        return body["access_token"], body["expires_in"]
+    return fetch
+
+
+def get_offers(server, tokens, client):
+    return authorized_request("GET", server.base_url + OFFERS_PATH, params=OFFERS_PARAMS,
+                              tokens=tokens, client=client)
+
+
+def test_rejected_token_is_refreshed_once(fake, client):
+    tokens = TokenManager(fetch=token_fetcher(fake))
+    assert get_offers(fake, tokens, client).status_code == 200
+    # The token expires on the server long before its expires_in
+    fake.tokens.clear()
+    assert get_offers(fake, tokens, client).status_code == 200
+    assert fake.token_requests == 2
+    assert fake.offer_requests == 2
+
+
+def test_persistent_401_is_returned_after_one_retry(fake, client):
+    tokens = TokenManager(fetch=lambda: ("never-issued", 1799))
+    assert get_offers(fake, tokens, client).status_code == 401
+    assert fake.offer_requests == 0
+    assert client.stats["requests"] == 2
+
+
+def test_no_request_without_a_token(fake, client):
+    tokens = TokenManager(fetch=lambda: (None, 0))
+    with pytest.raises(AuthError):
+        get_offers(fake, tokens, client)
+    assert client.stats["requests"] == 0
+
+
+def test_invalidate_keeps_a_token_refreshed_by_another_caller():
+    issued = iter(["first", "second", "third"])
+    tokens = TokenManager(fetch=lambda: (next(issued), 1799))
+    assert tokens.get_token() == "first"
+    tokens.invalidate("first")
+    assert tokens.get_token() == "second"
+    # A late 401 for the old token must not throw away the new one
+    tokens.invalidate("first")
+    assert tokens.get_token() == "second"
+
+
+def test_async_rejected_token_is_refreshed_once(fake, client):
+    tokens = TokenManager(fetch=token_fetcher(fake))
+
+    async def run():
+        async with aiohttp.ClientSession() as session:
+            first = await authorized_request_async(session, "GET", fake.base_url + OFFERS_PATH,
+                                                   params=OFFERS_PARAMS, tokens=tokens, client=client)
+            fake.tokens.clear()
+            second = await authorized_request_async(session, "GET", fake.base_url + OFFERS_PATH,
+                                                    params=OFFERS_PARAMS, tokens=tokens, client=client)
+            return first.status, second.status
+
+    assert asyncio.run(run()) == (200, 200)
+    assert fake.token_requests == 2
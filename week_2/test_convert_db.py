@@ -0,0 +1,79 @@
+import csv
+import os
+import sqlite3
+import subprocess
+import sys
+
+from db_utils import init_db
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_baseline_db(path):
+    # The original schema, before any migration ran
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE flights (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, flight_number TEXT, departure TEXT, arrival TEXT,
+            date TEXT, price TEXT, airline TEXT, flight_time TEXT
+        )
+    """)
+    conn.executemany("""
+        INSERT INTO flights (flight_number, departure, arrival, date, price, airline, flight_time)
+        VALUES (?, 'JFK', 'LAX', '2025-10-01', ?, 'B6', '5 hours 50 minutes')
+    """, [("B6123", "116.52USD"), ("B6223", "120.00USD")])
+    conn.commit()
+    conn.close()
+
+
+def convert(tmp_path, *args):
+    return subprocess.run([sys.executable, os.path.join(HERE, "convert_db.py"), *args],
+                          cwd=tmp_path, capture_output=True, text=True)
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_stale_database_is_refused_and_left_alone(tmp_path):
+    db_path, out = str(tmp_path / "database.db"), str(tmp_path / "flights.csv")
+    make_baseline_db(db_path)
+    with open(db_path, "rb") as f:
+        before = f.read()
+
+    result = convert(tmp_path, "--db", db_path, "--out", out)
+    assert result.returncode != 0
+    assert "migrate_db.py" in result.stderr
+    with open(db_path, "rb") as f:
+        assert f.read() == before
+
+    subprocess.run([sys.executable, os.path.join(HERE, "migrate_db.py"), db_path], check=True, capture_output=True)
+    assert convert(tmp_path, "--db", db_path, "--out", out).returncode == 0
+    rows = read_csv(out)
+    assert [row["flight_number"] for row in rows] == ["B6123", "B6223"]
+    assert [row["price_cents"] for row in rows] == ["11652", "12000"]
+
+
+def test_incremental_export_includes_updates_that_keep_the_price(tmp_path):
+    db_path = str(tmp_path / "database.db")
+    make_baseline_db(db_path)
+    init_db(db_path)
+    state, out = str(tmp_path / "state.json"), str(tmp_path / "delta.csv")
+    incremental = ("--db", db_path, "--incremental", "--state", state, "--out", out)
+    assert convert(tmp_path, *incremental).returncode == 0
+    assert len(read_csv(out)) == 2
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO carriers (code, name, fetched_at) VALUES ('B6', 'JETBLUE AIRWAYS', 0)")
+    conn.commit()
+    conn.execute("UPDATE flights SET stops = 0 WHERE flight_number = 'B6123'")
+    conn.commit()
+    conn.close()
+    assert convert(tmp_path, *incremental).returncode == 0
+    rows = read_csv(out)
+    assert [(row["flight_number"], row["airline_full_name"]) for row in rows] == [
+        ("B6123", "JETBLUE AIRWAYS"), ("B6223", "JETBLUE AIRWAYS")]
+
+    assert convert(tmp_path, *incremental).returncode == 0
+    assert read_csv(out) == []
@@ -0,0 +1,44 @@
+from datetime import date
+
+import pytest
+
+import main
+from auth import AuthError
+from crawl_planner import MAX_ATTEMPTS, plan, queue_status, run_worker
+from db_utils import connect, init_db
+from fake_amadeus import make_offer
+
+START = date(2025, 10, 1)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "crawl.db")
+    init_db(path)
+    conn = connect(path)
+    plan(conn, [("JFK", "LAX")], start=START, days=4, budget=4)
+    conn.close()
+    return path
+
+
+def test_a_bad_task_does_not_lose_the_batch(db_path, monkeypatch):
+    def fetch_day(origin, destination, departure_date, recorder=None):
+        if departure_date == "2025-10-02":
+            raise AuthError("no access token")
+        if departure_date == "2025-10-03":
+            # An offer without the fields offers_to_flights reads
+            return {"data": [{"id": "1"}]}
+        return {"data": [make_offer(origin, destination, departure_date, i) for i in range(3)]}
+
+    monkeypatch.setattr(main, "fetch_day", fetch_day)
+    stats = run_worker(db_path, "test-worker", batch_size=4, threads=2)
+
+    # Failed tasks go back to the queue until they run out of attempts
+    assert stats == {"tasks": 2, "failed": 2 * MAX_ATTEMPTS, "rows": 6}
+    conn = connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM flights").fetchone()[0] == 6
+    errors = dict(conn.execute("SELECT departure_date, last_error FROM crawl_tasks WHERE last_error IS NOT NULL"))
+    assert errors["2025-10-02"].startswith("AuthError")
+    assert "2025-10-03" in errors
+    assert queue_status(conn) == {"idle": 2, "failed": 2}
+    conn.close()
@@ -0,0 +1,65 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from db_utils import init_db
+from db_writer import FlightWriter
+
+
+def close_in_thread(writer, timeout=10):
+    """
+    Runs writer.close() in a thread so a hung writer fails the test instead of the run.
+    """
+    outcome = {}
+
+    def run():
+        try:
+            outcome["stats"] = writer.close()
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "close() did not return"
+    return outcome
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "flights.db")
+    init_db(path)
+    return path
+
+
+def test_close_raises_when_final_flush_fails(db_path):
+    writer = FlightWriter(db_path, batch_size=1000, flush_interval=60).start()
+    # Too few parameters for the upsert, so the flush that runs on close fails inside executemany
+    writer.put_rows([("XX1", "JFK")])
+    outcome = close_in_thread(writer)
+    assert isinstance(outcome.get("error"), sqlite3.ProgrammingError)
+
+
+def test_close_returns_after_earlier_flush_fails(db_path):
+    writer = FlightWriter(db_path, batch_size=1, flush_interval=60).start()
+    writer.put_rows([("XX1", "JFK")])
+    writer.put_rows([("XX2", "JFK")])
+    outcome = close_in_thread(writer)
+    assert isinstance(outcome.get("error"), sqlite3.ProgrammingError)
+    with pytest.raises(sqlite3.ProgrammingError):
+        writer.put_rows([("XX3", "JFK")])
+
+
+def test_unopenable_database_is_reported(tmp_path):
+    # The parent directory does not exist, so connect() fails in the writer thread
+    writer = FlightWriter(str(tmp_path / "missing" / "flights.db"), flush_interval=60).start()
+    # The thread keeps draining the queue until close(), so wait for the error instead of the thread
+    deadline = time.monotonic() + 10
+    while writer._error is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    with pytest.raises(sqlite3.OperationalError):
+        writer.put_rows([("XX1", "JFK")])
+    outcome = close_in_thread(writer)
+    assert isinstance(outcome.get("error"), sqlite3.OperationalError)
@@ -0,0 +1,41 @@
+import io
+import json
+import logging
+
+import pytest
+
+from metrics import JsonFormatter, RedactingFilter
+
+TOKEN = "abc123secrettoken"
+
+
+@pytest.fixture
+def log():
+    def run(formatter):
+        stream = io.StringIO()
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(formatter)
+        handler.addFilter(RedactingFilter(["my-api-key"]))
+        logger = logging.getLogger("test_metrics")
+        logger.handlers = [handler]
+        logger.propagate = False
+        try:
+            raise RuntimeError(f"request failed: Authorization: Bearer {TOKEN} key=my-api-key")
+        except RuntimeError:
+            logger.exception("fetch failed for Bearer %s", TOKEN)
+        return stream.getvalue()
+    return run
+
+
+def test_text_traceback_is_redacted(log):
+    output = log(logging.Formatter("%(levelname)s %(message)s"))
+    assert "Traceback" in output and "RuntimeError" in output
+    assert TOKEN not in output
+    assert "my-api-key" not in output
+
+
+def test_json_traceback_is_redacted(log):
+    entry = json.loads(log(JsonFormatter()))
+    assert "RuntimeError" in entry["exc"]
+    assert TOKEN not in entry["exc"] and TOKEN not in entry["msg"]
+    assert "my-api-key" not in entry["exc"]
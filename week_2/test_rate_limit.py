@@ -0,0 +1,101 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+import pytest
+import requests
+
+from fake_amadeus import start_server
+from rate_limit import AdaptiveConcurrency, ApiClient
+
+OFFERS_PATH = "/v2/shopping/flight-offers"
+OFFERS_PARAMS = {"originLocationCode": "JFK", "destinationLocationCode": "LAX", "departureDate": "2025-10-01"}
+
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def start(**kwargs):
+        server = start_server(**kwargs)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def make_client(initial=4, **kwargs):
+    # No rate cap, so only the server's throttling and the concurrency limit shape the traffic
+    concurrency = AdaptiveConcurrency(initial=initial, maximum=initial, cooldown=0)
+    return ApiClient("test", rate=0, concurrency=concurrency, base_delay=0.01, **kwargs)
+
+
+def test_concurrency_limit_halves_when_throttled(server):
+    fake = server(rate_limit=2)
+    client = make_client(initial=8)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(
+            lambda _: client.request("GET", fake.base_url + OFFERS_PATH, params=OFFERS_PARAMS), range(8)
+        ))
+    assert all(response.status_code == 200 for response in responses)
+    assert fake.throttled > 0
+    assert client.stats["throttled"] == fake.throttled
+    assert client.concurrency.limit < 8
+    assert client.concurrency.in_flight == 0
+
+
+def test_retry_after_is_honored(server):
+    fake = server(rate_limit=1)
+    client = make_client()
+    url = fake.base_url + OFFERS_PATH
+    assert client.request("GET", url, params=OFFERS_PARAMS).status_code == 200
+    started = time.monotonic()
+    response = client.request("GET", url, params=OFFERS_PARAMS)
+    # The fake answers 429 with Retry-After: 1 until its one-second window ends
+    assert response.status_code == 200
+    assert time.monotonic() - started >= 1.0
+    assert client.stats["retries"] == 1
+
+
+@pytest.mark.parametrize("error", [KeyError("status"), requests.HTTPError("401"), RuntimeError("boom")])
+def test_slot_released_when_send_raises(error):
+    client = make_client(initial=2)
+
+    def send():
+        raise error
+
+    for _ in range(3):
+        with pytest.raises(type(error)):
+            client.call(send)
+    assert client.concurrency.in_flight == 0
+
+
+def test_slot_released_when_status_of_raises():
+    client = make_client(initial=2)
+    for _ in range(3):
+        with pytest.raises(KeyError):
+            client.call(lambda: {}, status_of=lambda response: response["status"])
+    assert client.concurrency.in_flight == 0
+
+
+def test_slot_released_when_async_request_is_cancelled(server):
+    fake = server(latency=5.0)
+    client = make_client(initial=2)
+
+    async def run():
+        async with aiohttp.ClientSession() as session:
+            tasks = [asyncio.create_task(client.request_async(session, "GET", fake.base_url + OFFERS_PATH,
+                                                              params=OFFERS_PARAMS))
+                     for _ in range(2)]
+            await asyncio.sleep(0.2)
+            assert client.concurrency.in_flight == 2
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(run())
+    assert client.concurrency.in_flight == 0
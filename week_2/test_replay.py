@@ -0,0 +1,26 @@
+import pytest
+
+from replay import ResponseRecorder, iter_chunks, open_recording
+
+RESPONSES = [
+    ("JFK", "LAX", "2025-10-01", {"meta": {"count": 0}, "data": []}),
+    ("JFK", "LHR", "2025-10-02", {"meta": {"count": 0}, "data": []}),
+]
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".jsonl.gz", ".jsonl.zst"])
+def test_recording_round_trip(tmp_path, suffix):
+    if suffix.endswith(".zst"):
+        pytest.importorskip("zstandard")
+    path = str(tmp_path / f"responses{suffix}")
+    # Two sessions append to the same recording, as repeated crawls do
+    for responses in (RESPONSES[:1], RESPONSES[1:]):
+        with ResponseRecorder(path) as recorder:
+            for response in responses:
+                recorder.write(*response)
+
+    lines = [line for chunk in iter_chunks([path], chunk_size=1) for line in chunk]
+    assert len(lines) == 2
+    assert [line.startswith(b'{"origin":"JFK"') for line in lines] == [True, True]
+    with open_recording(path) as f:
+        assert b'"destination":"LHR"' in f.read()
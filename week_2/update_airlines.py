@@ -1,5 +1,11 @@
 import sqlite3
+import sys
 
+from airlineUtils import get_resolver
+from db_utils import migrate, enrich_airline_names
+from metrics import metrics, setup_logging, stage_summary
+
+# Offline fallback, only used with --offline; the carriers table is filled from the API otherwise
 carrier_map = {
     "WS": "WestJet",
     "VS": "Virgin Atlantic",
@@ -21,32 +27,38 @@ carrier_map = {
 }
 
 
-conn = sqlite3.connect('database.db')
-cursor = conn.cursor()
-
-try:
-    cursor.execute("ALTER TABLE flights ADD COLUMN airline_full_name TEXT;")
-except sqlite3.OperationalError as e:
-    if "duplicate column name" in str(e).lower():
-        print("Column 'airline_full_name' already exists. Skipping creation.")
-    else:
-        raise
+def count_unnamed(conn):
+    return conn.execute("SELECT COUNT(*) FROM flights WHERE airline_full_name IS NULL;").fetchone()[0]
 
 
-cursor.execute("SELECT id, airline FROM flights;")
-rows = cursor.fetchall()
+setup_logging()
+conn = sqlite3.connect('database.db')
+# Adds airline_full_name, the carriers table and the enrichment triggers if they are missing
+migrate(conn)
 
-# iterate through the rows and make the full airline name
-for row_id, code in rows:
-    full_name = carrier_map.get(code)
-    if full_name:
-        cursor.execute(
-            "UPDATE flights SET airline_full_name = ? WHERE id = ?;",
-            (full_name, row_id)
-        )
+unnamed_before = count_unnamed(conn)
+# Only codes of rows that still lack a name; served by the partial index on unnamed rows
+cursor = conn.execute("SELECT DISTINCT airline FROM flights WHERE airline_full_name IS NULL;")
+missing_codes = [row[0] for row in cursor.fetchall()]
 
+if "--offline" in sys.argv:
+    with conn:
+        # Also fills carriers cached without a name, e.g. by an API lookup that failed
+        conn.executemany("""
+            INSERT INTO carriers (code, name, fetched_at) VALUES (?, ?, strftime('%s', 'now'))
+            ON CONFLICT (code) DO UPDATE SET name = excluded.name, fetched_at = excluded.fetched_at
+            WHERE carriers.name IS NULL;
+        """, [(code, carrier_map[code]) for code in missing_codes if code in carrier_map])
+elif missing_codes:
+    # One batched API call for every code the carriers cache does not know yet
+    with metrics.timer("stage_seconds", stage="resolve"):
+        get_resolver('database.db').resolve(missing_codes)
 
-conn.commit()
+# Newly cached carriers fill their flights through a trigger; this catches anything already cached
+with metrics.timer("stage_seconds", stage="enrich"), conn:
+    enrich_airline_names(conn)
+updated = unnamed_before - count_unnamed(conn)
 conn.close()
 
-print("Airline names updated successfully.")
\ No newline at end of file
+print(f"Airline names updated successfully ({updated} rows, {len(missing_codes)} carriers looked up).")
+print(f"Time by stage: {stage_summary()}")
@@ -0,0 +1,134 @@
+import csv
+import os
+from functools import lru_cache
+
+import numpy as np
+
+# Radius of earth in miles, as used by FlightComparator's original Haversine
+EARTH_RADIUS_MILES = 3956
+
+# Bundled offline dataset: every open airport, seaplane base and heliport with
+# an IATA code in OurAirports (public domain, 2022-10-11 release), about 8,900
+# rows. Where a code is shared, the largest airport with scheduled service wins.
+# A newer OurAirports airports.csv has the same iata_code/latitude_deg/longitude_deg
+# columns; point AIRPORTS_CSV at it (or pass it to load()) to use it instead.
+BUNDLED_AIRPORTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "airports.csv")
+DEFAULT_AIRPORTS_PATH = os.getenv("AIRPORTS_CSV") or BUNDLED_AIRPORTS_PATH
+
+
+class AirportIndex:
+    """
+    Airport coordinates held as compact NumPy arrays with a code -> index map,
+    so great-circle distances for whole result sets are computed in one
+    vectorized pass. An all-pairs distance matrix can be precomputed once
+    and memory-mapped from disk, turning every distance into an array lookup.
+    """
+
+    def __init__(self, codes, latitudes, longitudes):
+        self.codes = list(codes)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+        self.lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+        self.cos_lat = np.cos(self.lat)
+        self.matrix = None
+
+    @classmethod
+    def load(cls, path=DEFAULT_AIRPORTS_PATH):
+        codes, latitudes, longitudes = [], [], []
+        seen = set()
+        with open(path, newline="", encoding="utf8") as f:
+            for row in csv.DictReader(f):
+                code = (row.get("iata_code") or "").strip().upper()
+                if len(code) != 3 or code in seen:
+                    continue
+                seen.add(code)
+                codes.append(code)
+                latitudes.append(float(row["latitude_deg"]))
+                longitudes.append(float(row["longitude_deg"]))
+        return cls(codes, latitudes, longitudes)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def missing(self, *codes):
+        """
+        The given airport codes that are not in the dataset, in order.
+        """
+        return [code for code in codes if code not in self.index]
+
+    def lookup(self, codes):
+        """
+        Maps airport codes to array positions, with -1 for unknown codes.
+        """
+        return np.fromiter((self.index.get(code, -1) for code in codes), dtype=np.int64)
+
+    def _haversine(self, i, j):
+        dlat = self.lat[j] - self.lat[i]
+        dlon = self.lon[j] - self.lon[i]
+        a = np.sin(dlat / 2) ** 2 + self.cos_lat[i] * self.cos_lat[j] * np.sin(dlon / 2) ** 2
+        return 2 * np.arcsin(np.sqrt(a)) * EARTH_RADIUS_MILES
+
+    def distances(self, origins, destinations):
+        """
+        Great-circle distances in miles for paired sequences of airport codes.
+        Pairs involving an unknown airport come back as NaN.
+        """
+        i = self.lookup(origins)
+        j = self.lookup(destinations)
+        known = (i >= 0) & (j >= 0)
+        result = np.full(len(i), np.nan)
+        if self.matrix is not None:
+            result[known] = self.matrix[i[known], j[known]]
+        else:
+            result[known] = self._haversine(i[known], j[known])
+        return result
+
+    def distance(self, airport1, airport2):
+        """
+        Distance in miles between two airports, or None if either is unknown.
+        """
+        i = self.index.get(airport1)
+        j = self.index.get(airport2)
+        if i is None or j is None:
+            return None
+        if self.matrix is not None:
+            return float(self.matrix[i, j])
+        return float(self._haversine(i, j))
+
+    def build_matrix(self, path):
+        """
+        Writes the all-pairs distance matrix (float32 miles) to a .npy file,
+        one row at a time so building it never needs the full matrix in memory.
+        For the full bundled dataset that file is about 300 MB.
+        """
+        count = len(self.codes)
+        matrix = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(count, count))
+        columns = np.arange(count)
+        for row in range(count):
+            matrix[row] = self._haversine(np.full(count, row), columns)
+        matrix.flush()
+        del matrix
+
+    def load_matrix(self, path):
+        """
+        Memory-maps a matrix written by build_matrix for this same airport list.
+        """
+        matrix = np.load(path, mmap_mode="r")
+        if matrix.shape != (len(self.codes), len(self.codes)):
+            raise ValueError(f"{path} does not match the {len(self.codes)} loaded airports")
+        self.matrix = matrix
+        return self
+
+
+@lru_cache(maxsize=None)
+def get_airport_index(path=DEFAULT_AIRPORTS_PATH, matrix_path=None):
+    """
+    Returns the shared index for `path`, loaded on first use; with `matrix_path`
+    the precomputed distance matrix is memory-mapped (and built first if missing).
+    """
+    airports = AirportIndex.load(path)
+    if matrix_path:
+        if not os.path.exists(matrix_path):
+            airports.build_matrix(matrix_path)
+        airports.load_matrix(matrix_path)
+    return airports
@@ -0,0 +1,92 @@
+"""
+Memory and scan time of FlightComparator's per-flight records: the dicts
+extract_flight_info used to build, slotted FareRecords, and streaming the
+records straight into a FareAggregator without keeping them.
+
+    python bench_fare_records.py --flights 100000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from operator import attrgetter, itemgetter
+
+from fake_serpapi import FakeGoogleSearch
+from fare_record import FareRecord
+from fare_stats import FareAggregator
+
+DISTANCE = 2475.0
+
+
+def dict_record(flight, distance):
+    # extract_flight_info before FareRecord, kept as the baseline
+    flight_info = {
+        'price': flight.get('price', 'N/A'),
+        'airline': flight.get('flights', [{}])[0].get('airline', 'Unknown'),
+        'duration': flight.get('total_duration', 'N/A'),
+        'departure_time': flight.get('flights', [{}])[0].get('departure_airport', {}).get('time', 'N/A'),
+        'arrival_time': flight.get('flights', [{}])[-1].get('arrival_airport', {}).get('time', 'N/A'),
+        'layovers': len(flight.get('layovers', [])),
+        'layover_details': [],
+        'distance_miles': round(distance, 0),
+        'cost_per_mile': None
+    }
+    if isinstance(flight_info['price'], (int, float)):
+        flight_info['cost_per_mile'] = round(flight_info['price'] / distance, 3)
+    for layover in flight.get('layovers', []):
+        flight_info['layover_details'].append({
+            'airport': layover.get('name', 'Unknown'),
+            'duration': layover.get('duration', 'N/A')
+        })
+    return flight_info
+
+
+def make_flights(count):
+    search = FakeGoogleSearch({"departure_id": "JFK", "arrival_id": "LAX", "outbound_date": "2025-12-01"})
+    return [search._flight(seed, seed % 3) for seed in range(count)]
+
+
+def measure(build, flights):
+    """
+    Returns (peak bytes while building, bytes still held by the result, result).
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = build(flights)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, retained, result
+
+
+def cheapest_scan(records, price):
+    started = time.perf_counter()
+    min((record for record in records if price(record) is not None), key=price)
+    return time.perf_counter() - started
+
+
+def aggregate(flights):
+    stats = FareAggregator()
+    for flight in flights:
+        stats.add(FareRecord.from_serpapi(flight, DISTANCE), 'layover' if flight.get('layovers') else 'direct')
+    return stats.summary()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-flight record memory: dicts vs FareRecord vs streaming")
+    parser.add_argument("--flights", type=int, default=100000)
+    args = parser.parse_args()
+
+    flights = make_flights(args.flights)
+    variants = [
+        ("dict records", lambda fs: [dict_record(f, DISTANCE) for f in fs], itemgetter('price')),
+        ("FareRecord list", lambda fs: [FareRecord.from_serpapi(f, DISTANCE) for f in fs], attrgetter('price')),
+        ("streamed summary", aggregate, None),
+    ]
+    print(f"{args.flights} flights")
+    print(f"{'variant':>18} {'peak B/flight':>14} {'kept B/flight':>14} {'min() ms':>9}")
+    for name, build, price in variants:
+        peak, retained, result = measure(build, flights)
+        scan = f"{cheapest_scan(result, price) * 1000:.1f}" if price else "-"
+        print(f"{name:>18} {peak / args.flights:>14.0f} {retained / args.flights:>14.0f} {scan:>9}")
+        del result
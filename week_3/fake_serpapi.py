@@ -0,0 +1,93 @@
+"""
+Offline stand-in for serpapi.GoogleSearch, returning deterministic google_flights
+results so FlightComparator can be exercised without spending SerpApi quota.
+
+    comparator = FlightComparator("unused", search_client=FakeGoogleSearch)
+
+Setting FakeGoogleSearch.throttle_every = n answers every n-th call with a
+429 and Retry-After, to exercise the shared rate limiter's retries.
+"""
+import json
+import threading
+import time
+import zlib
+
+AIRLINES = ["Delta", "American", "United", "JetBlue", "Alaska", "Southwest"]
+HUBS = [("ATL", "Hartsfield-Jackson Atlanta International Airport"),
+        ("CLT", "Charlotte Douglas International Airport"),
+        ("DFW", "Dallas/Fort Worth International Airport"),
+        ("ORD", "Chicago O'Hare International Airport")]
+
+
+class FakeResponse:
+    """
+    The parts of a requests.Response that FlightComparator uses.
+    """
+
+    def __init__(self, status_code, body, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = json.dumps(body)
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeGoogleSearch:
+    # Simulated SerpApi round trip in seconds
+    latency = 0.0
+    calls = 0
+    throttle_every = 0
+    _lock = threading.Lock()
+
+    def __init__(self, params):
+        self.params = params
+
+    def _flight(self, seed, stops):
+        departure_id = self.params["departure_id"]
+        arrival_id = self.params["arrival_id"]
+        date = self.params["outbound_date"]
+        stops_at = [HUBS[(seed + i) % len(HUBS)] for i in range(stops)]
+        airports = [(departure_id, departure_id)] + stops_at + [(arrival_id, arrival_id)]
+        legs = []
+        for i, (origin, destination) in enumerate(zip(airports, airports[1:])):
+            legs.append({
+                "departure_airport": {"name": origin[1], "id": origin[0], "time": f"{date} {7 + 3 * i:02d}:00"},
+                "arrival_airport": {"name": destination[1], "id": destination[0], "time": f"{date} {9 + 3 * i:02d}:15"},
+                "duration": 135,
+                "airline": AIRLINES[seed % len(AIRLINES)],
+                "flight_number": f"XX {100 + seed % 900}",
+            })
+        flight = {
+            "flights": legs,
+            "total_duration": 135 * len(legs) + 45 * stops,
+            "price": 150 + seed % 450 - 40 * stops,
+            "type": "Round trip" if self.params.get("return_date") else "One way",
+        }
+        if stops:
+            flight["layovers"] = [{"duration": 45, "name": name, "id": code} for code, name in stops_at]
+        return flight
+
+    def get_response(self):
+        cls = type(self)
+        with cls._lock:
+            cls.calls += 1
+            throttled = cls.throttle_every and cls.calls % cls.throttle_every == 0
+        if throttled:
+            return FakeResponse(429, {"error": "Too many requests"}, {"Retry-After": "0"})
+        return FakeResponse(200, self._results())
+
+    def get_dict(self):
+        return self.get_response().json()
+
+    def _results(self):
+        if self.latency:
+            time.sleep(self.latency)
+        seed = zlib.crc32(repr(sorted((k, str(v)) for k, v in self.params.items() if k != "api_key")).encode())
+        max_stops = int(self.params.get("stops", 2))
+        flights = [self._flight(seed + i, min(i % 3, max_stops)) for i in range(8)]
+        return {
+            "search_parameters": {k: v for k, v in self.params.items() if k != "api_key"},
+            "best_flights": flights[:3],
+            "other_flights": flights[3:],
+        }
@@ -0,0 +1,80 @@
+from fare_stats import parse_price
+
+
+class FareRecord:
+    """
+    One SerpApi flight reduced to the fields FlightComparator uses, with numeric
+    values parsed once: price in dollars, durations in minutes (None when unknown).
+    Layovers are a tuple of (airport name, minutes) pairs.
+
+    Slots keep each record to a fixed handful of pointers instead of a dict per
+    flight plus a dict per layover. Records also read like the dicts they
+    replace (record['price'], record.get('cost_per_mile'), {**record}).
+    """
+    __slots__ = ("price", "airline", "duration", "departure_time", "arrival_time",
+                 "layovers", "layover_details", "distance_miles", "cost_per_mile")
+
+    def __init__(self, price, airline, duration, departure_time, arrival_time,
+                 layover_details=(), distance_miles=None, cost_per_mile=None):
+        self.price = price
+        self.airline = airline
+        self.duration = duration
+        self.departure_time = departure_time
+        self.arrival_time = arrival_time
+        self.layovers = len(layover_details)
+        self.layover_details = layover_details
+        self.distance_miles = distance_miles
+        self.cost_per_mile = cost_per_mile
+
+    @classmethod
+    def from_serpapi(cls, flight, distance=None):
+        """
+        Builds a record from one entry of a google_flights best_flights/other_flights
+        list; `distance` is the route's great-circle distance in miles, if known.
+        """
+        legs = flight.get('flights') or [{}]
+        price = parse_price(flight.get('price'))
+        duration = flight.get('total_duration')
+        layover_details = tuple(
+            (layover.get('name', 'Unknown'), layover.get('duration'))
+            for layover in flight.get('layovers') or ()
+        )
+        cost_per_mile = None
+        if distance and price is not None:
+            cost_per_mile = round(price / distance, 3)
+        return cls(
+            price=price,
+            airline=legs[0].get('airline', 'Unknown'),
+            duration=duration if isinstance(duration, int) else None,
+            departure_time=legs[0].get('departure_airport', {}).get('time'),
+            arrival_time=legs[-1].get('arrival_airport', {}).get('time'),
+            layover_details=layover_details,
+            distance_miles=round(distance, 0) if distance else None,
+            cost_per_mile=cost_per_mile,
+        )
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def keys(self):
+        return self.__slots__
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __repr__(self):
+        return f"FareRecord({', '.join(f'{key}={getattr(self, key)!r}' for key in self.__slots__)})"
+
+
+def format_price(price):
+    return "N/A" if price is None else f"${price:,.2f}"
+
+
+def format_minutes(minutes):
+    return "N/A" if minutes is None else f"{minutes // 60}h {minutes % 60:02d}m"
@@ -0,0 +1,90 @@
+from array import array
+
+import numpy as np
+
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def parse_price(price):
+    """
+    Converts a SerpApi price (a number, or a string like "412" / "412.50") to float.
+    Returns None for anything else, such as 'N/A'.
+    """
+    if isinstance(price, bool):
+        return None
+    if isinstance(price, (int, float)):
+        return float(price)
+    if isinstance(price, str):
+        try:
+            return float(price.replace("$", "").replace(",", ""))
+        except ValueError:
+            return None
+    return None
+
+
+class FareAggregator:
+    """
+    Streaming summary of flight offers (dicts or fare_record.FareRecord). Each
+    flight's price is parsed once when it is added; per-category and overall
+    cheapest flights, the best cost per mile, counts and running total are updated in the same step,
+    and prices are kept in a compact float array for percentiles.
+
+        stats = FareAggregator()
+        stats.add_all(results['direct_flights'], 'direct')
+        stats.add_all(results['layover_flights'], 'layover')
+        summary = stats.summary()
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.counts = {}
+        self.total = 0.0
+        self.prices = array("d")
+        self.cheapest = {}
+        self.overall_cheapest = None
+        self.best_value = None
+
+    def add(self, flight, category):
+        self.count += 1
+        self.counts[category] = self.counts.get(category, 0) + 1
+        price = parse_price(flight.get('price'))
+        if price is not None:
+            self.total += price
+            self.prices.append(price)
+            # Strict comparisons keep the first flight on ties, like min() did
+            current = self.cheapest.get(category)
+            if current is None or price < current[0]:
+                self.cheapest[category] = (price, flight)
+            if self.overall_cheapest is None or price < self.overall_cheapest[0]:
+                self.overall_cheapest = (price, flight)
+        cost_per_mile = flight.get('cost_per_mile')
+        if cost_per_mile is not None and (self.best_value is None or cost_per_mile < self.best_value[0]):
+            self.best_value = (cost_per_mile, flight)
+
+    def add_all(self, flights, category=None):
+        """
+        Adds many flights; with category=None each flight's own 'category' field is used,
+        as in FlightComparator.compare_many records.
+        """
+        for flight in flights:
+            self.add(flight, flight.get('category') if category is None else category)
+        return self
+
+    def summary(self, percentiles=DEFAULT_PERCENTILES):
+        """
+        Returns the collected statistics. Cheapest entries are (price, flight) tuples.
+        """
+        priced = len(self.prices)
+        values = np.frombuffer(self.prices, dtype=np.float64) if priced else None
+        return {
+            'count': self.count,
+            'counts': dict(self.counts),
+            'priced': priced,
+            'mean': self.total / priced if priced else None,
+            'min': float(values.min()) if priced else None,
+            'max': float(values.max()) if priced else None,
+            'percentiles': dict(zip(percentiles, np.percentile(values, percentiles).tolist())) if priced else {},
+            'cheapest': dict(self.cheapest),
+            'overall_cheapest': self.overall_cheapest,
+            'best_value': self.best_value,
+        }
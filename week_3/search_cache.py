@@ -0,0 +1,93 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+# SerpApi flight prices move during the day; reuse a response for at most this long
+DEFAULT_TTL = 6 * 3600
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+
+def cache_key(params):
+    """
+    Normalizes search params into a stable key. The api_key is left out so
+    rotating keys does not invalidate the cache, and values are compared as strings.
+    """
+    normalized = {k: str(v) for k, v in params.items() if k != "api_key" and v is not None}
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+
+class SearchCache:
+    """
+    Persistent on-disk cache of SerpApi responses, stored zlib-compressed in SQLite.
+    Entries expire after `ttl` seconds, and the least recently used ones are
+    evicted once the stored payloads exceed `max_bytes`.
+    """
+
+    def __init__(self, path="serp_cache.db", ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_cache (
+                key TEXT PRIMARY KEY,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_access ON search_cache (last_access)")
+        self._conn.commit()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, params):
+        """
+        Returns the cached response dict for `params`, or None if absent or expired.
+        """
+        key = cache_key(params)
+        now = self._clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM search_cache WHERE key = ? AND created_at > ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE search_cache SET last_access = ? WHERE key = ?", (now, key))
+            self.stats["hits"] += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, params, result):
+        payload = zlib.compress(json.dumps(result).encode())
+        now = self._clock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, payload, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (cache_key(params), payload, len(payload), now, now)
+            )
+            self._conn.execute("DELETE FROM search_cache WHERE created_at <= ?", (now - self.ttl,))
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM search_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM search_cache ORDER BY last_access ASC"
+        ).fetchall():
+            self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+            self.stats["evictions"] += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def close(self):
+        self._conn.close()
@@ -1,61 +1,43 @@
 from serpapi import GoogleSearch
-import json
-from datetime import datetime
 import math
 import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from dotenv import load_dotenv
+from search_cache import SearchCache
+from airports import get_airport_index
+from fare_stats import FareAggregator
+from fare_record import FareRecord, format_minutes, format_price
+
+# Shared API utilities (rate limiting) live with the ingestion code in week_2
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "week_2"))
+from rate_limit import serpapi_client
 
 load_dotenv()
 
 api_key = os.getenv("SERPAPI_SECRET")
 
 class FlightComparator:
-    def __init__(self, api_key):
+    def __init__(self, api_key, search_client=GoogleSearch, cache=None, airports=None):
         self.api_key = api_key
-        self.results = {
-            'direct_flights': [],
-            'layover_flights': [],
-            'comparison': {}
-        }
-        # Airport coordinates for distance calculation (lat, lon)
-        self.airport_coords = {
-            'CHS': (32.8986, -80.0405),  # Charleston
-            'LGA': (40.7769, -73.8740),  # LaGuardia
-            'ATL': (33.6407, -84.4277),  # Atlanta
-            'CLT': (35.2144, -80.9473),  # Charlotte
-            'DFW': (32.8998, -97.0403),  # Dallas
-            'ORD': (41.9742, -87.9073),  # Chicago O'Hare
-            'LAX': (33.9425, -118.4081), # Los Angeles
-            'JFK': (40.6413, -73.7781),  # JFK
-            'MIA': (25.7959, -80.2870),  # Miami
-            'BOS': (42.3656, -71.0096),  # Boston
-            # Add more airports as needed
-        }
+        # Anything built as search_client(params) with get_response() and get_dict() methods,
+        # e.g. fake_serpapi.FakeGoogleSearch
+        self.search_client = search_client
+        # Optional SearchCache; identical searches are then served from disk instead of SerpApi
+        self.cache = cache
+        # Summary of the last compare_routes call (see FareAggregator.summary)
+        self.results = {'comparison': {}}
+        # Offline airport coordinates as NumPy arrays (see airports.py)
+        self.airports = airports or get_airport_index()
     
     def calculate_distance(self, airport1, airport2):
         """
         Calculate the great circle distance between two airports using Haversine formula
-        Returns distance in miles
+        Returns distance in miles, or None if either airport is not in the dataset
         """
-        if airport1 not in self.airport_coords or airport2 not in self.airport_coords:
-            return None
-        
-        lat1, lon1 = self.airport_coords[airport1]
-        lat2, lon2 = self.airport_coords[airport2]
-        
-        # Convert latitude and longitude from degrees to radians
-        lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-        
-        # Haversine formula
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        
-        # Radius of earth in miles
-        r = 3956
-        
-        return c * r
+        return self.airports.distance(airport1, airport2)
     
     def calculate_value_per_mile(self, price, distance):
         """
@@ -65,9 +47,10 @@ class FlightComparator:
             return price / distance
         return None
     
-    def search_flights(self, departure_id, arrival_id, outbound_date, return_date=None, stops=None):
+    def search_flights(self, departure_id, arrival_id, outbound_date, return_date=None, stops=None, verbose=True):
         """
-        Search for flights with specified parameters
+        Search for flights with specified parameters.
+        A failed search returns {"error": message}, the shape SerpApi itself uses for errors.
         """
         params = {
             "api_key": self.api_key,
@@ -86,82 +69,126 @@ class FlightComparator:
         if stops is not None:
             params["stops"] = str(stops)
         
-        print(f"🔍 Searching flights from {departure_id} to {arrival_id}")
-        print(f"   Outbound: {outbound_date}")
+        # Built as one string so searches running in parallel do not interleave their lines
+        lines = [f"🔍 Searching flights from {departure_id} to {arrival_id}",
+                 f"   Outbound: {outbound_date}"]
         if return_date:
-            print(f"   Return: {return_date}")
-        print(f"   Stops: {'Direct flights only' if stops == 0 else f'Up to {stops} stops' if stops else 'Any number of stops'}")
-        print("-" * 60)
+            lines.append(f"   Return: {return_date}")
+        lines.append(f"   Stops: {'Direct flights only' if stops == 0 else f'Up to {stops} stops' if stops else 'Any number of stops'}")
+        lines.append("-" * 60)
+        if verbose:
+            print("\n".join(lines))
+        
+        if self.cache:
+            cached = self.cache.get(params)
+            if cached is not None:
+                return cached
         
         try:
-            search = GoogleSearch(params)
-            results = search.get_dict()
-            return results
+            # get_response exposes the HTTP status, so throttled searches are retried by the shared limiter
+            search = self.search_client(params)
+            response = serpapi_client.call(search.get_response)
+            results = response.json()
         except Exception as e:
-            print(f"❌ Error searching flights: {e}")
-            return None
+            if verbose:
+                print(f"❌ Error searching flights: {e}")
+            return {"error": str(e)}
+        
+        # Error responses are not cached so the next run retries them
+        if self.cache and results and "error" not in results:
+            self.cache.put(params, results)
+        return results
     
-    def extract_flight_info(self, flight, departure_id, arrival_id):
+    def extract_flight_info(self, flight, departure_id, arrival_id, distance=None):
         """
-        Extract relevant information from flight data including value per mile
+        Extract relevant information from flight data including value per mile, as a FareRecord.
+        Pass the route's `distance` when extracting many flights of one route.
         """
-        flight_info = {
-            'price': flight.get('price', 'N/A'),
-            'airline': flight.get('flights', [{}])[0].get('airline', 'Unknown'),
-            'duration': flight.get('total_duration', 'N/A'),
-            'departure_time': flight.get('flights', [{}])[0].get('departure_airport', {}).get('time', 'N/A'),
-            'arrival_time': flight.get('flights', [{}])[-1].get('arrival_airport', {}).get('time', 'N/A'),
-            'layovers': len(flight.get('layovers', [])),
-            'layover_details': [],
-            'distance_miles': None,
-            'cost_per_mile': None
-        }
-        
-        # Calculate distance and cost per mile
-        distance = self.calculate_distance(departure_id, arrival_id)
-        if distance:
-            flight_info['distance_miles'] = round(distance, 0)
-            if isinstance(flight_info['price'], (int, float)):
-                cost_per_mile = self.calculate_value_per_mile(flight_info['price'], distance)
-                if cost_per_mile:
-                    flight_info['cost_per_mile'] = round(cost_per_mile, 3)
-        
-        # Extract layover information
-        if 'layovers' in flight:
-            for layover in flight['layovers']:
-                layover_info = {
-                    'airport': layover.get('name', 'Unknown'),
-                    'duration': layover.get('duration', 'N/A')
-                }
-                flight_info['layover_details'].append(layover_info)
-        
-        return flight_info
+        if distance is None:
+            distance = self.calculate_distance(departure_id, arrival_id)
+        return FareRecord.from_serpapi(flight, distance)
     
     def display_flight_details(self, flight_info, flight_type):
         """
         Display detailed flight information including value per mile
         """
         print(f"✈️  {flight_type.upper()} FLIGHT")
-        print(f"   💰 Price: ${flight_info['price']}")
+        print(f"   💰 Price: {format_price(flight_info['price'])}")
         print(f"   🏢 Airline: {flight_info['airline']}")
-        print(f"   ⏱️  Duration: {flight_info['duration']}")
-        print(f"   🛫 Departure: {flight_info['departure_time']}")
-        print(f"   🛬 Arrival: {flight_info['arrival_time']}")
+        print(f"   ⏱️  Duration: {format_minutes(flight_info['duration'])}")
+        print(f"   🛫 Departure: {flight_info['departure_time'] or 'N/A'}")
+        print(f"   🛬 Arrival: {flight_info['arrival_time'] or 'N/A'}")
         print(f"   🔄 Layovers: {flight_info['layovers']}")
         
         # Display distance and cost per mile
         if flight_info['distance_miles']:
             print(f"   📏 Distance: {flight_info['distance_miles']:.0f} miles")
+        else:
+            print("   📏 Distance: unavailable")
         if flight_info['cost_per_mile']:
             print(f"   💵 Cost per mile: ${flight_info['cost_per_mile']:.3f}")
         
         if flight_info['layover_details']:
             print("   📍 Layover Details:")
-            for i, layover in enumerate(flight_info['layover_details'], 1):
-                print(f"      {i}. {layover['airport']} ({layover['duration']})")
+            for i, (airport, minutes) in enumerate(flight_info['layover_details'], 1):
+                print(f"      {i}. {airport} ({format_minutes(minutes)})")
         
         print("*" * 60)
     
+    @staticmethod
+    def new_results():
+        """
+        Returns an empty per-query results structure
+        """
+        return {
+            'direct_flights': [],
+            'layover_flights': [],
+            'comparison': {}
+        }
+    
+    def iter_flights(self, departure_id, arrival_id, outbound_date, return_date=None, verbose=True, distance=None,
+                     errors=None):
+        """
+        Search direct flights and flights with layovers for one route at the same time,
+        then yield ('direct' | 'layover', FareRecord) pairs one flight at a time, so
+        callers can aggregate or display them without keeping every record.
+        Failed searches yield nothing; their messages are appended to `errors` if given.
+        """
+        # Search for direct flights (0 stops) and flights with layovers (up to 2 stops) at the same time
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            direct_future = executor.submit(self.search_flights, departure_id, arrival_id, outbound_date, return_date, stops=0, verbose=verbose)
+            layover_future = executor.submit(self.search_flights, departure_id, arrival_id, outbound_date, return_date, stops=2, verbose=verbose)
+            direct_results = direct_future.result()
+            layover_results = layover_future.result()
+        
+        # Every flight of the route shares one distance
+        if distance is None:
+            distance = self.calculate_distance(departure_id, arrival_id)
+        
+        for category, response in (('direct', direct_results), ('layover', layover_results)):
+            if not response:
+                continue
+            if "error" in response:
+                if errors is not None:
+                    errors.append(f"{category} search: {response['error']}")
+                continue
+            for flight in chain(response.get('best_flights', []), response.get('other_flights', [])):
+                # The direct search keeps flights without layovers, the layover search those with some
+                if bool(flight.get('layovers')) == (category == 'layover'):
+                    yield category, FareRecord.from_serpapi(flight, distance)
+    
+    def collect_flights(self, departure_id, arrival_id, outbound_date, return_date=None, verbose=True, distance=None,
+                        errors=None):
+        """
+        Search direct flights and flights with layovers for one route at the same time,
+        returning a fresh results dict of FareRecord lists so concurrent queries never share state
+        """
+        results = self.new_results()
+        for category, record in self.iter_flights(departure_id, arrival_id, outbound_date, return_date, verbose, distance,
+                                                  errors):
+            results[f'{category}_flights'].append(record)
+        return results
+    
     def compare_routes(self, departure_id, arrival_id, outbound_date, return_date=None):
         """
         Compare direct flights vs flights with layovers for the same route
@@ -170,73 +197,90 @@ class FlightComparator:
         print("=" * 60)
         print(f"Route: {departure_id} → {arrival_id}")
         print(f"Travel Date(s): {outbound_date}" + (f" to {return_date}" if return_date else ""))
+        missing = self.airports.missing(departure_id, arrival_id)
+        if missing:
+            # Prices are still compared; only distance and cost per mile are left out
+            print(f"⚠️  {', '.join(missing)} not in the airport dataset: distance and cost per mile unavailable "
+                  f"(set AIRPORTS_CSV to a newer OurAirports airports.csv)")
         print("=" * 60)
         
-        # Search for direct flights (0 stops)
-        print("\n📡 SEARCHING DIRECT FLIGHTS...")
-        direct_results = self.search_flights(departure_id, arrival_id, outbound_date, return_date, stops=0)
-        
-        # Search for flights with layovers (up to 2 stops)
-        print("\n📡 SEARCHING FLIGHTS WITH LAYOVERS...")
-        layover_results = self.search_flights(departure_id, arrival_id, outbound_date, return_date, stops=2)
-        
-        # Process direct flights
-        direct_count = 0
-        if direct_results:
-            # Count and process best direct flights
-            for flight in direct_results.get('best_flights', []):
-                if flight.get('layovers') is None or len(flight.get('layovers', [])) == 0:
-                    flight_info = self.extract_flight_info(flight, departure_id, arrival_id)
-                    self.results['direct_flights'].append(flight_info)
-                    direct_count += 1
-            
-            # Count and process other direct flights
-            for flight in direct_results.get('other_flights', []):
-                if flight.get('layovers') is None or len(flight.get('layovers', [])) == 0:
-                    flight_info = self.extract_flight_info(flight, departure_id, arrival_id)
-                    self.results['direct_flights'].append(flight_info)
-                    direct_count += 1
-            
-            if direct_count > 0:
-                print(f"\n🎯 DIRECT FLIGHTS FOUND: {direct_count}")
-                print("-" * 40)
-                
-                for flight_info in self.results['direct_flights']:
-                    self.display_flight_details(flight_info, "DIRECT")
-            else:
-                print(f"\n🎯 NO DIRECT FLIGHTS FOUND")
+        print("\n📡 SEARCHING DIRECT FLIGHTS AND FLIGHTS WITH LAYOVERS...")
+        labels = {'direct': ("🎯", "DIRECT FLIGHTS"), 'layover': ("🔄", "FLIGHTS WITH LAYOVERS")}
+        # Flights are displayed and summarized as they stream in; only the summary is kept
+        stats = FareAggregator()
+        errors = []
+        for category, flight_info in self.iter_flights(departure_id, arrival_id, outbound_date, return_date,
+                                                       errors=errors):
+            if category not in stats.counts:
+                print(f"\n{labels[category][0]} {labels[category][1]}")
                 print("-" * 40)
+            stats.add(flight_info, category)
+            self.display_flight_details(flight_info, category.upper())
         
-        # Process flights with layovers
-        layover_count = 0
-        if layover_results:
-            # Count and process best flights with layovers
-            for flight in layover_results.get('best_flights', []):
-                if 'layovers' in flight and len(flight['layovers']) > 0:
-                    flight_info = self.extract_flight_info(flight, departure_id, arrival_id)
-                    self.results['layover_flights'].append(flight_info)
-                    layover_count += 1
-            
-            # Count and process other flights with layovers
-            for flight in layover_results.get('other_flights', []):
-                if 'layovers' in flight and len(flight['layovers']) > 0:
-                    flight_info = self.extract_flight_info(flight, departure_id, arrival_id)
-                    self.results['layover_flights'].append(flight_info)
-                    layover_count += 1
-            
-            if layover_count > 0:
-                print(f"\n🔄 FLIGHTS WITH LAYOVERS FOUND: {layover_count}")
-                print("-" * 40)
-                
-                for flight_info in self.results['layover_flights']:
-                    self.display_flight_details(flight_info, "LAYOVER")
-            else:
-                print(f"\n🔄 NO FLIGHTS WITH LAYOVERS FOUND")
-                print("-" * 40)
+        for category, (icon, label) in labels.items():
+            count = stats.counts.get(category, 0)
+            print(f"\n{icon} {label} FOUND: {count}" if count else f"\n{icon} NO {label} FOUND")
+        for error in errors:
+            print(f"❌ {error}")
+        
+        # Each comparison starts from empty results instead of adding to the previous route's
+        self.results = {'comparison': stats.summary()}
         
         # Perform comparison analysis
         self.analyze_and_recommend()
     
+    def compare_many(self, queries, max_workers=8, as_dataframe=False):
+        """
+        Compare many routes on a bounded worker pool without printing.
+        
+        `queries` holds (departure_id, arrival_id, outbound_date[, return_date]) tuples.
+        Returns one record per flight found (a single record with category None for a
+        query that found nothing), each carrying its query fields, the query's
+        search time in seconds and its search errors ('error', None if both searches succeeded). With as_dataframe=True a pandas DataFrame is returned.
+        Each query runs its two searches in parallel, so up to 2 * max_workers
+        SerpApi requests can be in flight.
+        """
+        queries = list(queries)
+        # Distances for every query in one vectorized pass
+        distances = self.airports.distances([q[0] for q in queries], [q[1] for q in queries])
+        
+        def run_query(index, query):
+            departure_id, arrival_id, outbound_date, *rest = query
+            return_date = rest[0] if rest else None
+            base = {
+                'query': index,
+                'departure_id': departure_id,
+                'arrival_id': arrival_id,
+                'outbound_date': outbound_date,
+                'return_date': return_date,
+            }
+            started = time.perf_counter()
+            errors = []
+            try:
+                distance = None if math.isnan(distances[index]) else float(distances[index])
+                results = self.collect_flights(departure_id, arrival_id, outbound_date, return_date,
+                                               verbose=False, distance=distance, errors=errors)
+            except Exception as e:
+                return [{**base, 'category': None, 'query_seconds': time.perf_counter() - started, 'error': str(e)}]
+            elapsed = time.perf_counter() - started
+            error = "; ".join(errors) or None
+            
+            records = [
+                {**base, 'category': category, 'query_seconds': elapsed, 'error': error, **flight_info}
+                for category, key in (('direct', 'direct_flights'), ('layover', 'layover_flights'))
+                for flight_info in results[key]
+            ]
+            return records or [{**base, 'category': None, 'query_seconds': elapsed, 'error': error}]
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(run_query, i, query) for i, query in enumerate(queries)]
+            records = [record for future in futures for record in future.result()]
+        
+        if as_dataframe:
+            import pandas as pd
+            return pd.DataFrame.from_records(records)
+        return records
+    
     def analyze_and_recommend(self):
         """
         Analyze prices and provide recommendations
@@ -244,69 +288,61 @@ class FlightComparator:
         print("\n📊 PRICE ANALYSIS & RECOMMENDATIONS")
         print("=" * 60)
         
-        if not self.results['direct_flights'] and not self.results['layover_flights']:
+        # Built while compare_routes streamed the flights: cheapest per category and overall, best value, price statistics
+        summary = self.results['comparison']
+        counts = summary.get('counts', {})
+        if not counts:
             print("❌ No flights found for comparison.")
             return
         
-        # Find cheapest flights in each category
-        cheapest_direct = None
-        cheapest_layover = None
-        
-        if self.results['direct_flights']:
-            cheapest_direct = min(self.results['direct_flights'], 
-                                key=lambda x: float(x['price']) if isinstance(x['price'], (int, float, str)) and str(x['price']).replace('.','').isdigit() else float('inf'))
-        
-        if self.results['layover_flights']:
-            cheapest_layover = min(self.results['layover_flights'], 
-                                 key=lambda x: float(x['price']) if isinstance(x['price'], (int, float, str)) and str(x['price']).replace('.','').isdigit() else float('inf'))
-        
-        # Overall cheapest flight
-        all_flights = self.results['direct_flights'] + self.results['layover_flights']
-        if all_flights:
-            overall_cheapest = min(all_flights, 
-                                 key=lambda x: float(x['price']) if isinstance(x['price'], (int, float, str)) and str(x['price']).replace('.','').isdigit() else float('inf'))
+        direct_price, cheapest_direct = summary['cheapest'].get('direct', (None, None))
+        layover_price, cheapest_layover = summary['cheapest'].get('layover', (None, None))
+        overall_cheapest = summary['overall_cheapest'][1] if summary['overall_cheapest'] else None
         
         # Display analysis
-        print(f"\n📈 DIRECT FLIGHTS: {len(self.results['direct_flights'])} found")
+        print(f"\n📈 DIRECT FLIGHTS: {counts.get('direct', 0)} found")
         if cheapest_direct:
-            print(f"   💰 Cheapest Direct: ${cheapest_direct['price']} ({cheapest_direct['airline']})")
-            print(f"   ⏱️  Duration: {cheapest_direct['duration']}")
+            print(f"   💰 Cheapest Direct: {format_price(cheapest_direct['price'])} ({cheapest_direct['airline']})")
+            print(f"   ⏱️  Duration: {format_minutes(cheapest_direct['duration'])}")
             if cheapest_direct['cost_per_mile']:
                 print(f"   💵 Cost per mile: ${cheapest_direct['cost_per_mile']:.3f}")
         
-        print(f"\n📈 LAYOVER FLIGHTS: {len(self.results['layover_flights'])} found")
+        print(f"\n📈 LAYOVER FLIGHTS: {counts.get('layover', 0)} found")
         if cheapest_layover:
-            print(f"   💰 Cheapest Layover: ${cheapest_layover['price']} ({cheapest_layover['airline']})")
-            print(f"   ⏱️  Duration: {cheapest_layover['duration']}")
+            print(f"   💰 Cheapest Layover: {format_price(cheapest_layover['price'])} ({cheapest_layover['airline']})")
+            print(f"   ⏱️  Duration: {format_minutes(cheapest_layover['duration'])}")
             print(f"   🔄 Stops: {cheapest_layover['layovers']}")
             if cheapest_layover['cost_per_mile']:
                 print(f"   💵 Cost per mile: ${cheapest_layover['cost_per_mile']:.3f}")
         
-        # Find best value per mile
-        all_flights_with_cost_per_mile = [f for f in all_flights if f['cost_per_mile'] is not None]
-        if all_flights_with_cost_per_mile:
-            best_value = min(all_flights_with_cost_per_mile, key=lambda x: x['cost_per_mile'])
+        # Best value per mile
+        if summary['best_value']:
+            best_value = summary['best_value'][1]
             print(f"\n💎 BEST VALUE PER MILE:")
             print(f"   💵 ${best_value['cost_per_mile']:.3f}/mile - {best_value['airline']}")
-            print(f"   💰 Total Price: ${best_value['price']}")
+            print(f"   💰 Total Price: {format_price(best_value['price'])}")
             print(f"   🔄 {'Direct' if best_value['layovers'] == 0 else str(best_value['layovers']) + ' stop(s)'}")
         
+        # Price distribution across all priced offers
+        if summary['priced']:
+            print(f"\n📊 PRICE STATISTICS ({summary['priced']} priced offers):")
+            print(f"   Mean: ${summary['mean']:.2f} | Min: ${summary['min']:.2f} | Max: ${summary['max']:.2f}")
+            print("   " + " | ".join(f"P{p}: ${v:.2f}" for p, v in summary['percentiles'].items()))
+        
         # Comparison and recommendation
         print(f"\n🏆 RECOMMENDATION:")
         print("-" * 30)
         
         if cheapest_direct and cheapest_layover:
-            direct_price = float(cheapest_direct['price'])
-            layover_price = float(cheapest_layover['price'])
             savings = abs(direct_price - layover_price)
             
             if direct_price < layover_price:
                 print(f"✅ CHOOSE DIRECT FLIGHT")
-                print(f"   💰 Price: ${cheapest_direct['price']}")
+                print(f"   💰 Price: {format_price(cheapest_direct['price'])}")
                 print(f"   💡 You save ${savings:.2f} and time with direct flight")
             elif layover_price < direct_price:
                 print(f"✅ CHOOSE LAYOVER FLIGHT")
-                print(f"   💰 Price: ${cheapest_layover['price']}")
+                print(f"   💰 Price: {format_price(cheapest_layover['price'])}")
                 print(f"   💡 You save ${savings:.2f} (but spend more time traveling)")
                 print(f"   ⚠️  Trade-off: {cheapest_layover['layovers']} stop(s)")
             else:
@@ -315,24 +351,28 @@ class FlightComparator:
         
         elif cheapest_direct:
             print(f"✅ ONLY DIRECT FLIGHTS AVAILABLE")
-            print(f"   💰 Price: ${cheapest_direct['price']}")
+            print(f"   💰 Price: {format_price(cheapest_direct['price'])}")
         
         elif cheapest_layover:
             print(f"✅ ONLY LAYOVER FLIGHTS AVAILABLE")
-            print(f"   💰 Price: ${cheapest_layover['price']}")
+            print(f"   💰 Price: {format_price(cheapest_layover['price'])}")
         
         # Overall best deal
-        if all_flights:
+        if overall_cheapest:
             print(f"\n🎯 ABSOLUTE BEST DEAL:")
-            print(f"   💰 ${overall_cheapest['price']} - {overall_cheapest['airline']}")
+            print(f"   💰 {format_price(overall_cheapest['price'])} - {overall_cheapest['airline']}")
             print(f"   🔄 {'Direct' if overall_cheapest['layovers'] == 0 else str(overall_cheapest['layovers']) + ' stop(s)'}")
-            print(f"   ⏱️  {overall_cheapest['duration']}")
+            print(f"   ⏱️  {format_minutes(overall_cheapest['duration'])}")
 
 # Usage Example
 if __name__ == "__main__":
-    # Initialize the comparator with your API key
+    # Initialize the comparator with your API key; --offline uses the fake_serpapi stub instead
     API_KEY = api_key
-    comparator = FlightComparator(API_KEY)
+    search_client = GoogleSearch
+    if "--offline" in sys.argv:
+        from fake_serpapi import FakeGoogleSearch
+        search_client = FakeGoogleSearch
+    comparator = FlightComparator(API_KEY, search_client=search_client, cache=SearchCache("serp_cache.db"))
     
     # Compare flights for your route
     comparator.compare_routes(
@@ -343,6 +383,8 @@ if __name__ == "__main__":
     )
     
     print(f"\n📋 SUMMARY STATISTICS:")
-    print(f"   Direct flights analyzed: {len(comparator.results['direct_flights'])}")
-    print(f"   Layover flights analyzed: {len(comparator.results['layover_flights'])}")
-    print(f"   Total flights compared: {len(comparator.results['direct_flights']) + len(comparator.results['layover_flights'])}")
\ No newline at end of file
+    counts = comparator.results['comparison'].get('counts', {})
+    print(f"   Direct flights analyzed: {counts.get('direct', 0)}")
+    print(f"   Layover flights analyzed: {counts.get('layover', 0)}")
+    print(f"   Total flights compared: {sum(counts.values())}")
+    print(f"   Search cache: {comparator.cache.stats['hits']} hits, {comparator.cache.stats['misses']} misses")
\ No newline at end of file
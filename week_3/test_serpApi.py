@@ -0,0 +1,69 @@
+from fake_serpapi import FakeGoogleSearch, FakeResponse
+from serpApi import FlightComparator
+
+
+class BrokenSearch(FakeGoogleSearch):
+    # The connection itself fails
+    def get_response(self):
+        raise RuntimeError("connection reset by peer")
+
+
+class RejectedSearch(FakeGoogleSearch):
+    # SerpApi answers with its error body, as for an invalid API key
+    def get_response(self):
+        return FakeResponse(401, {"error": "Invalid API key."})
+
+
+class DirectFailsSearch(FakeGoogleSearch):
+    def get_response(self):
+        if self.params.get("stops") == "0":
+            raise RuntimeError("connection reset by peer")
+        return super().get_response()
+
+
+QUERIES = [("JFK", "LAX", "2025-12-01")]
+
+
+def test_failed_searches_fill_the_error_column():
+    records = FlightComparator("unused", search_client=BrokenSearch).compare_many(QUERIES)
+    assert len(records) == 1
+    assert records[0]["category"] is None
+    assert "connection reset by peer" in records[0]["error"]
+
+
+def test_serpapi_error_body_fills_the_error_column():
+    records = FlightComparator("unused", search_client=RejectedSearch).compare_many(QUERIES)
+    assert records[0]["category"] is None
+    assert "Invalid API key." in records[0]["error"]
+
+
+def test_partial_failure_keeps_the_other_category():
+    records = FlightComparator("unused", search_client=DirectFailsSearch).compare_many(QUERIES)
+    assert records and all(record["category"] == "layover" for record in records)
+    assert all(record["error"].startswith("direct search:") for record in records)
+
+
+def test_successful_search_has_no_error():
+    records = FlightComparator("unused", search_client=FakeGoogleSearch).compare_many(QUERIES)
+    assert records and all(record["error"] is None for record in records)
+
+
+def test_unknown_airport_still_compares_prices(capsys):
+    comparator = FlightComparator("unused", search_client=FakeGoogleSearch)
+    # QQQ is not an IATA code
+    records = comparator.compare_many([("QQQ", "LAX", "2025-12-01")])
+    assert records and all(record["error"] is None for record in records)
+    assert all(record["distance_miles"] is None and record["cost_per_mile"] is None for record in records)
+
+    comparator.compare_routes("QQQ", "LAX", "2025-12-01")
+    output = capsys.readouterr().out
+    assert "QQQ not in the airport dataset" in output
+    assert "Distance: unavailable" in output
+
+
+def test_bundled_dataset_covers_regional_airports():
+    comparator = FlightComparator("unused", search_client=FakeGoogleSearch)
+    # Regional airports outside the major hubs
+    for code in ["XNA", "BZN", "ASE", "TVC", "EYW", "INV", "TRD"]:
+        assert comparator.calculate_distance(code, "LAX") > 0
+    assert len(comparator.airports) > 8000
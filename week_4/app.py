@@ -1,32 +1,32 @@
 import streamlit as st
-import sqlite3
-import re
+import altair as alt
 import datetime
+import os
+from fare_store import FareStore
+from ranking import score_flights, top_k
 
 st.set_page_config(page_title="Rewards Redemption Optimizer", layout="centered")
 st.title("Rewards Redemption Optimizer")
 st.write("Find the best value for your airline miles or points!")
 
 # --- Helper functions ---
-def parse_price(price_str):
-    match = re.match(r"([0-9.]+)", price_str)
-    return float(match.group(1)) if match else None
+@st.cache_resource
+def get_fare_store():
+    # One read-only connection and query memo shared by every session;
+    # FARE_INDEX=<dir> serves flight searches from the columnar snapshot instead of SQL
+    return FareStore("./database.db", index_path=os.getenv("FARE_INDEX"))
 
-def get_flights(departure, arrival, start_date, end_date):
-    conn = sqlite3.connect("./database.db")
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT flight_number, departure, arrival, date, price, airline, flight_time, airline_full_name
-        FROM flights
-        WHERE departure = ? AND arrival = ? AND date BETWEEN ? AND ?
-        ORDER BY date ASC
-        """,
-        (departure, arrival, start_date, end_date)
-    )
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+def get_flights(departure, arrival, start_date, end_date, order_by="date", direct_only=False):
+    return get_fare_store().get_flights(departure, arrival, start_date, end_date, order_by, direct_only)
+
+def get_connections(departure, arrival, start_date, end_date):
+    return get_fare_store().get_connections(departure, arrival, start_date, end_date)
+
+def get_unclassified_counts(departure, arrival, start_date, end_date):
+    return get_fare_store().get_unclassified_counts(departure, arrival, start_date, end_date)
+
+def get_fare_calendar(departure, arrival, start_date, end_date):
+    return get_fare_store().get_fare_calendar(departure, arrival, start_date, end_date)
 
 # --- UI Inputs ---
 st.header("1. Enter Your Travel Details")
@@ -52,39 +52,114 @@ with col4:
 # --- Results ---
 st.header("3. Best Redemption Options")
 if st.button("Find Redemptions"):
-    flights = get_flights(departure.upper(), arrival.upper(), str(start_date), str(end_date))
+    route = (departure.upper(), arrival.upper(), str(start_date), str(end_date))
+    flights = get_flights(*route, direct_only=direct_flights)
+    # Fares stored before stops and itinerary times were recorded can't be classified
+    unknown_stops, untimed = get_unclassified_counts(*route)
+    if direct_flights and unknown_stops:
+        flights += tuple(f for f in get_flights(*route) if f[9] is None)
+        st.info(f"{unknown_stops} fares on this route were stored before the number of stops was "
+                "recorded, so they can't be confirmed as direct. They are listed as \"stops unknown\"; "
+                "re-crawl the route to classify them.")
+    if not direct_flights:
+        # One-stop itineraries joined from stored legs through every connecting airport
+        flights += get_connections(*route)
+        if untimed:
+            st.info(f"{untimed} fares leaving {route[0]} on these dates have no itinerary times, so "
+                    "one-stop connections through them can't be found until the routes are re-crawled.")
     if not flights:
         st.warning("No flights found for your criteria.")
     else:
+        # Score every flight in bulk, then pick only the 10 that are displayed
+        objectives = ["value"] if maximize_value else []
+        if minimize_fees or not maximize_value:
+            objectives.append("price")
+        objectives.append("duration")
+        columns = score_flights(flights, miles)
         results = []
-        for f in flights:
-            price = parse_price(f[4])
-            vpm = round((price * 100) / miles, 2)  # cents per mile
+        for i in top_k(columns, objectives, k=10):
+            f = flights[i]
             results.append({
                 "flight_number": f[0],
                 "departure": f[1],
                 "arrival": f[2],
                 "date": f[3],
-                "price": price,
+                "price": f[4] / 100,
                 "airline": f[5],
                 "flight_time": f[6],
                 "airline_full_name": f[7],
-                "value_per_mile": vpm
+                "duration_minutes": f[8],
+                "stops": f[9],
+                "via": f[10] if len(f) > 10 else None,
+                "value_per_mile": round(columns["value"][i], 2)  # cents per mile
             })
-        # Apply filters
-        if maximize_value:
-            results = sorted(results, key=lambda x: -x["value_per_mile"])
-        else:
-            results = sorted(results, key=lambda x: x["price"])
         # Display
-        st.write(f"Showing {len(results)} options:")
-        for r in results[:10]:
-            st.markdown(f"**{r['flight_number']}** | {r['airline_full_name']} | {r['date']} | {r['flight_time']}")
+        st.write(f"Showing {len(flights)} options:")
+        for r in results:
+            if r['via']:
+                stops = f" | 1 stop via {r['via']}"
+            elif r['stops'] is None:
+                stops = " | stops unknown"
+            else:
+                stops = ""
+            st.markdown(f"**{r['flight_number']}** | {r['airline_full_name']} | {r['date']} | {r['flight_time']}{stops}")
             st.write(f"Price: ${r['price']:.2f} | Value: {r['value_per_mile']}¢/mile | From {r['departure']} to {r['arrival']}")
             st.write("---")
         if show_chart:
             st.subheader("Comparison Chart (¢/mile)")
-            st.bar_chart({r['flight_number']: r['value_per_mile'] for r in results[:10]})
+            st.bar_chart({r['flight_number']: r['value_per_mile'] for r in results})
         st.success("Done! Adjust your filters or dates for more options.")
 
+# --- Fare Calendar ---
+st.header("4. Flexible Dates")
+month = st.date_input("Month", datetime.date(start_date.year, start_date.month, 1))
+if st.button("Show Fare Calendar"):
+    first_day = month.replace(day=1)
+    last_day = (first_day + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1)
+    # One indexed read of the precomputed per-day summary, about 31 rows
+    days = get_fare_calendar(departure.upper(), arrival.upper(), str(first_day), str(last_day))
+    # Without any fare classified as direct (e.g. only fares from before stops were recorded),
+    # fall back to the cheapest fare of any kind instead of an empty calendar
+    use_direct = direct_flights and any(day[4] is not None for day in days)
+    if direct_flights and not use_direct and days:
+        st.info("No fares on this route are known to be direct yet, because they were stored before "
+                "the number of stops was recorded. Showing the cheapest fare of any kind per day; "
+                "re-crawl the route to classify them.")
+    calendar = []
+    for day, min_cents, median_cents, max_cents, direct_min_cents, fares in days:
+        cheapest = direct_min_cents if use_direct else min_cents
+        if cheapest is None:
+            continue
+        date = datetime.date.fromisoformat(day)
+        calendar.append({
+            "date": day,
+            "day": date.day,
+            "weekday": date.strftime("%a"),
+            "week": str(date - datetime.timedelta(days=date.weekday())),
+            "cheapest": cheapest / 100,
+            "median": median_cents / 100,
+            "highest": max_cents / 100,
+            "fares": fares,
+        })
+    if not calendar:
+        st.warning("No fares stored for this route and month.")
+    else:
+        best = min(calendar, key=lambda d: d["cheapest"])
+        st.write(f"Cheapest day: **{best['date']}** from ${best['cheapest']:.2f} "
+                 f"(median ${best['median']:.2f} over {best['fares']} fares)")
+        base = alt.Chart(alt.Data(values=calendar)).encode(
+            x=alt.X("weekday:O", sort=["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"], title=None),
+            y=alt.Y("week:O", title="Week of"),
+        )
+        cells = base.mark_rect().encode(
+            color=alt.Color("cheapest:Q", scale=alt.Scale(scheme="redyellowgreen", reverse=True), title="From ($)"),
+            tooltip=["date:N", "cheapest:Q", "median:Q", "highest:Q", "fares:Q"],
+        )
+        labels = base.mark_text(baseline="middle").encode(text="day:O")
+        st.altair_chart(cells + labels, use_container_width=True)
+
+with st.expander("Diagnostics"):
+    # Cache effectiveness and SQLite time of the shared fare store since the app started
+    st.json(get_fare_store().stats)
+
 st.caption("Built for travelers who want to get the most out of their points and miles.")
@@ -0,0 +1,107 @@
+"""
+Times the indexed one-stop connection search on synthetic route graphs of
+growing size, against a Python nested loop over the same fares.
+
+    python bench_connections.py --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from connections import MIN_CONNECTION_MINUTES, MAX_CONNECTION_MINUTES, find_connections
+
+AIRPORTS = ["JFK", "LAX", "LHR", "NRT", "YYZ", "FRA", "ORD", "DOH", "CDG", "SFO", "ATL", "DXB",
+            "HND", "SIN", "AMS", "MAD", "SEA", "MIA", "BOS", "DEN", "IST", "ICN", "SYD", "GRU"]
+DAYS = 31
+
+
+def make_fares(count, seed=42):
+    """
+    Direct fares spread evenly over every airport and day of October 2025,
+    each to a random other airport.
+    """
+    rng = random.Random(seed)
+    fares = []
+    for i in range(count):
+        origin = AIRPORTS[i % len(AIRPORTS)]
+        destination = rng.choice([code for code in AIRPORTS if code != origin])
+        departure_at = datetime(2025, 10, 1 + i // len(AIRPORTS) % DAYS, rng.randint(5, 22), rng.randint(0, 59))
+        minutes = rng.randint(60, 900)
+        arrival_at = departure_at + timedelta(minutes=minutes)
+        fares.append((f"XX{i}", origin, destination, departure_at.date().isoformat(), rng.randint(5000, 150000),
+                       "XX", minutes, departure_at.isoformat(), arrival_at.isoformat()))
+    return fares
+
+
+def build_db(path, fares):
+    # The columns and indexes of the crawler's schema that the search uses
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE flights (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, flight_number TEXT, departure TEXT, arrival TEXT,
+            date TEXT, price_cents INTEGER, airline TEXT, flight_time TEXT, airline_full_name TEXT, currency TEXT,
+            duration_minutes INTEGER, departure_at TEXT, arrival_at TEXT, stops INTEGER
+        )
+    """)
+    conn.executemany("""
+        INSERT INTO flights (flight_number, departure, arrival, date, price_cents, airline,
+                             duration_minutes, departure_at, arrival_at, currency, stops)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'USD', 0)
+    """, fares)
+    conn.execute("CREATE INDEX idx_flights_route_date_price ON flights (departure, arrival, date, price_cents, id)")
+    conn.execute("CREATE INDEX idx_flights_route_price_date ON flights (departure, arrival, price_cents, date, id)")
+    conn.execute("CREATE INDEX idx_flights_departure_date ON flights (departure, date)")
+    conn.execute("CREATE INDEX idx_flights_route_departure_at ON flights (departure, arrival, departure_at)")
+    conn.commit()
+    return conn
+
+
+def nested_loop(fares, origin, destination, start_date, end_date):
+    # Every first leg is checked against every fare in the table
+    found = []
+    for a in fares:
+        if a[1] != origin or not start_date <= a[3] <= end_date or a[2] == destination:
+            continue
+        landed = datetime.fromisoformat(a[8])
+        earliest = (landed + timedelta(minutes=MIN_CONNECTION_MINUTES)).isoformat()
+        latest = (landed + timedelta(minutes=MAX_CONNECTION_MINUTES)).isoformat()
+        for b in fares:
+            if b[1] == a[2] and b[2] == destination and earliest <= b[7] <= latest:
+                found.append((a[4] + b[4], a[0], b[0]))
+    return sorted(found)
+
+
+def best_of(fn, *args, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Connection search latency against fare table size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--loop-max", type=int, default=100000, help="largest size also timed with the nested loop")
+    parser.add_argument("--origin", default="JFK")
+    parser.add_argument("--destination", default="NRT")
+    args = parser.parse_args()
+
+    window = ("2025-10-01", "2025-10-07")
+    print(f"{'fares':>10} {'itineraries':>12} {'indexed ms':>11} {'nested loop ms':>15}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            fares = make_fares(size)
+            conn = build_db(os.path.join(tmp, f"fares_{size}.db"), fares)
+            indexed, rows = best_of(find_connections, conn, args.origin, args.destination, *window)
+            looped = "-"
+            if size <= args.loop_max:
+                seconds, _ = best_of(nested_loop, fares, args.origin, args.destination, *window, repeat=1)
+                looped = f"{seconds * 1000:.1f}"
+            print(f"{size:>10} {len(rows):>12} {indexed * 1000:>11.2f} {looped:>15}")
+            conn.close()
@@ -0,0 +1,101 @@
+"""
+Load test for fare_api: concurrent clients page through a week of fares on
+random routes with keyset cursors, then revalidate their first page with
+If-None-Match. Runs the API in-process on a synthetic fare table unless --url is given.
+
+    python bench_fare_api.py --fares 200000 --clients 32 --rounds 20
+    python bench_fare_api.py --url http://127.0.0.1:8080 --route JFK-LAX
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import aiohttp
+from aiohttp import web
+
+from bench_connections import AIRPORTS, build_db, make_fares
+from fare_api import make_app
+
+
+async def client(session, url, routes, rounds, latencies, counts, rng):
+    for _ in range(rounds):
+        departure, arrival = rng.choice(routes)
+        day = rng.randint(1, 25)
+        params = {"departure": departure, "arrival": arrival, "order": "price", "limit": 20,
+                  "start": f"2025-10-{day:02d}", "end": f"2025-10-{day + 6:02d}"}
+        first_etag = None
+        cursor = None
+        while True:
+            started = time.perf_counter()
+            page_params = dict(params, cursor=cursor) if cursor else params
+            async with session.get(f"{url}/flights", params=page_params) as response:
+                body = await response.json()
+                counts["bytes"] += int(response.headers.get("Content-Length", 0) or 0)
+            latencies.append(time.perf_counter() - started)
+            counts["pages"] += 1
+            first_etag = first_etag or response.headers["ETag"]
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+        started = time.perf_counter()
+        async with session.get(f"{url}/flights", params=params, headers={"If-None-Match": first_etag}) as response:
+            await response.read()
+            counts["not_modified" if response.status == 304 else "revalidated"] += 1
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(url, routes, clients, rounds):
+    latencies = []
+    counts = {"pages": 0, "bytes": 0, "not_modified": 0, "revalidated": 0}
+    rng = random.Random(7)
+    connector = aiohttp.TCPConnector(limit=clients)
+    async with aiohttp.ClientSession(connector=connector, headers={"Accept-Encoding": "gzip"}) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            client(session, url, routes, rounds, latencies, counts, random.Random(rng.random()))
+            for _ in range(clients)
+        ))
+        wall = time.perf_counter() - started
+    latencies.sort()
+    print(f"{len(latencies)} requests in {wall:.2f}s: {len(latencies) / wall:.0f} req/s, "
+          f"p50 {statistics.median(latencies) * 1000:.1f} ms, p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms")
+    print(f"{counts['pages']} pages ({counts['bytes'] / max(counts['pages'], 1):.0f} compressed bytes each), "
+          f"{counts['not_modified']} revalidations answered 304, {counts['revalidated']} re-sent")
+
+
+async def main(args):
+    if args.url:
+        routes = [tuple(route.upper().split("-")) for route in args.route]
+        await run(args.url, routes, args.clients, args.rounds)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "fares.db")
+        started = time.perf_counter()
+        build_db(db_path, make_fares(args.fares)).close()
+        print(f"built {args.fares} synthetic fares in {time.perf_counter() - started:.1f}s")
+        runner = web.AppRunner(make_app(db_path, args.pool))
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        routes = [(a, b) for a in AIRPORTS for b in AIRPORTS if a != b]
+        try:
+            await run(f"http://127.0.0.1:{port}", routes, args.clients, args.rounds)
+        finally:
+            await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="fare_api load test")
+    parser.add_argument("--url", help="test a running fare_api instead of an in-process one")
+    parser.add_argument("--route", action="append", default=[], metavar="JFK-LAX", help="routes to query with --url")
+    parser.add_argument("--fares", type=int, default=200000, help="synthetic fares for the in-process API")
+    parser.add_argument("--pool", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=20, help="searches per client")
+    asyncio.run(main(parser.parse_args()))
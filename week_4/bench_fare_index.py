@@ -0,0 +1,107 @@
+"""
+Route/date-range lookups from the columnar fare snapshot against the same
+query in SQLite, on synthetic fare tables of growing size, plus the cost of
+a full snapshot build and of an incremental refresh after 1% of prices change.
+
+    python bench_fare_index.py --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from bench_connections import AIRPORTS, build_db, make_fares
+from fare_index import FareIndex
+from fare_store import FLIGHT_COLUMNS, ORDER_BY
+
+
+def add_price_history(conn):
+    # The crawler's triggers log every inserted fare; the snapshot's watermarks read these tables
+    conn.execute("""
+        CREATE TABLE price_observations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, flight_id INTEGER NOT NULL,
+            price_cents INTEGER, currency TEXT
+        )
+    """)
+    conn.execute("""
+        INSERT INTO price_observations (flight_id, price_cents, currency)
+        SELECT id, price_cents, currency FROM flights ORDER BY id
+    """)
+    # Updates that keep the price would be logged here; the benchmark only reprices
+    conn.execute("CREATE TABLE flight_changes (id INTEGER PRIMARY KEY AUTOINCREMENT, flight_id INTEGER NOT NULL)")
+    conn.commit()
+
+
+def searches(count, seed=3):
+    rng = random.Random(seed)
+    found = []
+    for _ in range(count):
+        departure, arrival = rng.sample(AIRPORTS, 2)
+        day = rng.randint(1, 25)
+        found.append((departure, arrival, f"2025-10-{day:02d}", f"2025-10-{day + 6:02d}",
+                      rng.choice(list(ORDER_BY))))
+    return found
+
+
+def sqlite_lookup(conn, departure, arrival, start_date, end_date, order_by):
+    return tuple(conn.execute(f"""
+        SELECT {FLIGHT_COLUMNS}
+        FROM flights
+        WHERE departure = ? AND arrival = ? AND date BETWEEN ? AND ?
+          AND price_cents IS NOT NULL
+        ORDER BY {ORDER_BY[order_by]}
+    """, (departure, arrival, start_date, end_date)).fetchall())
+
+
+def per_lookup(fn, queries):
+    started = time.perf_counter()
+    rows = sum(len(fn(*query)) for query in queries)
+    return (time.perf_counter() - started) / len(queries), rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar fare snapshot against SQLite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    queries = searches(args.lookups)
+    print(f"{'fares':>10} {'rows/lookup':>12} {'sqlite ms':>10} {'index ms':>9} "
+          f"{'full build s':>13} {'1% refresh s':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            db_path = os.path.join(tmp, f"fares_{size}.db")
+            conn = build_db(db_path, make_fares(size))
+            add_price_history(conn)
+
+            index = FareIndex(os.path.join(tmp, f"index_{size}"), db_path)
+            started = time.perf_counter()
+            index.refresh()
+            full_build = time.perf_counter() - started
+
+            reader = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+            sqlite_seconds, rows = per_lookup(lambda *q: sqlite_lookup(reader, *q), queries)
+            index_seconds, index_rows = per_lookup(index.lookup, queries)
+            assert rows == index_rows
+
+            # Reprice 1% of the fares the way an upsert would, logging each change
+            changed = random.Random(size).sample(range(1, size + 1), max(size // 100, 1))
+            conn.executemany("UPDATE flights SET price_cents = price_cents + 100 WHERE id = ?",
+                             [(i,) for i in changed])
+            conn.executemany("""
+                INSERT INTO price_observations (flight_id, price_cents, currency)
+                SELECT id, price_cents, currency FROM flights WHERE id = ?
+            """, [(i,) for i in changed])
+            conn.commit()
+            started = time.perf_counter()
+            index.refresh()
+            refresh = time.perf_counter() - started
+            assert index.stats["incremental_builds"] == 1
+
+            print(f"{size:>10} {rows / len(queries):>12.1f} {sqlite_seconds * 1000:>10.3f} "
+                  f"{index_seconds * 1000:>9.3f} {full_build:>13.2f} {refresh:>13.2f}")
+            index.close()
+            reader.close()
+            conn.close()
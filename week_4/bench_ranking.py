@@ -0,0 +1,62 @@
+"""
+Compares the app's old ranking (a dict per row, then a full sort) with the
+vectorized score_flights/top_k path, for growing result-set sizes.
+
+    python bench_ranking.py --sizes 1000 10000 100000 1000000
+"""
+import argparse
+import random
+import time
+
+from ranking import score_flights, top_k
+
+
+def make_flights(count):
+    rng = random.Random(42)
+    return [
+        (f"XX{i}", "JFK", "LAX", f"2025-10-{i % 31 + 1:02d}", rng.randint(5000, 150000), "XX",
+         "5 hours", "Example Air", rng.randint(60, 900))
+        for i in range(count)
+    ]
+
+
+def rank_with_sort(flights, miles):
+    results = []
+    for f in flights:
+        price = f[4] / 100
+        results.append({
+            "flight_number": f[0],
+            "price": price,
+            "duration_minutes": f[8],
+            "value_per_mile": round((price * 100) / miles, 2),
+        })
+    results = sorted(results, key=lambda x: -x["value_per_mile"])
+    return results[:10]
+
+
+def rank_vectorized(flights, miles):
+    columns = score_flights(flights, miles)
+    return top_k(columns, ("value", "price", "duration"), k=10)
+
+
+def best_of(fn, *args, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ranking latency against result-set size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--miles", type=int, default=25000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'dict+sort ms':>14} {'numpy top-k ms':>16} {'speedup':>8}")
+    for size in args.sizes:
+        flights = make_flights(size)
+        baseline = best_of(rank_with_sort, flights, args.miles)
+        vectorized = best_of(rank_vectorized, flights, args.miles)
+        print(f"{size:>10} {baseline * 1000:>14.2f} {vectorized * 1000:>16.2f} {baseline / vectorized:>7.1f}x")
@@ -0,0 +1,90 @@
+"""
+One-stop connection search over the stored fares.
+
+Every direct fare is a leg of the route graph. Legs leaving the origin are
+found through the (departure, date) index, and for each of them the onward
+legs from its arrival airport to the destination that leave inside the
+connection window, as one range of the (departure, arrival, departure_at)
+index. SQLite runs this as an indexed nested-loop join, so the cost grows
+with the legs actually touched rather than the size of the table.
+
+Departure and arrival times are local, which is what the rule needs: both
+sides of a connection are at the same airport.
+"""
+
+# Minimum connection time, and the longest layover still offered as a connection
+MIN_CONNECTION_MINUTES = 60
+MAX_CONNECTION_MINUTES = 6 * 60
+CONNECTION_LIMIT = 200
+
+# Rows start with the fare_store.FLIGHT_COLUMNS fields, so ranking treats them like
+# direct fares, followed by the connecting airport and the layover in minutes
+CONNECTIONS_SQL = """
+    SELECT flight_number, departure, arrival, date, price_cents, airline,
+           printf('%d hours %d minutes', (legs_minutes + layover_minutes) / 60,
+                  (legs_minutes + layover_minutes) % 60) AS flight_time,
+           airline_full_name, legs_minutes + layover_minutes AS duration_minutes, 1 AS stops, via, layover_minutes
+    FROM (
+        SELECT a.flight_number || ' + ' || b.flight_number AS flight_number,
+               a.departure,
+               b.arrival,
+               a.date,
+               a.price_cents + b.price_cents AS price_cents,
+               CASE WHEN a.airline = b.airline THEN a.airline ELSE a.airline || '/' || b.airline END AS airline,
+               CASE WHEN a.airline = b.airline THEN COALESCE(a.airline_full_name, a.airline)
+                    ELSE COALESCE(a.airline_full_name, a.airline) || ' / ' || COALESCE(b.airline_full_name, b.airline)
+               END AS airline_full_name,
+               a.duration_minutes + b.duration_minutes AS legs_minutes,
+               a.arrival AS via,
+               CAST(round((julianday(b.departure_at) - julianday(a.arrival_at)) * 1440) AS INTEGER) AS layover_minutes
+        FROM (
+            -- Only ids and prices are carried through the join and the top-N sort
+            SELECT a.id AS a_id, b.id AS b_id
+            FROM flights AS a
+            JOIN flights AS b
+              ON b.departure = a.arrival
+             AND b.arrival = :destination
+             AND b.departure_at BETWEEN strftime('%Y-%m-%dT%H:%M:%S', a.arrival_at, :min_offset)
+                                    AND strftime('%Y-%m-%dT%H:%M:%S', a.arrival_at, :max_offset)
+            WHERE a.departure = :origin
+              AND a.date BETWEEN :start_date AND :end_date
+              AND a.arrival NOT IN (:origin, :destination)
+              AND a.stops = 0 AND b.stops = 0
+              AND a.price_cents IS NOT NULL AND b.price_cents IS NOT NULL
+              AND a.currency IS b.currency
+            ORDER BY a.price_cents + b.price_cents, a.date
+            LIMIT :limit
+        ) AS pair
+        JOIN flights AS a ON a.id = pair.a_id
+        JOIN flights AS b ON b.id = pair.b_id
+    )
+    ORDER BY price_cents, date
+"""
+
+
+def connection_params(origin, destination, start_date, end_date, min_connection=MIN_CONNECTION_MINUTES,
+                      max_connection=MAX_CONNECTION_MINUTES, limit=CONNECTION_LIMIT):
+    """
+    Builds the named parameters of CONNECTIONS_SQL.
+    """
+    return {
+        "origin": origin,
+        "destination": destination,
+        "start_date": start_date,
+        "end_date": end_date,
+        "min_offset": f"+{int(min_connection)} minutes",
+        "max_offset": f"+{int(max_connection)} minutes",
+        "limit": limit,
+    }
+
+
+def find_connections(conn, origin, destination, start_date, end_date, min_connection=MIN_CONNECTION_MINUTES,
+                     max_connection=MAX_CONNECTION_MINUTES, limit=CONNECTION_LIMIT):
+    """
+    Returns up to `limit` priced one-stop itineraries from `origin` to `destination`
+    departing between `start_date` and `end_date`, cheapest first. Both legs are
+    stored direct fares, and the second leaves `min_connection` to `max_connection`
+    minutes after the first lands.
+    """
+    params = connection_params(origin, destination, start_date, end_date, min_connection, max_connection, limit)
+    return conn.execute(CONNECTIONS_SQL, params).fetchall()
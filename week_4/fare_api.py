@@ -0,0 +1,324 @@
+"""
+Read-only HTTP JSON API over the fares database, for consumers other than the
+Streamlit app (batch jobs, other services, load tests).
+
+    python fare_api.py --db database.db --port 8080 --pool 4
+
+    GET /flights?departure=JFK&arrival=LAX&start=2025-10-01&end=2025-10-31&order=price&limit=50
+    GET /flights?...&cursor=<next_cursor of the previous page>
+    GET /calendar?departure=JFK&arrival=LAX&start=2025-10-01&end=2025-10-31
+    GET /connections?departure=JFK&arrival=NRT&start=2025-10-01&end=2025-10-07
+    GET /health
+
+Queries run on a pool of read-only SQLite connections in worker threads, so
+the event loop never waits on disk. /flights pages with a keyset cursor (the
+sort key of the last row returned), so every page is one index seek however
+deep it is. Responses carry an ETag derived from the database's data version
+and the request; a client revalidating with If-None-Match gets 304 without
+a query until the crawler commits again. Bodies are gzip/deflate compressed
+when the client accepts it.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from aiohttp import web
+
+from connections import CONNECTION_LIMIT, CONNECTIONS_SQL, connection_params
+from fare_store import FLIGHT_COLUMNS
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Responses smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+FLIGHT_FIELDS = [name.strip() for name in FLIGHT_COLUMNS.split(",")]
+CALENDAR_FIELDS = ["date", "min_cents", "median_cents", "max_cents", "direct_min_cents", "fares"]
+CONNECTION_FIELDS = FLIGHT_FIELDS + ["via", "layover_minutes"]
+
+# Keyset orders: the sort columns, ending in the unique id that makes the order total
+KEYSET_ORDERS = {
+    "date": ("date", "price_cents", "id"),
+    "price": ("price_cents", "date", "id"),
+}
+# The index whose column order matches each keyset order (db_utils._migrate_keyset_indexes)
+KEYSET_INDEXES = {
+    "date": "idx_flights_route_date_price",
+    "price": "idx_flights_route_price_date",
+}
+CURSOR_TYPES = {"date": str, "price_cents": int, "id": int}
+
+
+class ReadPool:
+    """
+    Fixed pool of read-only connections to one SQLite file, each used by one
+    thread at a time. A separate connection tracks `PRAGMA data_version`.
+    """
+
+    def __init__(self, db_path, size=DEFAULT_POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self._idle = queue.SimpleQueue()
+        for _ in range(size):
+            self._idle.put(self._connect())
+        self._version_conn = self._connect()
+        self._version_lock = threading.Lock()
+        # data_version restarts with every connection, so versions are only comparable within one process
+        self._boot = uuid.uuid4().hex[:8]
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="fare-read")
+
+    def _connect(self):
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def version(self):
+        """
+        Returns a token that changes whenever another connection commits to the database.
+        """
+        with self._version_lock:
+            number = self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+        return f"{self._boot}.{number}"
+
+    def query(self, sql, params=()):
+        conn = self._idle.get()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            self._idle.put(conn)
+
+    async def run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def close(self):
+        self.executor.shutdown()
+        for _ in range(self.size):
+            self._idle.get().close()
+        self._version_conn.close()
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(text):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(text + "=" * (-len(text) % 4)))
+    except ValueError:
+        raise web.HTTPBadRequest(text="invalid cursor")
+    if not isinstance(values, list):
+        raise web.HTTPBadRequest(text="invalid cursor")
+    return values
+
+
+def etags(header):
+    """
+    Parses an If-None-Match header into its entity tags; weak tags compare like strong ones for GET.
+    """
+    return {tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()}
+
+
+def _airport(request, name):
+    value = request.query.get(name, "").upper()
+    if len(value) != 3 or not value.isalpha():
+        raise web.HTTPBadRequest(text=f"{name} must be a 3-letter airport code")
+    return value
+
+
+def _date(request, name):
+    try:
+        return date.fromisoformat(request.query[name]).isoformat()
+    except (KeyError, ValueError):
+        raise web.HTTPBadRequest(text=f"{name} must be a YYYY-MM-DD date")
+
+
+def _int(request, name, default, low, high):
+    try:
+        value = int(request.query.get(name, default))
+    except ValueError:
+        raise web.HTTPBadRequest(text=f"{name} must be an integer")
+    return min(max(value, low), high)
+
+
+def check_cursor(cursor, keys, start, end):
+    """
+    Rejects a cursor that is not one value of the right type per sort column.
+    """
+    if len(cursor) != len(keys):
+        raise web.HTTPBadRequest(text="cursor does not match order")
+    for key, value in zip(keys, cursor):
+        # bool is an int subclass but never a valid price or id
+        if type(value) is not CURSOR_TYPES[key]:
+            raise web.HTTPBadRequest(text="invalid cursor")
+        if key == "date":
+            try:
+                date.fromisoformat(value)
+            except ValueError:
+                raise web.HTTPBadRequest(text="invalid cursor")
+            if not start <= value <= end:
+                raise web.HTTPBadRequest(text="cursor does not match query")
+
+
+def flights_page(pool, departure, arrival, start, end, order, direct_only, limit, cursor):
+    """
+    One page of /flights: rows after `cursor` in the keyset order, plus the cursor of the next page.
+    """
+    keys = KEYSET_ORDERS[order]
+    where = ["departure = ?", "arrival = ?", "price_cents IS NOT NULL"]
+    params = [departure, arrival]
+    if cursor is not None and keys[0] == "date":
+        # The cursor's date is within [start, end], so the row-value seek replaces the lower bound
+        where.append("date <= ?")
+        params.append(end)
+    else:
+        where.append("date BETWEEN ? AND ?")
+        params.extend([start, end])
+    if direct_only:
+        where.append("stops = 0")
+    if cursor is not None:
+        check_cursor(cursor, keys, start, end)
+        where.append(f"({', '.join(keys)}) > ({', '.join('?' * len(keys))})")
+        params.extend(cursor)
+    # One extra row tells whether another page follows
+    rows = pool.query(f"""
+        SELECT {FLIGHT_COLUMNS}, id
+        FROM flights INDEXED BY {KEYSET_INDEXES[order]}
+        WHERE {" AND ".join(where)}
+        ORDER BY {", ".join(keys)}
+        LIMIT ?
+    """, params + [limit + 1])
+    page = [dict(zip(FLIGHT_FIELDS + ["id"], row)) for row in rows[:limit]]
+    next_cursor = encode_cursor([page[-1][key] for key in keys]) if len(rows) > limit else None
+    for flight in page:
+        del flight["id"]
+    return {"flights": page, "next_cursor": next_cursor}
+
+
+def calendar_days(pool, departure, arrival, start, end):
+    rows = pool.query("""
+        SELECT date, min_cents, median_cents, max_cents, direct_min_cents, fares
+        FROM fare_calendar
+        WHERE departure = ? AND arrival = ? AND date BETWEEN ? AND ?
+        ORDER BY date
+    """, (departure, arrival, start, end))
+    return {"days": [dict(zip(CALENDAR_FIELDS, row)) for row in rows]}
+
+
+def connection_list(pool, departure, arrival, start, end, limit):
+    rows = pool.query(CONNECTIONS_SQL, connection_params(departure, arrival, start, end, limit=limit))
+    return {"connections": [dict(zip(CONNECTION_FIELDS, row)) for row in rows]}
+
+
+class FareApi:
+    """
+    aiohttp handlers over a ReadPool, with a small memo of encoded responses per data version.
+    """
+
+    def __init__(self, pool, max_cached=512):
+        self.pool = pool
+        self.max_cached = max_cached
+        self._responses = OrderedDict()
+        self._version = None
+        self.stats = {"requests": 0, "not_modified": 0, "cache_hits": 0, "queries": 0}
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/health", self.health)
+        app.router.add_get("/flights", self.flights)
+        app.router.add_get("/calendar", self.calendar)
+        app.router.add_get("/connections", self.connections)
+        app.on_cleanup.append(self.close)
+        return app
+
+    async def close(self, app):
+        self.pool.close()
+
+    async def respond(self, request, compute, *args):
+        """
+        Answers 304 if the client's ETag is current, else the (memoized) JSON of compute(pool, *args).
+        """
+        self.stats["requests"] += 1
+        version = await self.pool.run(self.pool.version)
+        if version != self._version:
+            self._responses.clear()
+            self._version = version
+        etag = '"' + hashlib.sha1(f"{version}|{request.path_qs}".encode()).hexdigest()[:20] + '"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag in etags(request.headers.get("If-None-Match", "")):
+            self.stats["not_modified"] += 1
+            return web.Response(status=304, headers=headers)
+
+        body = self._responses.get(etag)
+        if body is None:
+            self.stats["queries"] += 1
+            result = await self.pool.run(compute, self.pool, *args)
+            body = json.dumps(result, separators=(",", ":")).encode()
+            if self._version == version:
+                self._responses[etag] = body
+                while len(self._responses) > self.max_cached:
+                    self._responses.popitem(last=False)
+        else:
+            self.stats["cache_hits"] += 1
+            self._responses.move_to_end(etag)
+
+        response = web.Response(body=body, content_type="application/json", headers=headers)
+        if len(body) >= MIN_COMPRESS_BYTES:
+            response.enable_compression()
+        return response
+
+    async def health(self, request):
+        version = await self.pool.run(self.pool.version)
+        return web.json_response({"status": "ok", "data_version": version, **self.stats})
+
+    async def flights(self, request):
+        order = request.query.get("order", "date")
+        if order not in KEYSET_ORDERS:
+            raise web.HTTPBadRequest(text=f"order must be one of {', '.join(KEYSET_ORDERS)}")
+        cursor = decode_cursor(request.query["cursor"]) if "cursor" in request.query else None
+        return await self.respond(
+            request, flights_page,
+            _airport(request, "departure"), _airport(request, "arrival"),
+            _date(request, "start"), _date(request, "end"), order,
+            request.query.get("direct", "0") in ("1", "true"),
+            _int(request, "limit", DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE), cursor,
+        )
+
+    async def calendar(self, request):
+        return await self.respond(
+            request, calendar_days,
+            _airport(request, "departure"), _airport(request, "arrival"),
+            _date(request, "start"), _date(request, "end"),
+        )
+
+    async def connections(self, request):
+        return await self.respond(
+            request, connection_list,
+            _airport(request, "departure"), _airport(request, "arrival"),
+            _date(request, "start"), _date(request, "end"),
+            _int(request, "limit", CONNECTION_LIMIT, 1, CONNECTION_LIMIT),
+        )
+
+
+def make_app(db_path="./database.db", pool_size=DEFAULT_POOL_SIZE):
+    return FareApi(ReadPool(db_path, pool_size)).app()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read-only fare query API")
+    parser.add_argument("--db", default="./database.db")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--pool", type=int, default=DEFAULT_POOL_SIZE, help="read-only SQLite connections")
+    args = parser.parse_args()
+
+    web.run_app(make_app(args.db, args.pool), host=args.host, port=args.port)
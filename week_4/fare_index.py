@@ -0,0 +1,291 @@
+"""
+In-process columnar index of the priced fares, for route/date-range lookups
+without a SQLite round trip.
+
+    python fare_index.py --db database.db --snapshot fare_index          # build or refresh
+    python fare_index.py --db database.db --snapshot fare_index --full   # rebuild from scratch
+
+The snapshot is a directory of NumPy column files, one generation per
+subdirectory, sorted by (route, date). Readers map the columns with
+np.load(mmap_mode="r"), so every app process on the machine shares the same
+pages, and a lookup is one binary search on the (route, date) key.
+
+Refreshing is incremental: price_observations gets a row whenever ingestion
+inserts a fare or changes its price, and flight_changes whenever any other
+column changes or a fare is deleted, so only the flights logged after the
+snapshot's two watermarks are re-read and merged into a new generation. A
+priced fare count that still disagrees after the merge falls back to a full rebuild.
+"""
+import argparse
+import fcntl
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from datetime import date
+
+import numpy as np
+
+# Date ordinals fit in 20 bits, so (route, date) packs into one sortable int64 key
+DAY_BITS = 20
+# julianday() of 0001-01-01 is 1721425.5 and its Python ordinal is 1
+JULIAN_TO_ORDINAL = 1721424.5
+# Stand-in for NULL in the integer columns
+MISSING = -1
+
+# Few distinct values: stored as int32 codes into a word list in meta.json
+TEXT_COLUMNS = ("airline", "flight_time", "airline_full_name")
+NUMBER_COLUMNS = {"key": np.int64, "price_cents": np.int64, "duration_minutes": np.int32,
+                  "stops": np.int8, "flight_id": np.int64}
+
+ROWS_SQL = f"""
+    SELECT id, departure, arrival, CAST(julianday(date) - {JULIAN_TO_ORDINAL} AS INTEGER),
+           price_cents, duration_minutes, stops, flight_number, {", ".join(TEXT_COLUMNS)}
+    FROM flights
+    WHERE price_cents IS NOT NULL AND julianday(date) IS NOT NULL
+"""
+
+
+# Flights logged after a (price observation, flight change) watermark pair
+CHANGED_IDS_SQL = """
+    SELECT flight_id FROM price_observations WHERE id > ?
+    UNION
+    SELECT flight_id FROM flight_changes WHERE id > ?
+"""
+
+
+def database_state(conn):
+    """
+    Returns (price observation watermark, flight change watermark, priced fare count) of the database.
+    """
+    watermark = conn.execute("SELECT COALESCE(MAX(id), 0) FROM price_observations").fetchone()[0]
+    changes = conn.execute("SELECT COALESCE(MAX(id), 0) FROM flight_changes").fetchone()[0]
+    fares = conn.execute(f"SELECT COUNT(*) FROM ({ROWS_SQL})").fetchone()[0]
+    return watermark, changes, fares
+
+
+class Columns:
+    """
+    One generation of the snapshot: NumPy columns sorted by key, plus the
+    route and text dictionaries their codes refer to. Flight numbers are
+    nearly unique per fare, so they are a fixed-width string column instead.
+    """
+
+    def __init__(self, arrays, meta):
+        self.arrays = arrays
+        self.meta = meta
+        self.routes = {tuple(route): i for i, route in enumerate(meta["routes"])}
+        self.words = {column: meta["words"][column] for column in TEXT_COLUMNS}
+
+    def __len__(self):
+        return len(self.arrays["key"])
+
+    @classmethod
+    def empty(cls):
+        arrays = {name: np.empty(0, dtype) for name, dtype in NUMBER_COLUMNS.items()}
+        arrays.update({column: np.empty(0, np.int32) for column in TEXT_COLUMNS})
+        arrays["flight_number"] = np.empty(0, "U1")
+        return cls(arrays, {"routes": [], "words": {column: [] for column in TEXT_COLUMNS},
+                            "watermark": 0, "changes": 0, "generation": 0})
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                  for name in list(NUMBER_COLUMNS) + list(TEXT_COLUMNS) + ["flight_number"]}
+        return cls(arrays, meta)
+
+    def save(self, path):
+        os.makedirs(path)
+        for name, values in self.arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), values)
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(self.meta, f)
+
+    def merged(self, rows, watermark, changes, removed=()):
+        """
+        Returns a new generation with `rows` (ROWS_SQL tuples) replacing the
+        fares of the same flight ids, and the fares of the `removed` flight ids
+        dropped (deleted or no longer priced); the dictionaries only ever grow.
+        """
+        routes = [tuple(route) for route in self.meta["routes"]]
+        words = {column: list(values) for column, values in self.words.items()}
+
+        def encode(values, known, index):
+            # Codes for `values`, appending unseen ones to the `known` word list
+            for value in dict.fromkeys(values):
+                if value not in index:
+                    index[value] = len(known)
+                    known.append(value)
+            return np.fromiter(map(index.__getitem__, values), np.int32, len(values))
+
+        def numbers(values, dtype):
+            return np.fromiter((MISSING if value is None else value for value in values), dtype, len(values))
+
+        ids, departures, arrivals, days, prices, durations, stops, flight_numbers, *texts = (
+            zip(*rows) if rows else [()] * (8 + len(TEXT_COLUMNS)))
+        route_codes = encode(list(zip(departures, arrivals)), routes, dict(self.routes)).astype(np.int64)
+        new = {
+            "key": (route_codes << DAY_BITS) | np.fromiter(days, np.int64, len(rows)),
+            "price_cents": np.fromiter(prices, np.int64, len(rows)),
+            "duration_minutes": numbers(durations, np.int32),
+            "stops": numbers(stops, np.int8),
+            "flight_id": np.fromiter(ids, np.int64, len(rows)),
+            "flight_number": np.array([number or "" for number in flight_numbers], dtype=str)
+                             if rows else np.empty(0, "U1"),
+        }
+        for column, values in zip(TEXT_COLUMNS, texts):
+            new[column] = encode(values, words[column], {word: i for i, word in enumerate(words[column])})
+
+        replaced = np.concatenate([new["flight_id"], np.fromiter(removed, np.int64)])
+        keep = ~np.isin(self.arrays["flight_id"], replaced)
+        arrays = {name: np.concatenate([np.asarray(values)[keep], new[name]])
+                  for name, values in self.arrays.items()}
+        # Same-day fares stay in flight id order, like SQLite's index scan
+        order = np.lexsort((arrays["flight_id"], arrays["key"]))
+        arrays = {name: values[order] for name, values in arrays.items()}
+        meta = {"routes": routes, "words": words, "watermark": watermark, "changes": changes,
+                "generation": self.meta["generation"] + 1}
+        return Columns(arrays, meta)
+
+    def lookup(self, departure, arrival, start_date, end_date, order_by="date", direct_only=False):
+        """
+        Returns the fares of one route between two ISO dates as FLIGHT_COLUMNS
+        tuples, in the same order as FareStore.get_flights.
+        """
+        route = self.routes.get((departure, arrival))
+        if route is None or start_date > end_date:
+            return ()
+        keys = self.arrays["key"]
+        low, high = np.searchsorted(keys, [
+            (route << DAY_BITS) | date.fromisoformat(start_date).toordinal(),
+            (route << DAY_BITS) | (date.fromisoformat(end_date).toordinal() + 1),
+        ])
+        rows = np.arange(low, high)
+        if direct_only:
+            rows = rows[self.arrays["stops"][low:high] == 0]
+        days = keys[rows] & ((1 << DAY_BITS) - 1)
+        prices = self.arrays["price_cents"][rows]
+        if order_by == "price":
+            rows = rows[np.lexsort((days, prices))]
+        elif order_by == "value":
+            rows = rows[np.lexsort((days, -prices))]
+
+        dates = {day: date.fromordinal(day).isoformat() for day in np.unique(days).tolist()}
+        durations = self.arrays["duration_minutes"][rows].tolist()
+        stops = self.arrays["stops"][rows].tolist()
+        texts = {column: [self.words[column][code] for code in self.arrays[column][rows].tolist()]
+                 for column in TEXT_COLUMNS}
+        return tuple(zip(
+            [number or None for number in self.arrays["flight_number"][rows].tolist()],
+            [departure] * len(rows),
+            [arrival] * len(rows),
+            [dates[key & ((1 << DAY_BITS) - 1)] for key in keys[rows].tolist()],
+            self.arrays["price_cents"][rows].tolist(),
+            texts["airline"],
+            texts["flight_time"],
+            texts["airline_full_name"],
+            [None if value == MISSING else value for value in durations],
+            [None if value == MISSING else value for value in stops],
+        ))
+
+
+class FareIndex:
+    """
+    Snapshot directory of a fares database, shared by every process that opens it.
+
+    `refresh()` brings the snapshot up to date with the database (building a
+    new generation if needed, under a file lock so concurrent processes build
+    it once) and maps the current generation. Lookups go to `columns`.
+    """
+
+    def __init__(self, snapshot_path, db_path="./database.db"):
+        self.snapshot_path = snapshot_path
+        self.db_path = db_path
+        os.makedirs(snapshot_path, exist_ok=True)
+        self._conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.columns = None
+        self.stats = {"refreshes": 0, "incremental_builds": 0, "full_builds": 0, "rows_merged": 0}
+
+    def _current(self):
+        try:
+            with open(os.path.join(self.snapshot_path, "CURRENT")) as f:
+                return Columns.load(os.path.join(self.snapshot_path, f.read().strip()))
+        except FileNotFoundError:
+            return None
+
+    def _publish(self, columns):
+        name = f"gen-{columns.meta['generation']:06d}"
+        path = os.path.join(self.snapshot_path, name)
+        shutil.rmtree(path, ignore_errors=True)
+        columns.save(path)
+        pointer = os.path.join(self.snapshot_path, "CURRENT.tmp")
+        with open(pointer, "w") as f:
+            f.write(name)
+        os.replace(pointer, os.path.join(self.snapshot_path, "CURRENT"))
+        # Processes still mapping an older generation keep their pages after the files are unlinked
+        for old in os.listdir(self.snapshot_path):
+            if old.startswith("gen-") and old < name:
+                shutil.rmtree(os.path.join(self.snapshot_path, old), ignore_errors=True)
+        return Columns.load(path)
+
+    def refresh(self, full=False):
+        """
+        Makes `columns` reflect the database's committed fares and returns them.
+        """
+        with self._lock, open(os.path.join(self.snapshot_path, "LOCK"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self.stats["refreshes"] += 1
+            latest = self._current()
+            # Snapshots from before flight_changes existed can't be brought up to date
+            current = None if full or latest is None or "changes" not in latest.meta else latest
+            with self._conn:
+                # One read transaction, so the watermarks and the rows agree
+                self._conn.execute("BEGIN")
+                watermark, changes, fares = database_state(self._conn)
+                if current is not None:
+                    since = (current.meta["watermark"], current.meta["changes"])
+                    if since == (watermark, changes) and len(current) == fares:
+                        self.columns = current
+                        return current
+                    changed = [row[0] for row in self._conn.execute(CHANGED_IDS_SQL, since)]
+                    rows = self._conn.execute(f"{ROWS_SQL} AND id IN ({CHANGED_IDS_SQL})", since).fetchall()
+                    merged = current.merged(rows, watermark, changes, changed)
+                    if len(merged) == fares:
+                        self.stats["incremental_builds"] += 1
+                        self.stats["rows_merged"] += len(rows)
+                        self.columns = self._publish(merged)
+                        return self.columns
+                # Rebuilt generations keep counting up, so older ones are still cleaned up
+                base = Columns.empty()
+                if latest is not None:
+                    base.meta["generation"] = latest.meta["generation"]
+                rows = self._conn.execute(ROWS_SQL).fetchall()
+                self.stats["full_builds"] += 1
+                self.columns = self._publish(base.merged(rows, watermark, changes))
+                return self.columns
+
+    def lookup(self, *args, **kwargs):
+        # An empty snapshot is still current; only a never-loaded one needs a refresh
+        columns = self.columns if self.columns is not None else self.refresh()
+        return columns.lookup(*args, **kwargs)
+
+    def close(self):
+        self._conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or refresh the columnar fare snapshot")
+    parser.add_argument("--db", default="./database.db")
+    parser.add_argument("--snapshot", default="./fare_index")
+    parser.add_argument("--full", action="store_true", help="rebuild instead of merging new observations")
+    args = parser.parse_args()
+
+    index = FareIndex(args.snapshot, args.db)
+    columns = index.refresh(full=args.full)
+    print(f"generation {columns.meta['generation']}: {len(columns)} fares on {len(columns.routes)} routes, "
+          f"watermarks {columns.meta['watermark']}/{columns.meta['changes']} ({index.stats})")
+    index.close()
@@ -0,0 +1,186 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from connections import CONNECTIONS_SQL, MAX_CONNECTION_MINUTES, MIN_CONNECTION_MINUTES, connection_params
+from fare_index import FareIndex
+
+# Sort orders run inside SQLite on the indexed numeric columns
+ORDER_BY = {
+    "value": "price_cents DESC, date ASC",
+    "price": "price_cents ASC, date ASC",
+    "date": "date ASC",
+}
+
+FLIGHT_COLUMNS = """
+    flight_number, departure, arrival, date, price_cents, airline, flight_time,
+    airline_full_name, duration_minutes, stops
+"""
+
+
+class FareStore:
+    """
+    Read side of the flights database for the app.
+
+    Holds one read-only connection shared by every session and memoizes query
+    results by their search parameters. The memo is dropped as soon as
+    SQLite's `PRAGMA data_version` shows another connection (the crawler)
+    has committed, and identical searches that arrive while the same query
+    is already running wait for that result instead of querying again.
+
+    With `index_path`, get_flights reads from a memory-mapped columnar
+    snapshot (see fare_index.py) that is refreshed when the data version changes.
+    """
+
+    def __init__(self, db_path="./database.db", max_entries=256, index_path=None):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        self._conn_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._version = None
+        self.index = FareIndex(index_path, db_path) if index_path else None
+        self._index_version = None
+        self._index_lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "invalidations": 0,
+                      "queries": 0, "query_seconds": 0.0, "slowest_query_seconds": 0.0}
+
+    def data_version(self):
+        with self._conn_lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def query(self, sql, params=()):
+        with self._conn_lock:
+            started = time.perf_counter()
+            rows = self._conn.execute(sql, params).fetchall()
+            elapsed = time.perf_counter() - started
+            self.stats["queries"] += 1
+            self.stats["query_seconds"] += elapsed
+            self.stats["slowest_query_seconds"] = max(self.stats["slowest_query_seconds"], elapsed)
+        return rows
+
+    def indexed_flights(self, departure, arrival, start_date, end_date, order_by, direct_only):
+        version = self.data_version()
+        started = time.perf_counter()
+        with self._index_lock:
+            # One session refreshes after a commit; the others wait for it and read the new generation
+            if version != self._index_version:
+                self.index.refresh()
+                self._index_version = version
+            columns = self.index.columns
+        rows = columns.lookup(departure, arrival, start_date, end_date, order_by, direct_only)
+        elapsed = time.perf_counter() - started
+        with self._conn_lock:
+            self.stats["queries"] += 1
+            self.stats["query_seconds"] += elapsed
+            self.stats["slowest_query_seconds"] = max(self.stats["slowest_query_seconds"], elapsed)
+        return rows
+
+    def cached(self, key, compute):
+        """
+        Returns compute() memoized under `key` for the current data version,
+        running it at most once for concurrent callers with the same key.
+        """
+        version = self.data_version()
+        owner = False
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    self.stats["invalidations"] += 1
+                self._cache.clear()
+                self._version = version
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return self._cache[key]
+            future = self._inflight.get((version, key))
+            if future is not None:
+                self.stats["coalesced"] += 1
+            else:
+                future = self._inflight[(version, key)] = Future()
+                self.stats["misses"] += 1
+                owner = True
+        if not owner:
+            return future.result()
+
+        try:
+            result = compute()
+            future.set_result(result)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop((version, key), None)
+                if future.exception() is None and self._version == version:
+                    self._cache[key] = future.result()
+                    while len(self._cache) > self.max_entries:
+                        self._cache.popitem(last=False)
+        return result
+
+    def get_flights(self, departure, arrival, start_date, end_date, order_by="date", direct_only=False):
+        """
+        Returns the matching flights as a tuple of rows (FLIGHT_COLUMNS order).
+        With `direct_only`, fares with a known connection or an unknown number of stops are left out.
+        The result is shared between callers and must not be modified.
+        """
+        params = (departure, arrival, start_date, end_date)
+        if self.index is not None:
+            return self.cached(("flights", order_by, direct_only) + params,
+                               lambda: self.indexed_flights(*params, order_by, direct_only))
+        sql = f"""
+            SELECT {FLIGHT_COLUMNS}
+            FROM flights
+            WHERE departure = ? AND arrival = ? AND date BETWEEN ? AND ?
+              AND price_cents IS NOT NULL
+              {"AND stops = 0" if direct_only else ""}
+            ORDER BY {ORDER_BY[order_by]}
+        """
+        return self.cached(("flights", order_by, direct_only) + params, lambda: tuple(self.query(sql, params)))
+
+    def get_fare_calendar(self, departure, arrival, start_date, end_date):
+        """
+        Returns (date, min_cents, median_cents, max_cents, direct_min_cents, fares) per
+        day with priced fares, read from the fare_calendar summary the crawler maintains.
+        """
+        sql = """
+            SELECT date, min_cents, median_cents, max_cents, direct_min_cents, fares
+            FROM fare_calendar
+            WHERE departure = ? AND arrival = ? AND date BETWEEN ? AND ?
+            ORDER BY date
+        """
+        params = (departure, arrival, start_date, end_date)
+        return self.cached(("calendar",) + params, lambda: tuple(self.query(sql, params)))
+
+    def get_unclassified_counts(self, departure, arrival, start_date, end_date):
+        """
+        Returns (fares of the route with unknown stops, fares leaving `departure`
+        without itinerary times) in the date range: fares stored before those
+        columns existed, which direct-only searches and connections cannot use.
+        """
+        sql = """
+            SELECT
+                (SELECT COUNT(*) FROM flights
+                 WHERE departure = ?1 AND arrival = ?2 AND date BETWEEN ?3 AND ?4
+                   AND price_cents IS NOT NULL AND stops IS NULL),
+                (SELECT COUNT(*) FROM flights
+                 WHERE departure = ?1 AND date BETWEEN ?3 AND ?4
+                   AND price_cents IS NOT NULL AND departure_at IS NULL)
+        """
+        params = (departure, arrival, start_date, end_date)
+        return self.cached(("unclassified",) + params, lambda: self.query(sql, params)[0])
+
+    def get_connections(self, departure, arrival, start_date, end_date,
+                        min_connection=MIN_CONNECTION_MINUTES, max_connection=MAX_CONNECTION_MINUTES):
+        """
+        Returns one-stop itineraries built from two stored direct fares, cheapest first
+        (see connections.py). Rows are FLIGHT_COLUMNS followed by the connecting airport
+        and the layover in minutes.
+        """
+        params = connection_params(departure, arrival, start_date, end_date, min_connection, max_connection)
+        key = ("connections", departure, arrival, start_date, end_date, min_connection, max_connection)
+        return self.cached(key, lambda: tuple(self.query(CONNECTIONS_SQL, params)))
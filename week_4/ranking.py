@@ -0,0 +1,62 @@
+import numpy as np
+
+# Column positions in fare_store.FLIGHT_COLUMNS rows
+PRICE_CENTS = 4
+DURATION_MINUTES = 8
+
+# Objective name -> True if larger values rank first
+OBJECTIVES = {
+    "value": True,      # cents per mile
+    "price": False,     # price in cents
+    "duration": False,  # minutes in the air
+}
+
+
+def score_flights(flights, miles):
+    """
+    Builds NumPy columns for a list of flight rows in one pass:
+    price (cents), duration (minutes, NaN when unknown) and value (cents per mile).
+    """
+    count = len(flights)
+    price = np.fromiter((f[PRICE_CENTS] for f in flights), dtype=np.float64, count=count)
+    duration = np.fromiter(
+        (np.nan if f[DURATION_MINUTES] is None else f[DURATION_MINUTES] for f in flights),
+        dtype=np.float64, count=count
+    )
+    return {
+        "price": price,
+        "duration": duration,
+        "value": price / miles,
+    }
+
+
+def _ascending_key(columns, objective, rows=slice(None)):
+    # Every objective becomes "smaller is better", with unknown values ranked last
+    values = columns[objective][rows]
+    key = -values if OBJECTIVES[objective] else values.copy()
+    key[np.isnan(key)] = np.inf
+    return key
+
+
+def top_k(columns, objectives=("value",), k=10):
+    """
+    Returns the indices of the best `k` rows, ordered lexicographically by
+    `objectives` (the first one decides, later ones break ties).
+
+    The primary key is partitioned in O(n) to find the k-th best value; only
+    rows at or above that cut-off (ties included) are fully sorted.
+    """
+    primary = _ascending_key(columns, objectives[0])
+    count = len(primary)
+    if count == 0 or k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < count:
+        cutoff = np.partition(primary, k - 1)[k - 1]
+        candidates = np.flatnonzero(primary <= cutoff)
+    else:
+        candidates = np.arange(count)
+
+    # np.lexsort sorts by its last key first
+    keys = [_ascending_key(columns, objective, candidates) for objective in reversed(objectives[1:])]
+    keys.append(primary[candidates])
+    return candidates[np.lexsort(keys)][:k]
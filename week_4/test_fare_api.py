@@ -0,0 +1,96 @@
+import asyncio
+import os
+import sqlite3
+import sys
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from fare_api import KEYSET_ORDERS, decode_cursor, encode_cursor, flights_page, make_app
+
+# The schema comes from the crawler's migrations, which live in week_2
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "week_2"))
+from db_utils import init_db  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "fares.db")
+    init_db(path)
+    conn = sqlite3.connect(path)
+    conn.executemany("""
+        INSERT INTO flights (flight_number, departure, arrival, date, price_cents, airline, currency, stops)
+        VALUES (?, 'JFK', 'LAX', ?, ?, 'B6', 'USD', 0)
+    """, [(f"B6{i}", f"2025-10-{1 + i % 9:02d}", 10000 + (i * 37) % 500) for i in range(60)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+class PlanPool:
+    """
+    Stands in for ReadPool, recording the query plan of every query it runs.
+    """
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.plans = []
+
+    def query(self, sql, params=()):
+        self.plans.append([row[3] for row in self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)])
+        return self.conn.execute(sql, params).fetchall()
+
+
+@pytest.mark.parametrize("order", list(KEYSET_ORDERS))
+def test_pages_seek_an_index_without_sorting(db_path, order):
+    pool = PlanPool(db_path)
+    cursor = None
+    seen = []
+    while True:
+        page = flights_page(pool, "JFK", "LAX", "2025-10-02", "2025-10-08", order, False, 10, cursor)
+        seen.extend(page["flights"])
+        if not page["next_cursor"]:
+            break
+        cursor = decode_cursor(page["next_cursor"])
+
+    assert len(pool.plans) > 1
+    for plan in pool.plans:
+        assert not any("TEMP B-TREE" in step for step in plan), plan
+        assert any("USING INDEX" in step for step in plan), plan
+    expected = pool.conn.execute("""
+        SELECT COUNT(*) FROM flights WHERE departure = 'JFK' AND arrival = 'LAX'
+        AND date BETWEEN '2025-10-02' AND '2025-10-08'
+    """).fetchone()[0]
+    assert len(seen) == expected
+    key = (lambda f: (f["date"], f["price_cents"])) if order == "date" else (lambda f: (f["price_cents"], f["date"]))
+    assert [key(f) for f in seen] == sorted(key(f) for f in seen)
+
+
+def get_status(db_path, params):
+    async def run():
+        async with TestClient(TestServer(make_app(db_path, pool_size=1))) as client:
+            response = await client.get("/flights", params=params)
+            return response.status
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("cursor", [
+    [{"a": 1}, 1, 1],
+    ["2025-10-03", [1], 1],
+    ["2025-10-03", 100, "7"],
+    ["2025-10-03", True, 1],
+    ["not a date", 100, 1],
+    ["2025-09-01", 100, 1],
+    ["2025-10-03", 100],
+])
+def test_malformed_cursor_is_rejected(db_path, cursor):
+    params = {"departure": "JFK", "arrival": "LAX", "start": "2025-10-02", "end": "2025-10-08",
+              "order": "date", "cursor": encode_cursor(cursor)}
+    assert get_status(db_path, params) == 400
+
+
+def test_valid_cursor_is_accepted(db_path):
+    params = {"departure": "JFK", "arrival": "LAX", "start": "2025-10-02", "end": "2025-10-08",
+              "order": "price", "cursor": encode_cursor([10100, "2025-10-03", 5])}
+    assert get_status(db_path, params) == 200
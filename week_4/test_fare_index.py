@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from fare_index import FareIndex
+from fare_store import ORDER_BY, FareStore
+
+# The schema (with the price_observations triggers) comes from the crawler's migrations in week_2
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "week_2"))
+from db_utils import init_db  # noqa: E402
+
+ROUTES = [("JFK", "LAX"), ("JFK", "LHR"), ("LAX", "NRT")]
+
+
+def add_fares(path, count, offset=0):
+    conn = sqlite3.connect(path)
+    conn.executemany("""
+        INSERT INTO flights (flight_number, departure, arrival, date, price_cents, airline, currency,
+                             duration_minutes, stops)
+        VALUES (?, ?, ?, ?, ?, 'B6', 'USD', ?, ?)
+    """, [(f"B6{offset + i}", *ROUTES[i % len(ROUTES)], f"2025-10-{1 + i % 28:02d}", 10000 + (i * 37) % 900,
+           300 + i % 60, None if i % 5 == 0 else i % 2) for i in range(count)])
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "fares.db")
+    init_db(path)
+    return path
+
+
+def test_empty_snapshot_is_not_rebuilt_on_every_lookup(db_path, tmp_path):
+    index = FareIndex(str(tmp_path / "index"), db_path)
+    for _ in range(5):
+        assert index.lookup("JFK", "LAX", "2025-10-01", "2025-10-31") == ()
+    assert index.stats["refreshes"] == 1
+
+
+def test_index_matches_sqlite_after_incremental_refresh(db_path, tmp_path):
+    add_fares(db_path, 300)
+    store = FareStore(db_path)
+    indexed = FareStore(db_path, index_path=str(tmp_path / "index"))
+    indexed.get_flights("JFK", "LAX", "2025-10-01", "2025-10-31")
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE flights SET price_cents = price_cents + 5 WHERE id % 7 = 0")
+    conn.commit()
+    conn.close()
+    add_fares(db_path, 30, offset=300)
+
+    for departure, arrival in ROUTES:
+        for order_by in ORDER_BY:
+            for direct_only in (False, True):
+                args = (departure, arrival, "2025-10-03", "2025-10-20", order_by, direct_only)
+                expected, actual = store.get_flights(*args), indexed.get_flights(*args)
+                assert sorted(actual) == sorted(expected)
+                assert [row[3:5] for row in actual] == [row[3:5] for row in expected] or order_by == "date"
+    assert indexed.index.stats["incremental_builds"] == 1
+
+
+def test_concurrent_sessions_refresh_once_per_commit(db_path, tmp_path):
+    add_fares(db_path, 90)
+    store = FareStore(db_path, index_path=str(tmp_path / "index"))
+    store.get_flights("JFK", "LAX", "2025-10-01", "2025-10-31")
+    add_fares(db_path, 9, offset=90)
+
+    days = [f"2025-10-{day:02d}" for day in range(1, 29)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda day: store.get_flights("JFK", "LAX", day, day), days))
+
+    assert store.index.stats["refreshes"] == 2
+    assert sum(len(rows) for rows in results) == len(store.get_flights("JFK", "LAX", "2025-10-01", "2025-10-31"))
+
+
+def test_updates_that_keep_the_price_reach_the_index(db_path, tmp_path):
+    add_fares(db_path, 90)
+    store = FareStore(db_path)
+    indexed = FareStore(db_path, index_path=str(tmp_path / "index"))
+    indexed.get_flights("JFK", "LAX", "2025-10-01", "2025-10-31")
+
+    conn = sqlite3.connect(db_path)
+    # The carriers trigger fills airline_full_name without touching the price
+    conn.execute("INSERT INTO carriers (code, name, fetched_at) VALUES ('B6', 'JETBLUE AIRWAYS', 0)")
+    # A re-crawl classifies fares with unknown stops
+    conn.execute("UPDATE flights SET stops = 0 WHERE stops IS NULL")
+    conn.execute("DELETE FROM flights WHERE id % 11 = 0")
+    conn.commit()
+    conn.close()
+
+    for departure, arrival in ROUTES:
+        for direct_only in (False, True):
+            args = (departure, arrival, "2025-10-01", "2025-10-31", "price", direct_only)
+            assert indexed.get_flights(*args) == store.get_flights(*args)
+    assert all(row[7] == "JETBLUE AIRWAYS" for row in indexed.get_flights("JFK", "LAX", "2025-10-01", "2025-10-31"))
+    assert indexed.index.stats["incremental_builds"] == 1
+    assert indexed.index.stats["full_builds"] == 1